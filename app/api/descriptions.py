@@ -5,11 +5,44 @@ STORE_BOOKS_DESCRIPTION = """
     \n- `inserted_authors`: number of authors successfully stored
     \n- `duplicates_count`: number of books/authors that already exist in the database
     \n- `message`: summary message describing the result or any error encountered
+    \nA book is a duplicate when a stored book has the same OpenLibrary work key, or the same
+    title and authors regardless of case, whitespace and author order. Storing the same books
+    again is idempotent.
+    \nAn author fetched less than `AUTHOR_FRESHNESS_TTL` seconds ago is not fetched again
+    (`up_to_date` is true). Fetching a known author again writes nothing when its bibliography
+    is unchanged, and otherwise only new books and updates of changed ones (`updated_books`).
+"""
+
+STORE_BOOKS_BATCH_DESCRIPTION = """
+    Fetches books of several authors from an external API and stores them in the local database.
+    \nAuthors are fetched concurrently (the limit is configurable) and every author is stored as in
+    `POST /books`: page by page, under the same per-author lock, joining an ingest of the author that
+    is already running, and updating changed books of known authors (`updated_books`). An author
+    that cannot be fetched does not stop the others.
+    \nThe response includes:
+    \n- `results`: the `POST /books` summary for every fetched author
+    \n- `errors`: authors that could not be fetched, with the reason
+    \n- `summary`: totals over all authors
 """
 
 GET_BOOKS_DESCRIPTION = """
     Returns a list of books from the local database.
-    \nYou can optionally filter the results by author and/or title.
+    \nYou can optionally filter the results by author, title and/or `language` (an exact language
+    code such as `eng`).
+    \nWith `search`, books whose title or author name is similar to the phrase are returned,
+    best matches first; `min_similarity` (0-1) sets how close a match has to be.
+    \nResults are paginated: at most `limit` books are returned, sorted by `sort` and `order`.
+    When more books are available, the `X-Next-Cursor` response header holds the `cursor`
+    value for the next page. With `include_total=true`, the `X-Total-Count-Estimate` header
+    holds an approximate number of matching books.
+    \nFor exports, send `Accept: application/x-ndjson` or `stream=ndjson` to stream every matching
+    book as one JSON object per line, or `stream=json` to stream them as a JSON array. Streaming
+    ignores `limit`.
+    \nResponses carry an `ETag` and `Last-Modified` derived from the catalog version, which changes
+    only when books are stored. Send the `ETag` back in `If-None-Match` (or the date in
+    `If-Modified-Since`) to get `304 Not Modified` while the catalog is unchanged. `Cache-Control`
+    lets browsers, reverse proxies and CDNs reuse responses for a few seconds. Each worker also
+    keeps recently served pages of the current catalog version in memory (see `/health/cache/books`).
     \nEach book in the response includes:
     \n- `title`: title of the book
     \n- `ebook_access`: access type of ebook, if available
@@ -18,9 +51,97 @@ GET_BOOKS_DESCRIPTION = """
     \n- `language`: list of languages the book is available in
 """
 
+GET_BOOK_FACETS_DESCRIPTION = """
+    Counts the books of the local database by language, decade of `first_publish_year`,
+    `ebook_access` and author, e.g. for the filters of a catalog UI.
+    \nTakes the `author`, `title` and `language` filters of `GET /books`. Every facet lists at most
+    `limit` values, the most frequent first; `total` is the number of matching books. A book
+    available in several languages or written by several authors counts once for each.
+    \nCounts of the whole catalog (no filters) are kept up to date as books are stored, so they
+    are read without counting the books. Like `GET /books`, responses carry an `ETag` and
+    `Last-Modified` derived from the catalog version and answer conditional requests with 304.
+"""
+
 HEALTH_DESCRIPTION = """
-    Checks the health of the application and the external API. 
+    Checks the health of the application, the external API and the database.
+    \nThe statuses come from a background prober, so this endpoint never calls the external API itself.
     \nThe response includes:
     \n- `app_status`: status of the application itself
-    \n- `external_api_status`: status of the connection to the external API
-"""
\ No newline at end of file
+    \n- `external_api_status`: status of the connection to the external API (`unknown` before the first check)
+    \n- `external_api_latency_ms`: duration of the last external API check
+    \n- `database_status`: status of the database connection (`unknown` before the first check)
+    \n- `database_latency_ms`: duration of the last database check
+    \n- `checked_at`: time of the last check
+"""
+
+LIVENESS_DESCRIPTION = """
+    Reports that the application process is running. Performs no checks of its own.
+"""
+
+READINESS_DESCRIPTION = """
+    Reports whether the application can serve traffic, based on the last background check.
+    \nReturns 503 when the database was unreachable in the last check or no recent check exists.
+"""
+
+CACHE_STATS_DESCRIPTION = """
+    Returns counters of the OpenLibrary response cache.
+    \nThe response includes:
+    \n- `enabled`: whether the cache is configured
+    \n- `hits`, `misses`: lookups answered from the cache and lookups that went upstream
+    \n- `revalidations`: expired entries confirmed as unchanged by upstream (HTTP 304)
+    \n- `evictions`: entries removed to stay within the size limits
+    \n- `entries`, `bytes`: current number of entries and their approximate size
+"""
+
+BOOKS_CACHE_STATS_DESCRIPTION = """
+    Returns counters of the in-process cache of serialized `GET /books` pages of this worker.
+    \nPages are cached for the current catalog version only; the cache is emptied when a request
+    sees a newer version, so pages are never served after books were stored.
+    \nThe response includes:
+    \n- `enabled`: whether the cache is configured
+    \n- `hits`, `misses`, `hit_ratio`: pages served from the cache, pages read from the database,
+    and the share of hits
+    \n- `invalidations`: times the cache was emptied because the catalog version changed
+    \n- `evictions`: pages removed to stay within the size limits
+    \n- `entries`, `bytes`, `version`: current number of pages, their approximate size and their catalog version
+"""
+INGEST_DESCRIPTION = """
+    Queues fetching books of the author from the external API and storing them in the local database.
+    \nReturns 202 right away with the queued job; the work is done by background workers and the
+    `Location` header points to the job status. Queued jobs are stored in the database and survive
+    a restart.
+"""
+
+GET_JOB_DESCRIPTION = """
+    Returns the state and progress of an ingestion job queued with `POST /ingest`.
+    \nThe response includes:
+    \n- `state`: `queued`, `running`, `succeeded` or `failed`
+    \n- `pages_fetched`: external API result pages fetched and stored so far
+    \n- `inserted_books`, `inserted_authors`, `duplicates_count`: running totals
+    \n- `result`: the final summary (same as the `POST /books` response) once the job has succeeded
+    \n- `error`: the reason of the failure once the job has failed
+"""
+
+OPENLIBRARY_STATS_DESCRIPTION = """
+    Returns the state of the resilience layer in front of the external API.
+    \nThe response includes:
+    \n- `circuit_state`: `closed` (normal), `open` (requests fail fast) or `half_open` (probing recovery)
+    \n- `circuit_transitions`: how many times the circuit breaker entered every state
+    \n- `requests`, `retries`, `failures`: requests sent (retries included), repeated and failed
+    \n- `short_circuited`: requests rejected while the circuit was open
+    \n- `rate_limited`, `rate_limited_seconds`: requests delayed by the client-side rate limit and the total delay
+"""
+
+METRICS_DESCRIPTION = """
+    Returns the metrics of this worker process in the Prometheus text format.
+    \nThe metrics include:
+    \n- `http_requests_total`, `http_request_duration_seconds`: requests and latency by route template, method and status
+    \n- `http_requests_in_flight`, `threadpool_threads_busy`, `threadpool_threads_limit`: current load
+    \n- `db_pool_connections`: database pool connections by state (`size`, `checked_in`, `checked_out`, `overflow`)
+    \n- `openlibrary_request_duration_seconds`, `openlibrary_request_errors_total`: external API latency and errors by endpoint
+    \n- `openlibrary_client_events_total`, `openlibrary_circuit_state`, `openlibrary_cache_*`: retries, circuit breaker and response cache
+    \n- `books_cache_events_total`, `books_cache_size`, `books_cache_hit_ratio`: `GET /books` page cache
+    \n- `ingest_books_total`, `ingest_authors_total`, `ingest_duplicates_total`: rows stored by ingestion
+    \n- `ingest_updated_books_total`, `author_syncs_total`: books updated by author refreshes and ingests by outcome
+    (`fresh`, `unchanged`, `changed`)
+"""
@@ -1,13 +1,48 @@
-from fastapi import Query, APIRouter, Depends
+from fastapi import Query, APIRouter, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from app.api.descriptions import GET_BOOKS_DESCRIPTION, STORE_BOOKS_DESCRIPTION
-from app.dependencies.db import get_db
-from app.models.schemas import AuthorRequest, BookResponse, StoreBooksResponse
-from app.services.book_service import BookService
+from app.api.descriptions import (
+    GET_BOOK_FACETS_DESCRIPTION, GET_BOOKS_DESCRIPTION, STORE_BOOKS_BATCH_DESCRIPTION, STORE_BOOKS_DESCRIPTION
+)
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.core.http_cache import cache_control, etag_matches, http_date, make_etag, not_modified_since
+from app.core.instrumentation import TimedRoute
+from app.core.listing_cache import ListingCache
+from app.core.replicas import READ_PRIMARY_COOKIE, reads_from_primary
+from app.core.settings import settings
+from app.dependencies.cache import get_listing_cache
+from app.dependencies.db import get_db, get_read_db
+from app.dependencies.http import get_open_library_client
+from app.models.schemas import (
+    AuthorRequest, BatchAuthorsRequest, BatchStoreBooksResponse, BookFacetsResponse, BookResponse, StoreBooksResponse
+)
+from app.services.book_service import BookService, NDJSON_MEDIA_TYPE
 
-router = APIRouter(prefix="/books", tags=["Books"])
+router = APIRouter(prefix="/books", tags=["Books"], route_class=TimedRoute)
+
+
+async def catalog_validators(request: Request, service: BookService, variant: str = "") -> tuple[int, dict, bool]:
+    """
+    Returns the catalog version, the `ETag`, `Last-Modified` and caching headers of a
+    catalog read derived from it and the query, and whether the client's copy is still
+    current (the response is then a 304).
+    """
+    version, last_modified = await service.get_catalog_version()
+    etag = make_etag(version, request.query_params.multi_items(), variant)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control(private=reads_from_primary(request.cookies.get(READ_PRIMARY_COOKIE))),
+        "Vary": "Accept",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if_none_match = request.headers.get("if-none-match")
+    not_modified = etag_matches(if_none_match, etag) or (
+        if_none_match is None and not_modified_since(request.headers.get("if-modified-since"), last_modified)
+    )
+    return version, headers, not_modified
 
 
 @router.post("",
@@ -15,19 +50,133 @@ router = APIRouter(prefix="/books", tags=["Books"])
              summary="Fetch books by author and store them in the local database.",
              description=STORE_BOOKS_DESCRIPTION
              )
-def fetch_and_store_books(request: AuthorRequest, db=Depends(get_db)):
-    service = BookService(db)
-    return service.fetch_and_store_books(request.author)
+async def fetch_and_store_books(
+    request: AuthorRequest,
+    db=Depends(get_db),
+    client: OpenLibraryAPIClient = Depends(get_open_library_client)
+):
+    service = BookService(db, client)
+    return await service.fetch_and_store_books(request.author)
+
+
+@router.post("/batch",
+             response_model=BatchStoreBooksResponse,
+             summary="Fetch books of several authors and store them in the local database.",
+             description=STORE_BOOKS_BATCH_DESCRIPTION
+             )
+async def fetch_and_store_books_batch(
+    request: BatchAuthorsRequest,
+    db=Depends(get_db),
+    client: OpenLibraryAPIClient = Depends(get_open_library_client)
+):
+    service = BookService(db, client)
+    return await service.fetch_and_store_books_batch(request.authors)
 
 
 @router.get("",
             response_model=List[BookResponse],
             summary="Retrieve books from the database",
-            description=GET_BOOKS_DESCRIPTION)
-def get_books(
+            description=GET_BOOKS_DESCRIPTION,
+            responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def get_books(
+    request: Request,
+    author: Optional[str] = Query(None, description="Filter by author name"),
+    title: Optional[str] = Query(None, description="Filter by book title"),
+    language: Optional[str] = Query(None, min_length=1, description="Filter by language code, e.g. `eng`"),
+    search: Optional[str] = Query(
+        None,
+        min_length=1,
+        description="Fuzzy search in titles and author names, results ranked by similarity"
+    ),
+    min_similarity: float = Query(0.3, ge=0, le=1, description="Minimum similarity of `search` matches"),
+    limit: int = Query(
+        settings.books_default_limit,
+        ge=1,
+        le=settings.books_max_limit,
+        description="Maximum number of books in the response"
+    ),
+    cursor: Optional[str] = Query(None, description="Cursor from the `X-Next-Cursor` header of the previous page"),
+    sort: Literal["id", "title", "first_publish_year"] = Query("id", description="Sort field"),
+    order: Literal["asc", "desc"] = Query("asc", description="Sort direction"),
+    include_total: bool = Query(
+        False,
+        description="Add an approximate number of matching books in the `X-Total-Count-Estimate` header"
+    ),
+    stream: Optional[Literal["ndjson", "json"]] = Query(
+        None,
+        description="Stream all matching books (no `limit`) as NDJSON or as a JSON array"
+    ),
+    db=Depends(get_read_db),
+    cache: Optional[ListingCache] = Depends(get_listing_cache)
+):
+    service = BookService(db)
+    if stream == "ndjson" or (stream is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", "")):
+        media_type = NDJSON_MEDIA_TYPE
+    elif stream == "json":
+        media_type = "application/json"
+    else:
+        media_type = None
+
+    version, headers, not_modified = await catalog_validators(request, service, media_type or "")
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if media_type:
+        chunks = service.stream_books(
+            author=author,
+            title=title,
+            search=search,
+            min_similarity=min_similarity,
+            cursor=cursor,
+            sort=sort,
+            order=order,
+            media_type=media_type,
+            language=language
+        )
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+    page = await service.get_serialized_books(
+        version,
+        cache,
+        author=author,
+        title=title,
+        search=search,
+        min_similarity=min_similarity,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        include_total=include_total,
+        language=language
+    )
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    if page.total_estimate is not None:
+        headers["X-Total-Count-Estimate"] = str(page.total_estimate)
+    return Response(page.body, media_type="application/json", headers=headers)
+
+
+@router.get("/facets",
+            response_model=BookFacetsResponse,
+            summary="Count books by language, decade, ebook access and author",
+            description=GET_BOOK_FACETS_DESCRIPTION)
+async def get_book_facets(
+    request: Request,
+    response: Response,
     author: Optional[str] = Query(None, description="Filter by author name"),
     title: Optional[str] = Query(None, description="Filter by book title"),
-    db=Depends(get_db)
+    language: Optional[str] = Query(None, min_length=1, description="Filter by language code, e.g. `eng`"),
+    limit: int = Query(
+        settings.facets_default_limit,
+        ge=1,
+        le=settings.facets_max_limit,
+        description="Maximum number of values per facet, the most frequent first"
+    ),
+    db=Depends(get_read_db)
 ):
     service = BookService(db)
-    return service.get_books(author=author, title=title)
+    _, headers, not_modified = await catalog_validators(request, service, "facets")
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return await service.get_facets(author=author, title=title, language=language, limit=limit)
@@ -1,24 +1,72 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request, Response, status
 
-from app.api.descriptions import HEALTH_DESCRIPTION
-from app.models.schemas import HealthResponse
+from app.api.descriptions import (
+    BOOKS_CACHE_STATS_DESCRIPTION, CACHE_STATS_DESCRIPTION, HEALTH_DESCRIPTION, LIVENESS_DESCRIPTION,
+    OPENLIBRARY_STATS_DESCRIPTION, READINESS_DESCRIPTION
+)
+from app.core.instrumentation import TimedRoute
+from app.dependencies.health import get_health_prober
+from app.models.schemas import (
+    CacheStatsResponse, HealthResponse, ListingCacheStatsResponse, OpenLibraryStatsResponse, ProbeResponse
+)
+from app.services.health_prober import HealthProber
 
-import requests
 
-
-router = APIRouter(prefix="/health", tags=["Health"])
+router = APIRouter(prefix="/health", tags=["Health"], route_class=TimedRoute)
 
 
 @router.get("",
             response_model=HealthResponse,
             summary="Check application and external API status.",
             description=HEALTH_DESCRIPTION)
-async def health():
-    statuses_dict = {"app_status": "ok", "external_api_status": "ok"}
-    try:
-        response = requests.get("http://openlibrary.org/books/OL1M.json?m=history", timeout=3)
-        if response.status_code != 200:
-            statuses_dict["external_api_status"] = "failed"
-    except requests.exceptions.RequestException:
-        statuses_dict["external_api_status"] = "failed"
-    return statuses_dict
+async def health(prober: HealthProber = Depends(get_health_prober)):
+    return prober.snapshot
+
+
+@router.get("/live",
+            response_model=ProbeResponse,
+            summary="Liveness probe.",
+            description=LIVENESS_DESCRIPTION)
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready",
+            response_model=ProbeResponse,
+            summary="Readiness probe.",
+            description=READINESS_DESCRIPTION)
+async def ready(response: Response, prober: HealthProber = Depends(get_health_prober)):
+    if not prober.is_ready():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "unavailable"}
+    return {"status": "ok"}
+
+
+@router.get("/cache",
+            response_model=CacheStatsResponse,
+            summary="OpenLibrary response cache statistics.",
+            description=CACHE_STATS_DESCRIPTION)
+async def cache_stats(request: Request):
+    cache = request.app.state.openlibrary_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/cache/books",
+            response_model=ListingCacheStatsResponse,
+            summary="GET /books page cache statistics.",
+            description=BOOKS_CACHE_STATS_DESCRIPTION)
+async def books_cache_stats(request: Request):
+    cache = request.app.state.listing_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/openlibrary",
+            response_model=OpenLibraryStatsResponse,
+            summary="OpenLibrary client resilience statistics.",
+            description=OPENLIBRARY_STATS_DESCRIPTION)
+async def openlibrary_stats(request: Request):
+    return request.app.state.openlibrary_transport.stats()
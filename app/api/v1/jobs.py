@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.api.descriptions import GET_JOB_DESCRIPTION, INGEST_DESCRIPTION
+from app.core.instrumentation import TimedRoute
+from app.dependencies.db import get_db
+from app.dependencies.ingest import get_ingest_worker_pool
+from app.models.schemas import AuthorRequest, IngestJobResponse
+from app.services.ingest_job_manager import IngestJobManager
+from app.services.ingest_worker_pool import IngestWorkerPool
+
+router = APIRouter(tags=["Ingest"], route_class=TimedRoute)
+
+
+@router.post("/ingest",
+             response_model=IngestJobResponse,
+             status_code=status.HTTP_202_ACCEPTED,
+             summary="Queue fetching and storing books of an author.",
+             description=INGEST_DESCRIPTION)
+async def ingest(
+    request: AuthorRequest,
+    response: Response,
+    pool: IngestWorkerPool = Depends(get_ingest_worker_pool)
+):
+    job = await pool.submit(request.author)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return IngestJobManager.to_response(job)
+
+
+@router.get("/jobs/{job_id}",
+            response_model=IngestJobResponse,
+            summary="Check the state of an ingestion job.",
+            description=GET_JOB_DESCRIPTION)
+async def get_job(job_id: str, db=Depends(get_db)):
+    job = await IngestJobManager(db).get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return IngestJobManager.to_response(job)
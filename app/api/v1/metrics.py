@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.descriptions import METRICS_DESCRIPTION
+from app.core.instrumentation import TimedRoute
+from app.core.metrics import registry
+
+
+router = APIRouter(tags=["Health"], route_class=TimedRoute)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics",
+            response_class=PlainTextResponse,
+            summary="Prometheus metrics.",
+            description=METRICS_DESCRIPTION)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,15 +1,19 @@
 from fastapi import APIRouter
 from .books import router as books_router
 from .health import router as health_router
+from .jobs import router as jobs_router
+from .metrics import router as metrics_router
 
 
 """
 Main API router module.
 
 This module aggregates and includes all sub-routers
-(e.g., Books, Health) into a single API router for the application.
+(e.g., Books, Health, Ingest, Metrics) into a single API router for the application.
 """
 
 router = APIRouter()
 router.include_router(books_router)
 router.include_router(health_router)
+router.include_router(jobs_router)
+router.include_router(metrics_router)
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Optional
+
+import httpx
+
+from app.core.settings import settings
+
+
+def create_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Creates the application-wide `httpx.AsyncClient` used for OpenLibrary calls.
+
+    The client is created once in the application lifespan and shared by all requests,
+    so TCP/TLS connections are kept alive and reused. Pool limits, keep-alive, HTTP/2
+    and timeouts come from `Settings`.
+
+    Args:
+        transport (Optional[httpx.AsyncBaseTransport]): Transport to send requests with,
+            e.g. a `ResilientTransport`. It then owns the pool limits and HTTP/2 setting.
+    """
+    return httpx.AsyncClient(
+        base_url=settings.openlibrary_base_url,
+        http2=settings.http2,
+        timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        ),
+        transport=transport
+    )
+
+
+async def warm_up_client(client: httpx.AsyncClient, connections: int, path: str) -> int:
+    """
+    Sends `connections` concurrent GET requests to `path`, so connections to OpenLibrary
+    are opened (DNS, TCP and TLS handshakes done) and kept alive before the first request.
+
+    With HTTP/2 the requests usually share a single multiplexed connection.
+
+    Returns:
+        int: Number of requests answered (with any status).
+    """
+    results = await asyncio.gather(
+        *(client.get(path) for _ in range(connections)),
+        return_exceptions=True
+    )
+    return sum(isinstance(result, httpx.Response) for result in results)
@@ -1,28 +1,43 @@
+import asyncio
+import math
+from typing import AsyncIterator, Callable, Optional
+
 import httpx
 from fastapi import HTTPException
 
+from app.clients.response_cache import ResponseCache
 from app.core.settings import settings
+from app.core.text import normalize_name
 
 class OpenLibraryAPIClient:
     """
     Client for interacting with the OpenLibrary API.
 
     This class provides methods to query the OpenLibrary API for books
-    and handle HTTP errors gracefully. It uses a persistent `httpx.Client`
-    for better performance and connection reuse.
+    and handle HTTP errors gracefully. It uses the application-wide
+    `httpx.AsyncClient` for connection reuse across requests and, when given one,
+    a `ResponseCache` keyed by the normalized author name.
     """
-    BASE_URL = settings.openlibrary_base_url
+    SEARCH_FIELDS = ("title", "author_name", "ebook_access", "first_publish_year", "language", "key")
 
-    def __init__(self):
-        """Initializes the HTTP client with a base URL and a default timeout."""
-        self.client = httpx.Client(base_url=self.BASE_URL, timeout=5.0)
+    def __init__(self, client: httpx.AsyncClient, cache: Optional[ResponseCache] = None, revalidate: bool = False):
+        """
+        Args:
+            client (httpx.AsyncClient): Shared HTTP client created in the application lifespan.
+            cache (Optional[ResponseCache]): Cache of search responses. Disabled when None.
+            revalidate (bool): Revalidate fresh cached responses with upstream as well, so a
+                fetch always reflects OpenLibrary (e.g. for background refreshes).
+        """
+        self.client = client
+        self.cache = cache
+        self.revalidate = revalidate
 
-    def fetch_books_by_author(self, author_name: str):
+    async def fetch_books_by_author(self, author_name: str):
         """
         Fetches books from the OpenLibrary API by a given author's name.
 
         Sends a GET request to the `/search.json` endpoint with the `author` parameter
-        and returns a list of matching book records from the API response.
+        and returns a list of matching book records from the first page of the API response.
 
         Args:
             author_name (str): Name of the author whose books should be fetched.
@@ -36,20 +51,123 @@ class OpenLibraryAPIClient:
                 - 503 if the OpenLibrary service is unavailable or the request fails.
                 - With the corresponding status code if the API returns an HTTP error.
         """
+        data = await self._search(author_name)
+        if not data.get("docs"):
+            raise HTTPException(status_code=404, detail=f"No books found for author '{author_name}'")
+        return data.get("docs", [])
+
+    async def iter_books_by_author(
+        self,
+        author_name: str,
+        page_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        on_num_found: Optional[Callable[[int], None]] = None
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Fetches the whole bibliography of an author, page by page.
+
+        The first page is requested on its own to read `numFound`; the remaining pages
+        are then requested concurrently (at most `max_concurrency` at a time) and each
+        page's docs are yielded as soon as that page arrives, so pages may come out of order.
+
+        Args:
+            author_name (str): Name of the author whose books should be fetched.
+            page_size (Optional[int]): Number of docs per page. Defaults to settings.
+            max_concurrency (Optional[int]): Maximum number of pages fetched at once.
+                Defaults to settings.
+            on_num_found (Optional[Callable[[int], None]]): Called with `numFound` of the first page.
+
+        Yields:
+            list[dict]: Docs of a single page.
+
+        Raises:
+            HTTPException: Same as `fetch_books_by_author`.
+        """
+        page_size = page_size or settings.openlibrary_page_size
+        max_concurrency = max_concurrency or settings.openlibrary_max_concurrency
+
+        first_page = await self._search(author_name, page=1, limit=page_size)
+        if not first_page.get("docs"):
+            raise HTTPException(status_code=404, detail=f"No books found for author '{author_name}'")
+        if on_num_found is not None:
+            on_num_found(first_page.get("numFound", 0))
+        yield first_page["docs"]
+
+        total_pages = min(
+            math.ceil(first_page.get("numFound", 0) / page_size),
+            settings.openlibrary_max_pages
+        )
+        if total_pages <= 1:
+            return
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch_page(page: int) -> dict:
+            async with semaphore:
+                return await self._search(author_name, page, page_size)
+
+        tasks = [asyncio.create_task(fetch_page(page)) for page in range(2, total_pages + 1)]
         try:
-            response = self.client.get(
-                "/search.json",
-                params={"author": author_name}
-            )
-            response.raise_for_status()
+            for next_page in asyncio.as_completed(tasks):
+                yield (await next_page).get("docs", [])
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _search(self, author_name: str, page: Optional[int] = None, limit: Optional[int] = None) -> dict:
+        """
+        Sends a single `/search.json` request, asking only for the fields we store.
 
-            data = response.json()
-            if not data.get("docs"):
-                raise HTTPException(status_code=404, detail=f"No books found for author '{author_name}'")
-            return data.get("docs", [])
+        Fresh cached responses are returned without a request, unless the client
+        `revalidate`s. Expired ones are revalidated with `If-None-Match`/`If-Modified-Since`
+        when upstream sent validators.
+
+        Raises:
+            HTTPException:
+                - 503 if the OpenLibrary service is unavailable or the request fails.
+                - With the corresponding status code if the API returns an HTTP error.
+        """
+        params = {"author": author_name, "fields": ",".join(self.SEARCH_FIELDS)}
+        if page is not None:
+            params["page"] = page
+        if limit is not None:
+            params["limit"] = limit
+
+        cache_key = f"{normalize_name(author_name)}|{page or 1}|{limit or ''}"
+        entry = await self.cache.get(cache_key) if self.cache else None
+        if entry is not None and entry.is_fresh() and not self.revalidate:
+            return entry.body
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = await self.client.get("/search.json", params=params, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                await self.cache.refresh(cache_key, entry)
+                return entry.body
+            if response.status_code == 404:
+                data = {"numFound": 0, "docs": []}
+            else:
+                response.raise_for_status()
+                data = response.json()
 
         except httpx.RequestError as e:
             raise HTTPException(status_code=503, detail=f"OpenLibrary unavailable: {e}")
 
         except httpx.HTTPStatusError as e:
             raise HTTPException(status_code=e.response.status_code, detail=f"OpenLibrary API error: {e}")
+
+        if self.cache:
+            await self.cache.set(
+                cache_key,
+                data,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return data
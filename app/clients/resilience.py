@@ -0,0 +1,293 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from app.core.instrumentation import record_upstream
+from app.core.metrics import observe_openlibrary
+from app.core.settings import settings
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Upstream answers that mean "try again later" rather than "your request is wrong".
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` requests per second with bursts of up to `burst`.
+
+    `acquire` waits until a token is available. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        Takes one token, waiting for it if necessary.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        async with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+            self.tokens = 0.0
+            self.updated = self.clock()
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures.
+
+    While open, calls are rejected for `reset_timeout` seconds. The breaker then turns
+    half-open and lets a single probe call through: its success closes the circuit, its
+    failure opens it again. State transitions are counted in `transitions`.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.transitions: Dict[str, int] = {CIRCUIT_CLOSED: 0, CIRCUIT_OPEN: 0, CIRCUIT_HALF_OPEN: 0}
+
+    def allow(self) -> bool:
+        """Returns True if a call may be sent now; reserves the probe slot when half-open."""
+        if self.state == CIRCUIT_OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._transition(CIRCUIT_HALF_OPEN)
+        if self.state == CIRCUIT_CLOSED:
+            return True
+        if self.state == CIRCUIT_HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.probe_in_flight = False
+        if self.state != CIRCUIT_CLOSED:
+            self._transition(CIRCUIT_CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN or (
+                self.state == CIRCUIT_CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = self.clock()
+            self._transition(CIRCUIT_OPEN)
+
+    def release(self):
+        """Frees the probe slot of a call that ended without an outcome, e.g. was cancelled."""
+        self.probe_in_flight = False
+
+    def _transition(self, state: str):
+        self.state = state
+        self.transitions[state] += 1
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    `httpx` transport that adds retries, a circuit breaker and a rate limiter to another transport.
+
+    Idempotent requests that fail with a transport error or a retryable status (429,
+    502, 503, 504) are retried up to `max_attempts` times with capped exponential
+    backoff and full jitter; a `Retry-After` header sets the minimum delay. Every
+    attempt takes a token from the shared `TokenBucket` and is reported to the
+    `CircuitBreaker`; while the circuit is open, requests fail with `CircuitOpenError`
+    without reaching the network.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[TokenBucket] = None,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        max_retry_after: float = 30.0,
+        jitter: Callable[[float, float], float] = random.uniform,
+        sleep: Callable[[float], object] = asyncio.sleep
+    ):
+        """
+        Args:
+            transport (httpx.AsyncBaseTransport): Transport that sends the requests.
+            breaker (Optional[CircuitBreaker]): Circuit breaker. Disabled when None.
+            limiter (Optional[TokenBucket]): Rate limiter. Disabled when None.
+            max_attempts (int): Attempts per request, including the first one.
+            base_delay (float): Backoff before the first retry, doubled for every next one.
+            max_delay (float): Upper bound of the backoff.
+            max_retry_after (float): Longest `Retry-After` honoured; a longer one is not retried.
+            jitter (Callable[[float, float], float]): Picks the delay between its bounds.
+            sleep (Callable[[float], Awaitable]): Sleep function, replaceable in tests.
+        """
+        self.transport = transport
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.jitter = jitter
+        self.sleep = sleep
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "rate_limited": 0,
+        }
+        self.rate_limited_seconds = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        error = "cancelled"
+        try:
+            response = await self._send(request)
+        except CircuitOpenError:
+            error = "circuit_open"
+            raise
+        except httpx.TransportError:
+            error = "transport"
+            raise
+        else:
+            error = str(response.status_code) if response.status_code >= 500 or response.status_code == 429 else None
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            observe_openlibrary(request.url.path, elapsed, error)
+            record_upstream(elapsed)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        retryable = request.method in IDEMPOTENT_METHODS
+        attempt = 1
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                self.counters["short_circuited"] += 1
+                raise CircuitOpenError("OpenLibrary circuit breaker is open", request=request)
+            try:
+                if self.limiter is not None:
+                    waited = await self.limiter.acquire()
+                    if waited:
+                        self.counters["rate_limited"] += 1
+                        self.rate_limited_seconds += waited
+                self.counters["requests"] += 1
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                self._record(False)
+                if not retryable or attempt >= self.max_attempts:
+                    raise
+                delay = self._backoff(attempt)
+            except BaseException:
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            else:
+                failed = response.status_code in RETRYABLE_STATUS_CODES
+                self._record(not failed)
+                if not failed or not retryable or attempt >= self.max_attempts:
+                    return response
+                retry_after = self._retry_after(response)
+                if retry_after is not None and retry_after > self.max_retry_after:
+                    return response
+                delay = max(self._backoff(attempt), retry_after or 0.0)
+                await response.aclose()
+
+            self.counters["retries"] += 1
+            attempt += 1
+            await self.sleep(delay)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> dict:
+        """Returns the request counters and the circuit breaker state."""
+        stats = dict(self.counters, rate_limited_seconds=round(self.rate_limited_seconds, 3))
+        if self.breaker is not None:
+            stats["circuit_state"] = self.breaker.state
+            stats["circuit_transitions"] = dict(self.breaker.transitions)
+        return stats
+
+    def _record(self, ok: bool):
+        if not ok:
+            self.counters["failures"] += 1
+        if self.breaker is not None:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.jitter(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            # "-0000" dates parse as naive; RFC 9110 dates are in UTC
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def create_resilient_transport() -> ResilientTransport:
+    """Builds the OpenLibrary `ResilientTransport` from `Settings`."""
+    limiter = None
+    if settings.openlibrary_rate_limit > 0:
+        limiter = TokenBucket(settings.openlibrary_rate_limit, settings.openlibrary_rate_burst)
+    return ResilientTransport(
+        httpx.AsyncHTTPTransport(
+            http2=settings.http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry
+            )
+        ),
+        breaker=CircuitBreaker(
+            settings.openlibrary_breaker_failure_threshold,
+            settings.openlibrary_breaker_reset_timeout
+        ),
+        limiter=limiter,
+        max_attempts=settings.openlibrary_retry_attempts,
+        base_delay=settings.openlibrary_retry_base_delay,
+        max_delay=settings.openlibrary_retry_max_delay,
+        max_retry_after=settings.openlibrary_retry_after_max
+    )
@@ -0,0 +1,217 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import anyio
+
+from app.core.settings import settings
+
+
+@dataclass
+class CacheEntry:
+    """A cached OpenLibrary response together with its HTTP validators."""
+    body: dict
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: int = 0
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class MemoryCacheBackend:
+    """In-process LRU store bounded by entry count and approximate size in bytes."""
+
+    # Operations are cheap and do no I/O, so they run on the event loop.
+    blocking = False
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def close(self):
+        self.clear()
+
+
+class SqliteCacheBackend:
+    """
+    On-disk LRU store kept in a SQLite file, so cached responses survive restarts.
+
+    Recency is tracked with a `last_access` column; the least recently used rows are
+    deleted whenever the entry count or the total size exceeds the limits.
+    """
+
+    # Operations wait for disk I/O and the lock, so `ResponseCache` runs them in a worker thread.
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires_at, etag, last_modified, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        body, expires_at, etag, last_modified, size = row
+        return CacheEntry(json.loads(body), expires_at, etag, last_modified, size)
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(entry.body), entry.expires_at, entry.etag, entry.last_modified,
+                 entry.size, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        entries, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while entries > self.max_entries or total_bytes > self.max_bytes:
+            key, size = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            entries -= 1
+            total_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total_bytes, "evictions": self.evictions}
+
+    def close(self):
+        self._conn.close()
+
+
+class ResponseCache:
+    """
+    TTL cache of OpenLibrary search responses on top of a LRU backend.
+
+    Empty results (the "no books found" case) are cached as well, with a shorter
+    negative TTL. Expired entries are kept so their `ETag`/`Last-Modified` validators
+    can be used to revalidate them with a conditional request. Operations of a
+    `blocking` backend run in a worker thread, so they do not stall the event loop.
+    """
+
+    def __init__(self, backend, ttl: float, negative_ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Returns the entry stored under `key`, fresh or expired, and records a hit or a miss."""
+        entry = await self._call(self.backend.get, key)
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    async def set(self, key: str, body: dict, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        ttl = self.ttl if body.get("docs") else self.negative_ttl
+        size = len(json.dumps(body))
+        await self._call(self.backend.set, key, CacheEntry(body, time.time() + ttl, etag, last_modified, size))
+
+    async def refresh(self, key: str, entry: CacheEntry):
+        """Extends the lifetime of an entry that upstream confirmed as unchanged (HTTP 304)."""
+        self.revalidations += 1
+        await self.set(key, entry.body, entry.etag, entry.last_modified)
+
+    async def _call(self, operation, *args):
+        if self.backend.blocking:
+            return await anyio.to_thread.run_sync(operation, *args)
+        return operation(*args)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            **self.backend.stats(),
+        }
+
+    def close(self):
+        self.backend.close()
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Builds the OpenLibrary response cache configured in `Settings`, or None when disabled."""
+    if settings.openlibrary_cache_backend == "none":
+        return None
+    if settings.openlibrary_cache_backend == "sqlite":
+        backend = SqliteCacheBackend(
+            settings.openlibrary_cache_path,
+            settings.openlibrary_cache_max_entries,
+            settings.openlibrary_cache_max_bytes
+        )
+    else:
+        backend = MemoryCacheBackend(
+            settings.openlibrary_cache_max_entries,
+            settings.openlibrary_cache_max_bytes
+        )
+    return ResponseCache(
+        backend,
+        ttl=settings.openlibrary_cache_ttl,
+        negative_ttl=settings.openlibrary_cache_negative_ttl
+    )
@@ -0,0 +1,69 @@
+"""
+Response compression negotiated from `Accept-Encoding`.
+
+Brotli is preferred when the client accepts it and the optional `brotli` package is
+installed; gzip is used otherwise. Bodies smaller than `RESPONSE_COMPRESSION_MINIMUM_SIZE`
+bytes are sent as they are. Streaming responses are compressed chunk by chunk.
+"""
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only
+    brotli = None
+
+# Bodies at least this large are compressed in a worker thread, as GZipMiddleware does.
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Returns True when an `Accept-Encoding` header lists `encoding` without `q=0`."""
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self.compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self.compressor is None:
+            self.compressor = brotli.Compressor(quality=self.quality)
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress, body, more_body)
+        return self._compress(body, more_body)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self.compressor.process(body)
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """`GZipMiddleware` that answers with Brotli when the client and the installation support it."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        """
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size (int): Smallest body, in bytes, that is compressed.
+            gzip_level (int): gzip compression level, 1 (fastest) to 9 (smallest).
+            brotli_quality (int): Brotli quality, 0 (fastest) to 11 (smallest).
+        """
+        super().__init__(app, minimum_size=minimum_size, compresslevel=gzip_level)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and brotli is not None and \
+                accepts_encoding(Headers(scope=scope).get("accept-encoding", ""), "br"):
+            await BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,20 +1,171 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import configure_mappers, declarative_base
+from app.core.instrumentation import instrument_engine
+from app.core.replicas import ReplicaRouter
 from app.core.settings import settings
 
 
-# SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True
+def async_database_url(url: str) -> str:
+    """Returns `url` with the asyncpg driver, e.g. for a plain `postgresql://` URL."""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+def create_database_engine(url: str) -> AsyncEngine:
+    """Creates an instrumented asyncpg engine for `url` with the pool settings of the application."""
+    database_engine = create_async_engine(
+        async_database_url(url),
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args={
+            # asyncpg's own prepared statement cache; set both caches to 0 behind pgbouncer
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+        }
+    )
+    instrument_engine(database_engine.sync_engine)
+    return database_engine
+
+
+# SQLAlchemy async engine (asyncpg) of the primary
+engine = create_database_engine(settings.database_url)
+
+# Read replicas, used by read-only endpoints through `read_router`
+read_router = ReplicaRouter(
+    engine,
+    {f"replica-{i}": create_database_engine(url) for i, url in enumerate(settings.replica_urls)},
+    settings.db_replica_selection
 )
 
 # Factory for creating database sessions
-SessionLocal = sessionmaker(
-    autocommit=False,
+SessionLocal = async_sessionmaker(
+    bind=engine,
     autoflush=False,
-    bind=engine
+    expire_on_commit=False
 )
 
 # Base class for declarative models
 Base = declarative_base()
+
+
+class LockTimeoutError(Exception):
+    """Raised by `advisory_lock` when the lock is not granted in time."""
+
+
+# First key of the two-key advisory locks taken by `advisory_lock`, so they do not clash
+# with advisory locks of other applications sharing the database.
+ADVISORY_LOCK_NAMESPACE = 0x4C49  # "LI"
+
+# SQLSTATEs of a lock wait cut short by `lock_timeout` (lock_not_available) or
+# `statement_timeout` (query_canceled).
+LOCK_TIMEOUT_SQLSTATES = {"55P03", "57014"}
+
+
+@asynccontextmanager
+async def advisory_lock(key: str, timeout: Optional[float] = None,
+                        bind: Optional[AsyncEngine] = None) -> AsyncIterator[AsyncConnection]:
+    """
+    Holds a Postgres session-level advisory lock on `key` for the duration of the block.
+
+    Yields the pool connection holding the lock, for the block to do its work on (e.g.
+    `SessionLocal(bind=conn)`), so a lock holder uses one connection instead of two. The
+    lock survives commits and rollbacks on it and is released by the server if the
+    process dies. Waits for a lock held by another process or node.
+
+    Releasing is shielded from cancellation. If it fails, or the caller is cancelled
+    while waiting for the lock, the connection is invalidated instead of returned to the
+    pool, so the server drops the lock with it.
+
+    Args:
+        key (str): Name of the locked resource; hashed into the lock id with `hashtext`.
+        timeout (Optional[float]): Seconds to wait for the lock. Waits forever when None.
+        bind (Optional[AsyncEngine]): Engine to lock on. Defaults to the application engine.
+
+    Yields:
+        AsyncConnection: Connection holding the lock, not in a transaction.
+
+    Raises:
+        LockTimeoutError: If the lock is not granted within `timeout`.
+    """
+    lock_id = (ADVISORY_LOCK_NAMESPACE, func.hashtext(key))
+    async with (bind or engine).connect() as conn:
+        try:
+            if timeout is not None:
+                # Local to this transaction, so the block runs without it.
+                await conn.execute(select(func.set_config("lock_timeout", f"{int(timeout * 1000)}ms", True)))
+            await conn.execute(select(func.pg_advisory_lock(*lock_id)))
+        except DBAPIError as e:
+            await conn.rollback()
+            if timeout is None or getattr(e.orig, "sqlstate", None) not in LOCK_TIMEOUT_SQLSTATES:
+                raise
+            raise LockTimeoutError(f"Lock {key!r} was not granted within {timeout} seconds") from e
+        except BaseException:
+            # e.g. cancelled: the lock may have been granted anyway
+            await conn.invalidate()
+            raise
+        await conn.commit()
+        try:
+            yield conn
+        finally:
+            release = asyncio.ensure_future(_release_advisory_lock(conn, lock_id))
+            try:
+                await asyncio.shield(release)
+            except asyncio.CancelledError:
+                try:
+                    await release
+                except BaseException:
+                    await conn.invalidate()
+                raise
+            except BaseException:
+                await conn.invalidate()
+                raise
+
+
+async def _release_advisory_lock(conn: AsyncConnection, lock_id: tuple):
+    if conn.in_transaction():
+        await conn.rollback()
+    await conn.execute(select(func.pg_advisory_unlock(*lock_id)))
+    await conn.commit()
+
+
+async def warm_up_pool(connections: int, warm_up: Optional[Callable[[AsyncConnection], Awaitable]] = None,
+                       bind: Optional[AsyncEngine] = None) -> int:
+    """
+    Opens up to `connections` pool connections at once, runs `warm_up` on each and returns
+    them to the pool, so the first requests do not pay for connecting. Also configures the
+    ORM mappers, which SQLAlchemy otherwise does on the first query.
+
+    asyncpg prepares statements and introspects non-builtin column types (e.g. arrays)
+    per connection, which makes the first query of a kind on a fresh connection several
+    times slower; a `warm_up` running the hot queries moves that cost to startup.
+
+    At most `pool_size` connections are opened: overflow connections would be closed
+    again when returned.
+
+    Args:
+        connections (int): Number of connections to open.
+        warm_up (Optional[Callable[[AsyncConnection], Awaitable]]): Run on every opened
+            connection. Defaults to `SELECT 1`.
+        bind (Optional[AsyncEngine]): Engine to warm up. Defaults to the application engine.
+
+    Returns:
+        int: Number of connections opened.
+    """
+    configure_mappers()
+    bind = bind or engine
+    connections = min(connections, bind.sync_engine.pool.size())
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(*(stack.enter_async_context(bind.connect()) for _ in range(connections)))
+        await asyncio.gather(*(
+            warm_up(conn) if warm_up is not None else conn.execute(text("SELECT 1")) for conn in opened
+        ))
+    return connections
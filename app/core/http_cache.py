@@ -0,0 +1,79 @@
+"""
+Conditional GET helpers: validators derived from the catalog version and the headers
+that let browsers, reverse proxies and CDNs reuse listing responses.
+
+The catalog version only changes when books are stored, so `ETag` = version + request
+parameters identifies a listing response until the next ingest. A revalidation with a
+matching `If-None-Match` is answered with 304 after one primary-key lookup, without
+querying the books tables.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from app.core.settings import settings
+
+
+def make_etag(version: int, params: Iterable[tuple[str, str]], variant: str = "") -> str:
+    """
+    Builds a weak `ETag` for a response of catalog `version`.
+
+    The tag is weak because the same representation may be sent with different content
+    encodings.
+
+    Args:
+        version (int): Catalog version the response was built from.
+        params (Iterable[tuple[str, str]]): Query parameters of the request; their order does not matter.
+        variant (str): Anything else the body depends on, e.g. the streaming media type.
+
+    Returns:
+        str: The tag, e.g. `W/"42-1f3a9c0e5b7d2a64"`.
+    """
+    digest = hashlib.sha1(repr((sorted(params), variant)).encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Returns True when an `If-None-Match` header lists `etag` (compared weakly) or is `*`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """Returns True when `last_modified` is not later than an `If-Modified-Since` date (second precision)."""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def http_date(value: datetime) -> str:
+    """Formats a timezone-aware datetime as an HTTP date, e.g. for `Last-Modified`."""
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def cache_control(private: bool = False) -> str:
+    """
+    Returns the `Cache-Control` value of book listings.
+
+    Shared caches keep a response for `BOOKS_CACHE_SHARED_MAX_AGE` seconds and may serve
+    it stale for `BOOKS_CACHE_STALE_WHILE_REVALIDATE` more while they revalidate it;
+    browsers keep it for `BOOKS_CACHE_MAX_AGE` seconds. `private` responses (e.g. for a
+    client that must read its own writes) are only revalidated by the browser.
+    """
+    if private:
+        return "private, no-cache"
+    return (
+        f"public, max-age={settings.books_cache_max_age}, s-maxage={settings.books_cache_shared_max_age}, "
+        f"stale-while-revalidate={settings.books_cache_stale_while_revalidate}"
+    )
@@ -0,0 +1,206 @@
+"""
+Per-request instrumentation: SQL statement counts and timings, upstream time, a
+slow-query log and the `Server-Timing` response header.
+
+`ServerTimingMiddleware` puts a fresh `RequestStats` in a context variable for every
+request. SQLAlchemy engine events, the OpenLibrary transport, `TimedRoute` and
+endpoints that serialize their own response (`record_serialization`) add to it, and the middleware reports the totals in the `Server-Timing` header, e.g.
+
+    Server-Timing: db;dur=3.1;desc="2 queries", upstream;dur=0.0, serialization;dur=0.4, total;dur=5.2
+
+Work outside a request (e.g. background ingestion workers) is not counted, but its
+slow queries are still logged.
+"""
+import functools
+import inspect
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import greenlet
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class RequestStats:
+    """Time spent by one request in the database, upstream calls and response serialization."""
+    __slots__ = (
+        "queries", "db_seconds", "upstream_calls", "upstream_seconds", "serialization_seconds", "endpoint_finished"
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.endpoint_finished: Optional[float] = None
+
+    def server_timing(self, total_seconds: float, now: float) -> str:
+        """Formats the stats as a `Server-Timing` header value; durations are in milliseconds."""
+        metrics = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'upstream;dur={self.upstream_seconds * 1000:.1f};desc="{self.upstream_calls} calls"',
+        ]
+        serialization = self.serialization_seconds
+        if self.endpoint_finished is not None:
+            serialization += now - self.endpoint_finished
+        if serialization or self.endpoint_finished is not None:
+            metrics.append(f"serialization;dur={serialization * 1000:.1f}")
+        metrics.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[RequestStats]:
+    """
+    Counts the SQL statements run inside the block, e.g. to check the query budget of a
+    service method in a benchmark or test.
+
+    Yields:
+        RequestStats: Stats updated while the block runs.
+    """
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def record_upstream(seconds: float):
+    """Adds an external API call to the stats of the current request."""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.upstream_calls += 1
+        stats.upstream_seconds += seconds
+
+
+def record_serialization(seconds: float):
+    """Adds response encoding done by the endpoint itself (e.g. a pre-serialized body) to the current request."""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.serialization_seconds += seconds
+
+
+def instrument_engine(engine: Engine):
+    """Registers the statement counting and slow-query logging hooks on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if 0 < settings.slow_query_threshold <= elapsed:
+        logger.warning(
+            "Slow query (%.1f ms) at %s: %s; parameters: %s",
+            elapsed * 1000, _caller_location(), statement, redact_parameters(parameters, executemany)
+        )
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Replaces statement parameter values with their type names, keeping the structure."""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} rows of {redact_parameters(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return tuple(f"<{type(value).__name__}>" for value in parameters)
+    return f"<{type(parameters).__name__}>"
+
+
+def _caller_location() -> str:
+    """
+    Returns `path:line in function` of the innermost application frame that ran the query.
+
+    With the asyncio extension, SQLAlchemy runs the statement in a greenlet whose stack
+    holds only SQLAlchemy frames; the application coroutines are on the stack of the
+    parent greenlet, so the search continues there.
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(APP_DIR) and filename != __file__:
+                return f"{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+class TimedRoute(APIRoute):
+    """
+    `APIRoute` that records when the endpoint returned, so the time FastAPI then spends
+    validating and serializing the response shows up in `Server-Timing`.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _mark_finished(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _mark_finished(endpoint):
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            stats = current_stats.get()
+            if stats is not None:
+                stats.endpoint_finished = time.perf_counter()
+    return timed_endpoint
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware collecting `RequestStats` for every request and sending them in `Server-Timing`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(now - started, now))
+            await send(message)
+
+        token = current_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
@@ -0,0 +1,101 @@
+"""
+In-process cache of serialized GET /books pages.
+
+Entries are kept per catalog version: `get` and `set` take the version the request
+read from `catalog_version` (the same read that gives the `ETag`), and a page is only
+served to a request that read the version it was cached for. The first request that
+sees a newer version drops every entry, so a page is never served after the catalog
+changed, in any worker. The version is read before the page, so a cached page is never
+older than its version. Requests reading an older version (e.g. from a lagging replica)
+are neither served nor cached.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import orjson
+
+from app.clients.response_cache import MemoryCacheBackend
+from app.core.settings import settings
+
+
+@dataclass
+class CachedListing:
+    """A serialized GET /books page with the values of its paging headers."""
+    body: bytes
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
+    size: int = 0
+
+
+def listing_key(**params) -> str:
+    """
+    Returns the cache key of a GET /books page: the parsed query parameters with their
+    defaults, independent of their order in the URL. Empty filters count as missing and
+    `min_similarity` only counts with `search`.
+    """
+    for name in ("author", "title", "language", "search"):
+        params[name] = params.get(name) or None
+    if params["search"] is None:
+        params.pop("min_similarity", None)
+    return orjson.dumps(params, option=orjson.OPT_SORT_KEYS).decode()
+
+
+class ListingCache:
+    """LRU cache of `CachedListing`s of the current catalog version, bounded by entries and bytes."""
+
+    def __init__(self, backend: MemoryCacheBackend):
+        self.backend = backend
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, version: int, key: str) -> Optional[CachedListing]:
+        """Returns the page cached under `key` for `version`, and records a hit or a miss."""
+        self._observe(version)
+        entry = self.backend.get(key) if version == self.version else None
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def set(self, version: int, key: str, body: bytes, next_cursor: Optional[str] = None,
+            total_estimate: Optional[int] = None):
+        self._observe(version)
+        if version != self.version:
+            return
+        size = len(body) + len(key) + len(next_cursor or "")
+        self.backend.set(key, CachedListing(body, next_cursor, total_estimate, size))
+
+    def _observe(self, version: int):
+        if self.version is not None and version <= self.version:
+            return
+        if self.backend.stats()["entries"]:
+            self.invalidations += 1
+            self.backend.clear()
+        self.version = version
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "version": self.version,
+            **self.backend.stats(),
+        }
+
+    def close(self):
+        self.backend.close()
+
+
+def create_listing_cache() -> Optional[ListingCache]:
+    """Builds the GET /books page cache configured in `Settings`, or None when disabled."""
+    if settings.books_result_cache_max_entries <= 0 or settings.books_result_cache_max_bytes <= 0:
+        return None
+    return ListingCache(MemoryCacheBackend(
+        settings.books_result_cache_max_entries,
+        settings.books_result_cache_max_bytes
+    ))
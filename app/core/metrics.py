@@ -0,0 +1,349 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Metric values are plain attributes updated from the event loop thread, so updates
+take no locks. Labelled children are cached by their tuple of label values: after
+the first request of a route, `labels(...)` is a single dict lookup and no label
+dict is built. Every worker process keeps its own registry, which Prometheus
+aggregates across the scraped targets.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import anyio.to_thread
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class MetricFamily:
+    """A named metric with a fixed set of label names and one child per label values."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Returns the child for `values`, given in the order of `labelnames`."""
+        try:
+            return self._children[values]
+        except KeyError:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+            return child
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return CounterValue()
+        if self.kind == "gauge":
+            return GaugeValue()
+        return HistogramValue(self.buckets)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            if self.kind != "histogram":
+                yield f"{self.name}{{{labels}}} {_format(child.value)}" if labels else f"{self.name} {_format(child.value)}"
+                continue
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}le="{_format(bound)}"}} {cumulative}'
+            cumulative += child.counts[-1]
+            yield f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}'
+            suffix = f"{{{labels}}}" if labels else ""
+            yield f"{self.name}_sum{suffix} {_format(child.sum)}"
+            yield f"{self.name}_count{suffix} {cumulative}"
+
+
+class MetricsRegistry:
+    """Holds metric families and the callbacks that refresh scrape-time gauges."""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, "counter", labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, "gauge", labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, "histogram", labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Registers a callback run before every scrape, e.g. to copy pool sizes into gauges."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """Runs the collectors and returns all metrics in the Prometheus text format."""
+        for collector in list(self._collectors):
+            collector()
+        lines = [line for family in self._families.values() for line in family.render()]
+        return "\n".join(lines) + "\n"
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, method and status.",
+    ("route", "method", "status")
+)
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served.").labels()
+
+STARTUP_SECONDS = registry.gauge("app_startup_seconds", "Duration of the startup phases of this worker.", ("phase",))
+
+THREADPOOL_BUSY = registry.gauge("threadpool_threads_busy", "Worker threads in use by the default threadpool.").labels()
+THREADPOOL_LIMIT = registry.gauge("threadpool_threads_limit", "Size of the default threadpool.").labels()
+
+DB_POOL = registry.gauge(
+    "db_pool_connections", "SQLAlchemy pool connections by database (primary or replica) and state.",
+    ("database", "state")
+)
+DB_REPLICA_HEALTHY = registry.gauge(
+    "db_replica_healthy", "1 while a read replica is in rotation, 0 after a failed check.", ("replica",)
+)
+
+OPENLIBRARY_DURATION = registry.histogram(
+    "openlibrary_request_duration_seconds", "OpenLibrary request latency by endpoint, retries included.",
+    ("endpoint",)
+)
+OPENLIBRARY_ERRORS = registry.counter(
+    "openlibrary_request_errors_total", "Failed OpenLibrary requests by endpoint and reason.", ("endpoint", "reason")
+)
+
+OPENLIBRARY_EVENTS = registry.counter(
+    "openlibrary_client_events_total",
+    "OpenLibrary client events: retries, short-circuited and rate-limited requests.", ("event",)
+)
+OPENLIBRARY_CIRCUIT_STATE = registry.gauge(
+    "openlibrary_circuit_state", "1 for the current OpenLibrary circuit breaker state.", ("state",)
+)
+OPENLIBRARY_CIRCUIT_TRANSITIONS = registry.counter(
+    "openlibrary_circuit_transitions_total", "OpenLibrary circuit breaker transitions by target state.", ("state",)
+)
+OPENLIBRARY_CACHE_EVENTS = registry.counter(
+    "openlibrary_cache_events_total", "OpenLibrary response cache lookups and evictions by event.", ("event",)
+)
+OPENLIBRARY_CACHE_SIZE = registry.gauge(
+    "openlibrary_cache_size", "OpenLibrary response cache size by unit (entries, bytes).", ("unit",)
+)
+
+BOOKS_CACHE_EVENTS = registry.counter(
+    "books_cache_events_total",
+    "GET /books page cache lookups, evictions and invalidations by event.", ("event",)
+)
+BOOKS_CACHE_SIZE = registry.gauge("books_cache_size", "GET /books page cache size by unit (entries, bytes).", ("unit",))
+BOOKS_CACHE_HIT_RATIO = registry.gauge("books_cache_hit_ratio", "Share of GET /books page cache lookups that hit.").labels()
+
+INGEST_BOOKS = registry.counter("ingest_books_total", "Books inserted by store_books.").labels()
+INGEST_AUTHORS = registry.counter("ingest_authors_total", "Authors inserted by store_books.").labels()
+INGEST_DUPLICATES = registry.counter("ingest_duplicates_total", "Duplicate books skipped by store_books.").labels()
+INGEST_UPDATED = registry.counter("ingest_updated_books_total", "Stored books updated by author refreshes.").labels()
+AUTHOR_SYNCS = registry.counter(
+    "author_syncs_total",
+    "Author ingests by outcome: skipped as fresh, fetched unchanged or fetched with changes.", ("outcome",)
+)
+
+
+def record_ingest(result: dict):
+    """Adds a `store_books` summary to the ingest counters."""
+    INGEST_BOOKS.inc(result["inserted_books"])
+    INGEST_AUTHORS.inc(result["inserted_authors"])
+    INGEST_DUPLICATES.inc(result["duplicates_count"])
+    INGEST_UPDATED.inc(result.get("updated_books", 0))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests and timing them by route template.
+
+    The route label is the matched path template (e.g. `/jobs/{job_id}`), so paths with
+    ids do not create new series; requests that match no route are labelled `unmatched`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            labels = (route_label, scope["method"], status)
+            HTTP_REQUESTS.labels(*labels).inc()
+            HTTP_REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+
+
+async def drain_in_flight(timeout: float, poll_interval: float = 0.05) -> bool:
+    """
+    Waits until no HTTP request is being served, at most `timeout` seconds.
+
+    Returns:
+        bool: True if the in-flight requests finished, False on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while HTTP_IN_FLIGHT.value > 0:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+    return True
+
+
+def openlibrary_endpoint(path: str) -> str:
+    """Maps an OpenLibrary URL path to a low-cardinality endpoint label."""
+    if path == "/search.json":
+        return "search"
+    if path.startswith("/books/"):
+        return "books"
+    return "other"
+
+
+def observe_openlibrary(path: str, seconds: float, error: Optional[str] = None):
+    endpoint = openlibrary_endpoint(path)
+    OPENLIBRARY_DURATION.labels(endpoint).observe(seconds)
+    if error is not None:
+        OPENLIBRARY_ERRORS.labels(endpoint, error).inc()
+
+
+def db_pool_collector(pool, database: str = "primary") -> Callable[[], None]:
+    """Copies the connection counts of a SQLAlchemy `QueuePool` into `db_pool_connections`."""
+    def collect():
+        DB_POOL.labels(database, "size").set(pool.size())
+        DB_POOL.labels(database, "checked_in").set(pool.checkedin())
+        DB_POOL.labels(database, "checked_out").set(pool.checkedout())
+        DB_POOL.labels(database, "overflow").set(max(pool.overflow(), 0))
+    return collect
+
+
+def replica_collector(router) -> Callable[[], None]:
+    """Copies the rotation state of the replicas of a `ReplicaRouter` into `db_replica_healthy`."""
+    def collect():
+        for name, healthy in router.healthy.items():
+            DB_REPLICA_HEALTHY.labels(name).set(1 if healthy else 0)
+    return collect
+
+
+def threadpool_collector():
+    """Copies the usage of anyio's default thread limiter (used by `run_in_threadpool`)."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_LIMIT.set(limiter.total_tokens)
+
+
+def listing_cache_collector(cache) -> Callable[[], None]:
+    """Copies `ListingCache.stats()` into the `books_cache_*` metrics."""
+    def collect():
+        stats = cache.stats()
+        for event in ("hits", "misses", "evictions", "invalidations"):
+            BOOKS_CACHE_EVENTS.labels(event).value = stats[event]
+        BOOKS_CACHE_SIZE.labels("entries").set(stats["entries"])
+        BOOKS_CACHE_SIZE.labels("bytes").set(stats["bytes"])
+        BOOKS_CACHE_HIT_RATIO.set(stats["hit_ratio"])
+    return collect
+
+
+def openlibrary_collector(transport, cache=None) -> Callable[[], None]:
+    """Copies `ResilientTransport.stats()` and, if given, `ResponseCache.stats()` into metrics."""
+    def collect():
+        stats = transport.stats()
+        for event in ("retries", "short_circuited", "rate_limited"):
+            OPENLIBRARY_EVENTS.labels(event).value = stats[event]
+        for state, count in stats.get("circuit_transitions", {}).items():
+            OPENLIBRARY_CIRCUIT_TRANSITIONS.labels(state).value = count
+            OPENLIBRARY_CIRCUIT_STATE.labels(state).set(1 if stats["circuit_state"] == state else 0)
+        if cache is not None:
+            cache_stats = cache.stats()
+            for event in ("hits", "misses", "revalidations", "evictions"):
+                OPENLIBRARY_CACHE_EVENTS.labels(event).value = cache_stats[event]
+            OPENLIBRARY_CACHE_SIZE.labels("entries").set(cache_stats["entries"])
+            OPENLIBRARY_CACHE_SIZE.labels("bytes").set(cache_stats["bytes"])
+    return collect
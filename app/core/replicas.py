@@ -0,0 +1,126 @@
+"""
+Routing of read-only database sessions to read replicas.
+
+Read-only endpoints take their session from `ReplicaRouter.choose`, which picks one of
+the healthy replicas, round-robin or by the fewest checked-out connections, and falls
+back to the primary when no replica is configured or healthy. Writes always go to the
+primary. A replica drops out when its health check fails or it lags too far behind the
+primary, and comes back with the next successful check.
+
+A client that has just written reads from the primary for `DB_READ_YOUR_WRITES_WINDOW`
+seconds, so it sees its own writes although replication is asynchronous. Write
+requests set the `read_primary_until` cookie for that; it holds a Unix timestamp, so
+the window works across workers without shared state.
+"""
+import asyncio
+import time
+from typing import Literal, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# Seconds the replica has not replayed yet; 0 when it has replayed everything it
+# received (an idle primary would otherwise look like growing lag) and NULL on a primary.
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaRouter:
+    """Chooses the engine of read-only sessions and tracks the health of the replicas."""
+
+    def __init__(self, primary: AsyncEngine, replicas: Optional[dict[str, AsyncEngine]] = None,
+                 strategy: Literal["round_robin", "least_connections"] = ROUND_ROBIN):
+        """
+        Args:
+            primary (AsyncEngine): Engine of the primary; used for reads when no replica is healthy.
+            replicas (Optional[dict[str, AsyncEngine]]): Replica engines by name, e.g. `replica-0`.
+            strategy (Literal["round_robin", "least_connections"]): How a replica is picked.
+        """
+        self.primary = primary
+        self.replicas = dict(replicas or {})
+        self.strategy = strategy
+        # Replicas count as healthy until a check says otherwise, so reads are spread
+        # from the first request on.
+        self.healthy = {name: True for name in self.replicas}
+        self._next = 0
+
+    def choose(self, prefer_primary: bool = False) -> AsyncEngine:
+        """
+        Returns the engine for a read-only session.
+
+        Args:
+            prefer_primary (bool): Read from the primary, e.g. right after the client wrote.
+
+        Returns:
+            AsyncEngine: A healthy replica, or the primary.
+        """
+        if prefer_primary:
+            return self.primary
+        candidates = [engine for name, engine in self.replicas.items() if self.healthy[name]]
+        if not candidates:
+            return self.primary
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(candidates, key=lambda engine: engine.sync_engine.pool.checkedout())
+        engine = candidates[self._next % len(candidates)]
+        self._next += 1
+        return engine
+
+    def mark(self, name: str, healthy: bool):
+        """Takes the replica `name` in or out of rotation."""
+        self.healthy[name] = healthy
+
+    async def check(self, timeout: float, max_lag: float) -> dict[str, str]:
+        """
+        Checks all replicas concurrently and takes the failing ones out of rotation.
+
+        Args:
+            timeout (float): Seconds a single check may take.
+            max_lag (float): Largest accepted replication lag in seconds; 0 disables the lag check.
+
+        Returns:
+            dict[str, str]: Status of every replica: `ok`, `lagging` or `failed`.
+        """
+        names = list(self.replicas)
+        statuses = await asyncio.gather(*(self._check(self.replicas[name], timeout, max_lag) for name in names))
+        for name, status in zip(names, statuses):
+            self.mark(name, status == "ok")
+        return dict(zip(names, statuses))
+
+    @staticmethod
+    async def _check(engine: AsyncEngine, timeout: float, max_lag: float) -> str:
+        async def lag() -> Optional[float]:
+            async with engine.connect() as conn:
+                return (await conn.execute(REPLICATION_LAG_SQL)).scalar()
+
+        try:
+            seconds = await asyncio.wait_for(lag(), timeout=timeout)
+        except Exception:
+            return "failed"
+        if max_lag > 0 and seconds is not None and seconds > max_lag:
+            return "lagging"
+        return "ok"
+
+    async def dispose(self):
+        """Closes the connection pools of the replicas; the primary is left alone."""
+        await asyncio.gather(*(engine.dispose() for engine in self.replicas.values()))
+
+
+def read_primary_until(window: float, now: Optional[float] = None) -> str:
+    """Returns the `read_primary_until` cookie value for a write done `now` (Unix time)."""
+    return str(int((now if now is not None else time.time()) + window) + 1)
+
+
+def reads_from_primary(cookie: Optional[str], now: Optional[float] = None) -> bool:
+    """Returns True while the `read_primary_until` cookie value lies in the future."""
+    try:
+        until = int(cookie) if cookie else 0
+    except ValueError:
+        return False
+    return (now if now is not None else time.time()) < until
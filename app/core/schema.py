@@ -0,0 +1,192 @@
+"""
+Schema bootstrap and version check run by the application lifespan.
+
+`Base.metadata.create_all` only creates missing tables; it never alters existing
+ones. The database therefore records the `SCHEMA_VERSION` it was created for, and a
+worker refuses to start against a database holding another version instead of
+failing later on a missing column. Versions that only add tables, columns or indexes
+are upgraded in place: `create_all` adds new tables and an entry of `UPGRADES` adds the
+rest and fills them.
+"""
+from typing import Awaitable, Callable
+
+from sqlalchemy import bindparam, delete, func, inspect, literal, select, text, union_all, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.database import Base, advisory_lock
+from app.core.text import book_dedupe_hash
+from app.models import (  # noqa: F401  (registers the tables)
+    author_sync_model, book_model, catalog_facet_model, catalog_version_model, ingest_job_model
+)
+from app.models.book_listing_model import BookListing, listing_values
+from app.models.book_model import Authors, Books, book_authors
+from app.models.catalog_facet_model import NULL_VALUE, TOTAL, CatalogFacet, grouped_facets
+from app.models.schema_version_model import SchemaVersion
+
+# Bump whenever a model changes in a way `create_all` alone cannot apply to an existing database.
+SCHEMA_VERSION = 6
+
+# Books backfilled per statement by the upgrades.
+BACKFILL_BATCH_SIZE = 5000
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database schema does not match `SCHEMA_VERSION`."""
+
+
+async def prepare_schema(engine: AsyncEngine, create: bool) -> int:
+    """
+    Create or check the database schema.
+
+    With `create`, missing tables are created, a database of an older version is
+    upgraded with `UPGRADES` and `SCHEMA_VERSION` is recorded; workers starting together
+    take turns on an advisory lock. Without it, nothing is written and the recorded
+    version is only compared.
+
+    Args:
+        engine (AsyncEngine): Engine of the application database.
+        create (bool): Create missing tables (opt-in `DB_CREATE_SCHEMA`).
+
+    Returns:
+        int: The schema version of the database.
+
+    Raises:
+        SchemaVersionError: If the database holds no or another schema version (with
+            `create`, only a newer one or one without an upgrade path).
+    """
+    if not create:
+        version = await _recorded_version(engine)
+        if version != SCHEMA_VERSION:
+            raise SchemaVersionError(
+                f"Database schema version is {version}, expected {SCHEMA_VERSION}; "
+                f"migrate the database or start once with DB_CREATE_SCHEMA=true"
+            )
+        return version
+
+    async with advisory_lock("schema", bind=engine):
+        version = await _recorded_version(engine)
+        pending = range(version or 1, SCHEMA_VERSION)
+        if version is not None and (version > SCHEMA_VERSION or any(step not in UPGRADES for step in pending)):
+            raise SchemaVersionError(
+                f"Database schema version is {version}, expected {SCHEMA_VERSION}; "
+                f"create_all cannot migrate it, migrate the database first"
+            )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # Also run for databases created before versions were recorded.
+            for step in pending:
+                await UPGRADES[step](conn)
+            await conn.execute(
+                insert(SchemaVersion)
+                .values(id=1, version=SCHEMA_VERSION)
+                .on_conflict_do_update(index_elements=[SchemaVersion.id], set_={"version": SCHEMA_VERSION})
+            )
+    return SCHEMA_VERSION
+
+
+async def _recorded_version(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SchemaVersion.__tablename__)):
+            return None
+        return (await conn.execute(select(SchemaVersion.version).where(SchemaVersion.id == 1))).scalar_one_or_none()
+
+
+async def fill_book_listings(conn: AsyncConnection):
+    """Version 1 -> 2: writes the `book_listings` rows of books stored before the read model existed."""
+    after = 0
+    while True:
+        authors = (
+            select(func.array_agg(aggregate_order_by(Authors.name, Authors.id)))
+            .select_from(book_authors)
+            .join(Authors, Authors.id == book_authors.c.author_id)
+            .where(book_authors.c.book_id == Books.id)
+            .scalar_subquery()
+        )
+        rows = (await conn.execute(
+            select(Books.id, Books.title, Books.ebook_access, Books.first_publish_year, Books.language, authors)
+            .where(Books.id > after)
+            .where(~select(BookListing.book_id).where(BookListing.book_id == Books.id).exists())
+            .order_by(Books.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )).all()
+        if not rows:
+            return
+        await conn.execute(insert(BookListing), [listing_values(*row[:-1], row[-1] or []) for row in rows])
+        after = rows[-1][0]
+
+
+async def add_book_dedupe_keys(conn: AsyncConnection):
+    """
+    Version 2 -> 3: adds `books.openlibrary_key` and `books.dedupe_hash` with their unique
+    indexes. Hashes of stored books are computed from `book_listings`; a book repeating
+    an older one keeps a NULL hash (nothing is deleted). Work keys of stored books are
+    unknown and stay NULL.
+    """
+    await conn.execute(text("ALTER TABLE books ADD COLUMN IF NOT EXISTS openlibrary_key VARCHAR"))
+    await conn.execute(text("ALTER TABLE books ADD COLUMN IF NOT EXISTS dedupe_hash VARCHAR"))
+    after = 0
+    while True:
+        rows = (await conn.execute(
+            select(Books.id, BookListing.title, BookListing.authors)
+            .join(BookListing, BookListing.book_id == Books.id)
+            .where(Books.id > after)
+            .where(Books.dedupe_hash.is_(None))
+            .order_by(Books.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )).all()
+        if not rows:
+            break
+        await conn.execute(
+            update(Books.__table__).where(Books.id == bindparam("book_id")).values(dedupe_hash=bindparam("hash")),
+            [{"book_id": book_id, "hash": book_dedupe_hash(title, authors)} for book_id, title, authors in rows]
+        )
+        after = rows[-1][0]
+
+    first = select(func.min(Books.id)).where(Books.dedupe_hash.is_not(None)).group_by(Books.dedupe_hash)
+    await conn.execute(
+        update(Books).where(Books.dedupe_hash.is_not(None)).where(Books.id.not_in(first)).values(dedupe_hash=None)
+    )
+    for index in Books.__table__.indexes:
+        if index.name in ("ux_books_openlibrary_key", "ux_books_dedupe_hash"):
+            await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+
+async def add_author_syncs(conn: AsyncConnection):
+    """Version 3 -> 4: `author_syncs` is created by `create_all`; authors get a row on their next ingest."""
+
+
+async def add_catalog_facets(conn: AsyncConnection):
+    """
+    Version 4 -> 5: counts the stored books into `catalog_facets` (created by `create_all`)
+    and indexes `book_listings.language` for the language filter.
+    """
+    listings = BookListing.__table__
+    counts = [select(literal(TOTAL), literal(NULL_VALUE), func.count()).select_from(listings)]
+    for facet, query in grouped_facets(listings).items():
+        grouped = query.subquery()
+        counts.append(select(literal(facet), func.coalesce(grouped.c.value, NULL_VALUE), grouped.c.count))
+    await conn.execute(delete(CatalogFacet))
+    await conn.execute(
+        insert(CatalogFacet).from_select(["facet", "value", "count"], union_all(*counts))
+    )
+    for index in listings.indexes:
+        if index.name == "ix_book_listings_language":
+            await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+
+
+async def add_ingest_job_results(conn: AsyncConnection):
+    """Version 5 -> 6: adds `ingest_jobs.updated_books` and `ingest_jobs.up_to_date`; finished jobs get 0 and false."""
+    await conn.execute(text("ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS updated_books INTEGER NOT NULL DEFAULT 0"))
+    await conn.execute(text("ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS up_to_date BOOLEAN NOT NULL DEFAULT false"))
+
+
+# Upgrades from the key version to the next one, run in order inside `prepare_schema`.
+UPGRADES: dict[int, Callable[[AsyncConnection], Awaitable]] = {
+    1: fill_book_listings,
+    2: add_book_dedupe_keys,
+    3: add_author_syncs,
+    4: add_catalog_facets,
+    5: add_ingest_job_results,
+}
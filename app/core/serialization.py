@@ -0,0 +1,53 @@
+"""
+Fast JSON serialization of book listings.
+
+Rows of the `book_listings` read model carry their response JSON (`payload`), so a
+listing is only joined into an array. Other rows go from the ORM straight to bytes:
+`orjson` walks the list and calls `book_fields` for every row. Either way no Pydantic
+model is built or validated per book. The keys and value types are those of
+`BookResponse`, which stays the documented response model of GET /books.
+"""
+from typing import Any, Iterable
+
+import orjson
+from pydantic import BaseModel
+
+from app.models.book_listing_model import BookListing
+
+
+def book_fields(book) -> dict:
+    """Returns the `BookResponse` fields of a listing row (see `BookDataManager._listing_row`)."""
+    return {
+        "title": book.title,
+        "ebook_access": book.ebook_access,
+        "first_publish_year": book.first_publish_year,
+        "authors": book.authors_list,
+        "language": book.language or [],
+    }
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return book_fields(value)
+
+
+def dumps_books(books: Iterable) -> bytes:
+    """Serializes listing rows (or `BookResponse` models and dicts) as a JSON array."""
+    books = books if isinstance(books, list) else list(books)
+    if all(isinstance(book, BookListing) for book in books):
+        return b"[" + b",".join([book.payload for book in books]) + b"]"
+    return orjson.dumps(books, default=_default)
+
+
+def dumps_book_line(book) -> bytes:
+    """Serializes one listing row as an NDJSON line."""
+    return dumps_book(book) + b"\n"
+
+
+def dumps_book(book) -> bytes:
+    """Serializes one listing row as a JSON object."""
+    if isinstance(book, BookListing):
+        return book.payload
+    return orjson.dumps(book, default=_default)
+
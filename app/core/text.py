@@ -0,0 +1,18 @@
+import hashlib
+from typing import Iterable
+
+
+def normalize_name(value: str) -> str:
+    """Case-folds a name and collapses runs of whitespace, e.g. for cache and lock keys."""
+    return " ".join(value.split()).casefold()
+
+
+def book_dedupe_hash(title: str, authors: Iterable[str]) -> str:
+    """
+    Returns the key under which a book is stored only once: the normalized title and
+    the sorted, normalized author names, hashed. Books whose titles or author lists
+    differ only in case, whitespace or author order share it.
+    """
+    # Normalized values hold no newlines, so joining them with one is unambiguous.
+    value = "\n".join([normalize_name(title), *sorted({normalize_name(name) for name in authors})])
+    return hashlib.sha256(value.encode()).hexdigest()
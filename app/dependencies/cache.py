@@ -0,0 +1,9 @@
+from typing import Optional
+
+from fastapi import Request
+
+from app.core.listing_cache import ListingCache
+
+
+def get_listing_cache(request: Request) -> Optional[ListingCache]:
+    return request.app.state.listing_cache
@@ -1,9 +1,29 @@
-from app.core.database import SessionLocal
+import math
 
+from fastapi import Request, Response
 
-def get_db():
-    db = SessionLocal()
-    try:
+from app.core.database import SessionLocal, read_router
+from app.core.replicas import READ_PRIMARY_COOKIE, read_primary_until, reads_from_primary
+from app.core.settings import settings
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+async def get_db(request: Request, response: Response):
+    """
+    Session on the primary. Write requests also make the client read from the primary
+    for `DB_READ_YOUR_WRITES_WINDOW` seconds (see `app.core.replicas`).
+    """
+    window = settings.db_read_your_writes_window
+    if request.method not in SAFE_METHODS and read_router.replicas and window > 0:
+        response.set_cookie(READ_PRIMARY_COOKIE, read_primary_until(window), max_age=math.ceil(window) + 1,
+                            httponly=True, samesite="lax")
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    """Session for read-only endpoints: on a healthy replica, or the primary right after the client wrote."""
+    engine = read_router.choose(prefer_primary=reads_from_primary(request.cookies.get(READ_PRIMARY_COOKIE)))
+    async with SessionLocal(bind=engine) as db:
         yield db
-    finally:
-        db.close()
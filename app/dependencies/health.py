@@ -0,0 +1,7 @@
+from fastapi import Request
+
+from app.services.health_prober import HealthProber
+
+
+def get_health_prober(request: Request) -> HealthProber:
+    return request.app.state.health_prober
@@ -0,0 +1,12 @@
+import httpx
+from fastapi import Request
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http_client
+
+
+def get_open_library_client(request: Request) -> OpenLibraryAPIClient:
+    return OpenLibraryAPIClient(get_http_client(request), request.app.state.openlibrary_cache)
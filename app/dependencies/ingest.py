@@ -0,0 +1,7 @@
+from fastapi import Request
+
+from app.services.ingest_worker_pool import IngestWorkerPool
+
+
+def get_ingest_worker_pool(request: Request) -> IngestWorkerPool:
+    return request.app.state.ingest_worker_pool
@@ -1,11 +1,163 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy.exc import OperationalError
 from app.api.v1.router import router as api_router
 
 from app.api.v1 import books, health
-from app.core.database import Base, engine
+from app.clients.http_client import create_http_client, warm_up_client
+from app.clients.resilience import create_resilient_transport
+from app.clients.response_cache import create_response_cache
+from app.core.compression import CompressionMiddleware
+from app.core.database import engine, read_router, warm_up_pool
+from app.core.instrumentation import ServerTimingMiddleware
+from app.core.listing_cache import create_listing_cache
+from app.core.metrics import (
+    STARTUP_SECONDS, MetricsMiddleware, db_pool_collector, drain_in_flight, listing_cache_collector,
+    openlibrary_collector, registry, replica_collector, threadpool_collector
+)
+from app.core.schema import prepare_schema
+from app.core.settings import settings
+from app.services.book_data_manager import BookDataManager
+from app.services.author_refresher import AuthorRefresher
+from app.services.health_prober import HealthProber
+from app.services.ingest_worker_pool import IngestWorkerPool
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares the worker before it accepts requests and shuts it down gracefully.
+
+    Startup checks (or, with `DB_CREATE_SCHEMA`, creates) the schema, creates the shared
+    HTTP client, the OpenLibrary response cache and the GET /books page cache, pre-opens database (primary and read replicas) and
+    OpenLibrary connections,
+    then starts the health prober, ingestion workers and author refresher and registers
+    their metrics.
+    Startup phases are timed in the `app_startup_seconds` metric. Nothing touches the
+    database at import time.
+
+    Shutdown waits for in-flight requests and running ingestion jobs (up to
+    `SHUTDOWN_DRAIN_TIMEOUT` seconds), then closes the clients and disposes the engines.
+    """
+    timings = {}
+    started = phase_started = time.perf_counter()
+
+    def phase_done(name: str):
+        nonlocal phase_started
+        now = time.perf_counter()
+        timings[name] = now - phase_started
+        phase_started = now
+
+    try:
+        await prepare_schema(engine, create=settings.db_create_schema)
+    except (OSError, OperationalError) as e:
+        logger.warning("Database unavailable at startup, schema not checked: %s", e)
+    phase_done("schema")
+
+    app.state.openlibrary_transport = create_resilient_transport()
+    app.state.http_client = create_http_client(app.state.openlibrary_transport)
+    app.state.openlibrary_cache = create_response_cache()
+    app.state.listing_cache = create_listing_cache()
+    app.state.health_prober = HealthProber(app.state.http_client)
+    phase_done("clients")
+
+    await _warm_up(app)
+    phase_done("warmup")
+
+    app.state.health_prober.start()
+    app.state.ingest_worker_pool = IngestWorkerPool(app.state.http_client, app.state.openlibrary_cache)
+    app.state.ingest_worker_pool.start()
+    app.state.author_refresher = AuthorRefresher(app.state.http_client, app.state.openlibrary_cache)
+    if settings.author_refresh_interval > 0:
+        app.state.author_refresher.start()
+    collectors = [
+        threadpool_collector,
+        db_pool_collector(engine.sync_engine.pool),
+        *(db_pool_collector(replica.sync_engine.pool, name) for name, replica in read_router.replicas.items()),
+        replica_collector(read_router),
+        openlibrary_collector(app.state.openlibrary_transport, app.state.openlibrary_cache),
+    ]
+    if app.state.listing_cache is not None:
+        collectors.append(listing_cache_collector(app.state.listing_cache))
+    for collector in collectors:
+        registry.add_collector(collector)
+    phase_done("workers")
+
+    timings["total"] = time.perf_counter() - started
+    for name, seconds in timings.items():
+        STARTUP_SECONDS.labels(name).set(seconds)
+    logger.info("Startup finished in %.0f ms (%s)", timings["total"] * 1000,
+                ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items() if name != "total"))
+    try:
+        yield
+    finally:
+        if not await drain_in_flight(settings.shutdown_drain_timeout):
+            logger.warning("Shutting down with requests still in flight")
+        for collector in collectors:
+            registry.remove_collector(collector)
+        await app.state.author_refresher.stop()
+        await app.state.ingest_worker_pool.stop(timeout=settings.shutdown_drain_timeout)
+        await app.state.health_prober.stop()
+        await app.state.http_client.aclose()
+        if app.state.openlibrary_cache:
+            app.state.openlibrary_cache.close()
+        if app.state.listing_cache:
+            app.state.listing_cache.close()
+        await read_router.dispose()
+        await engine.dispose()
+
+
+async def _warm_up(app: FastAPI):
+    """Pre-opens database and OpenLibrary connections, all bounded by `STARTUP_WARMUP_TIMEOUT`."""
+    async def database():
+        if settings.db_warmup_connections <= 0:
+            return
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                warm_up_pool(settings.db_warmup_connections, BookDataManager.warm_up),
+                settings.startup_warmup_timeout
+            )
+        except Exception as e:
+            # Best effort: readiness reports the database once the health prober reaches it.
+            logger.warning("Database warm-up failed: %s", str(e) or type(e).__name__)
+            return
+        app.state.health_prober.record_database_check(True, (time.perf_counter() - started) * 1000)
+
+    async def replica(name: str, bind):
+        try:
+            await asyncio.wait_for(
+                warm_up_pool(settings.db_warmup_connections, BookDataManager.warm_up, bind=bind),
+                settings.startup_warmup_timeout
+            )
+        except Exception as e:
+            # Takes the replica out of rotation until the health prober reaches it.
+            logger.warning("Warm-up of %s failed: %s", name, str(e) or type(e).__name__)
+            read_router.mark(name, False)
+
+    async def openlibrary():
+        if settings.http_warmup_connections <= 0:
+            return
+        try:
+            await asyncio.wait_for(
+                warm_up_client(app.state.http_client, settings.http_warmup_connections, HealthProber.EXTERNAL_API_PATH),
+                settings.startup_warmup_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("OpenLibrary warm-up timed out")
+
+    replicas = [replica(name, bind) for name, bind in read_router.replicas.items()
+                if settings.db_warmup_connections > 0]
+    await asyncio.gather(database(), openlibrary(), *replicas)
 
 
-Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="Library API",
     description="""
@@ -15,10 +167,22 @@ app = FastAPI(
         The API supports:
         
         - Fetching and storing books by author
+        - Queueing background ingestion jobs and checking their progress
         - Retrieving books with filters by author or title
         - Checking application and external API health
+        - Exposing Prometheus metrics
     """,
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+if settings.response_compression:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.response_compression_minimum_size,
+        gzip_level=settings.response_gzip_level,
+        brotli_quality=settings.response_brotli_quality
+    )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 app.include_router(api_router)
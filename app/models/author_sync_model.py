@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
+
+from app.core.database import Base
+
+
+class AuthorSync(Base):
+    """Last OpenLibrary fetch of one author's bibliography, see `AuthorSyncManager`."""
+    __tablename__ = "author_syncs"
+
+    # `normalize_name` of the requested name
+    author_key = Column(String, primary_key=True)
+    # Name as first requested, used to fetch the author again
+    author_name = Column(String, nullable=False)
+    last_fetched_at = Column(DateTime(timezone=True), nullable=False)
+    # Time of the last fetch whose content differed from the one before
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+    # `numFound` reported by OpenLibrary
+    num_found = Column(Integer)
+    # `content_hash` of the fetched docs
+    content_hash = Column(String, nullable=False)
+    # Ingests and GET /books author filters naming the author, the refresh priority
+    query_count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_author_syncs_last_fetched_at", last_fetched_at),
+    )
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Returns True when the author was fetched less than `ttl` seconds ago."""
+        return (datetime.now(timezone.utc) - self.last_fetched_at).total_seconds() < ttl
@@ -0,0 +1,69 @@
+from typing import Optional
+
+import orjson
+from sqlalchemy import ARRAY, Column, ForeignKey, Index, Integer, LargeBinary, String, func
+
+from app.core.database import Base
+from app.models.book_model import UNKNOWN_YEAR, pg_trgm_available
+
+
+class BookListing(Base):
+    """
+    Denormalized read model of GET /books: one row per book with its author names and
+    the book's response JSON, so a listing is a single query on one table.
+
+    Rows are written by `BookDataManager` in the transaction that stores the book.
+    """
+    __tablename__ = "book_listings"
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    title = Column(String, nullable=False)
+    ebook_access = Column(String)
+    first_publish_year = Column(Integer)
+    language = Column(ARRAY(String), nullable=False, default=list)
+    authors = Column(ARRAY(String), nullable=False, default=list)
+    # Author names joined with newlines, matched by the author filter through a trigram index.
+    authors_text = Column(String, nullable=False, default="")
+    # The book serialized like `BookResponse`, sent as it is.
+    payload = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_book_listings_title_id", title, book_id),
+        Index("ix_book_listings_first_publish_year_id", func.coalesce(first_publish_year, UNKNOWN_YEAR), book_id),
+        # Serves the `language` filter (`@>`).
+        Index("ix_book_listings_language", language, postgresql_using="gin"),
+        Index(
+            "ix_book_listings_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql", callable_=pg_trgm_available),
+        Index(
+            "ix_book_listings_authors_trgm", "authors_text",
+            postgresql_using="gin", postgresql_ops={"authors_text": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql", callable_=pg_trgm_available),
+    )
+
+    @property
+    def authors_list(self) -> list[str]:
+        return self.authors
+
+
+def listing_values(book_id: int, title: str, ebook_access: Optional[str], first_publish_year: Optional[int],
+                   language: Optional[list[str]], authors: list[str]) -> dict:
+    """Returns the `book_listings` row of a book, e.g. for a multi-row INSERT."""
+    language = language or []
+    return {
+        "book_id": book_id,
+        "title": title,
+        "ebook_access": ebook_access,
+        "first_publish_year": first_publish_year,
+        "language": language,
+        "authors": authors,
+        "authors_text": "\n".join(authors),
+        "payload": orjson.dumps({
+            "title": title,
+            "ebook_access": ebook_access,
+            "first_publish_year": first_publish_year,
+            "authors": authors,
+            "language": language,
+        }),
+    }
@@ -1,6 +1,24 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey, ARRAY
+from sqlalchemy import Column, Integer, String, Table, ForeignKey, ARRAY, DDL, Index, event, func, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+
+
+def pg_trgm_available(ddl, target, bind, **kw) -> bool:
+    """Creates trigram DDL only on servers that ship the `pg_trgm` extension."""
+    return bind.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql", callable_=pg_trgm_available)
+)
+
+# Sort value used for books without a publish year, so they come last in ascending order.
+UNKNOWN_YEAR = 2147483647
+
 book_authors = Table(
     "book_authors",
     Base.metadata,
@@ -20,6 +38,11 @@ class Books(Base):
     ebook_access = Column(String)
     first_publish_year = Column(Integer)
     language = Column(ARRAY(String), nullable=False, default=list)
+    # OpenLibrary work key, e.g. "/works/OL27448W"; unknown for books stored before it was kept.
+    openlibrary_key = Column(String)
+    # `book_dedupe_hash` of the title and author names. Both keys are unique, which makes
+    # ingestion idempotent; NULL only for duplicates found when the column was added.
+    dedupe_hash = Column(String)
 
     authors = relationship(
         "Authors",
@@ -27,6 +50,17 @@ class Books(Base):
         back_populates="books"
     )
 
+    __table_args__ = (
+        Index("ix_books_title_id", title, id),
+        Index("ix_books_first_publish_year_id", func.coalesce(first_publish_year, UNKNOWN_YEAR), id),
+        Index("ux_books_openlibrary_key", openlibrary_key, unique=True),
+        Index("ux_books_dedupe_hash", dedupe_hash, unique=True),
+        Index(
+            "ix_books_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql", callable_=pg_trgm_available),
+    )
+
 class Authors(Base):
     __tablename__ = "authors"
 
@@ -38,3 +72,10 @@ class Authors(Base):
         secondary=book_authors,
         back_populates="authors"
     )
+
+    __table_args__ = (
+        Index(
+            "ix_authors_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql", callable_=pg_trgm_available),
+    )
@@ -0,0 +1,68 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import BigInteger, Column, Index, Integer, String, cast, func, select
+
+from app.core.database import Base
+
+# Facets of GET /books/facets, in response order.
+FACETS = ("language", "decade", "ebook_access", "author")
+# Pseudo facet holding the number of listed books under `NULL_VALUE`.
+TOTAL = "total"
+# Stored value of books without an `ebook_access` or `first_publish_year` (NULL in responses).
+NULL_VALUE = ""
+
+
+class CatalogFacet(Base):
+    """
+    Facet counts of the whole catalog: how many `book_listings` rows have each language,
+    publication decade, `ebook_access` and author. `BookDataManager` adds the changes of
+    every write in its transaction, so the unfiltered GET /books/facets reads a few
+    index ranges instead of grouping the catalog.
+    """
+    __tablename__ = "catalog_facets"
+
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_catalog_facets_facet_count", facet, count.desc(), value),
+    )
+
+
+def decade_of(year: Optional[int]) -> Optional[int]:
+    return None if year is None else year // 10 * 10
+
+
+def facet_counts(listings: Iterable[dict]) -> Counter:
+    """Counts `(facet, value)` pairs of `listing_values` rows, including the `TOTAL` count."""
+    counts = Counter()
+    for listing in listings:
+        decade = decade_of(listing["first_publish_year"])
+        counts[(TOTAL, NULL_VALUE)] += 1
+        counts[("decade", NULL_VALUE if decade is None else str(decade))] += 1
+        counts[("ebook_access", listing["ebook_access"] or NULL_VALUE)] += 1
+        counts.update(("language", language) for language in listing["language"])
+        counts.update(("author", author) for author in listing["authors"])
+    return counts
+
+
+def grouped_facets(listings) -> dict:
+    """
+    Returns a `SELECT value, count` grouping `listings` for every facet of `FACETS`.
+
+    `listings` is a selectable with the `language`, `first_publish_year`,
+    `ebook_access` and `authors` columns of `book_listings`; values are text, NULL for
+    books without one.
+    """
+    language = select(func.unnest(listings.c.language).label("value")).subquery()
+    author = select(func.unnest(listings.c.authors).label("value")).subquery()
+    decade = cast(func.floor(listings.c.first_publish_year / 10.0) * 10, Integer)
+    return {
+        "language": select(language.c.value, func.count().label("count")).group_by(language.c.value),
+        "decade": select(cast(decade, String).label("value"), func.count().label("count")).group_by(decade),
+        "ebook_access": select(listings.c.ebook_access.label("value"), func.count().label("count"))
+        .group_by(listings.c.ebook_access),
+        "author": select(author.c.value, func.count().label("count")).group_by(author.c.value),
+    }
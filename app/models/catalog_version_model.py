@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, func
+
+from app.core.database import Base
+
+
+class CatalogVersion(Base):
+    """
+    Single-row table holding a counter bumped by every transaction that stores books,
+    and the time of that transaction. GET /books derives its `ETag` and
+    `Last-Modified` from it.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,34 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, false, func
+
+from app.core.database import Base
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class IngestJob(Base):
+    """Background fetch-and-store of one author's books, see `IngestWorkerPool`."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(36), primary_key=True)
+    author = Column(String, nullable=False)
+    state = Column(String(16), nullable=False, default=JOB_QUEUED)
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    inserted_books = Column(Integer, nullable=False, default=0)
+    inserted_authors = Column(Integer, nullable=False, default=0)
+    duplicates_count = Column(Integer, nullable=False, default=0)
+    # Set with the result: updates are written after the last page is fetched
+    updated_books = Column(Integer, nullable=False, default=0, server_default="0")
+    up_to_date = Column(Boolean, nullable=False, default=False, server_default=false())
+    message = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_ingest_jobs_state_created_at", state, created_at),
+    )
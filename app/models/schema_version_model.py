@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, Integer, func
+
+from app.core.database import Base
+
+
+class SchemaVersion(Base):
+    """Single-row table holding the schema version the database was created for, see `app.core.schema`."""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
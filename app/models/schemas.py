@@ -1,7 +1,10 @@
-from typing import Optional, List
+from datetime import datetime
+from typing import Annotated, Dict, Optional, List, Union
 
 from pydantic import BaseModel, Field
 
+from app.core.settings import settings
+
 
 class AuthorRequest(BaseModel):
     author: str = Field(
@@ -12,6 +15,16 @@ class AuthorRequest(BaseModel):
     )
 
 
+class BatchAuthorsRequest(BaseModel):
+    authors: List[Annotated[str, Field(min_length=1)]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.ingest_batch_max_authors,
+        description="Names of the authors to fetch books for",
+        json_schema_extra={"example": ["J.R.R. Tolkien", "George Orwell"]}
+    )
+
+
 class BookResponse(BaseModel):
     title: str = Field(
         ...,
@@ -45,6 +58,38 @@ class BookResponse(BaseModel):
     }
 
 
+class BookPage(BaseModel):
+    items: List[BookResponse] = Field(
+        default_factory=list,
+        description="Books of the current page"
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor of the next page, None on the last page"
+    )
+    total_estimate: Optional[int] = Field(
+        None,
+        description="Approximate number of matching books, if requested"
+    )
+
+
+class FacetCount(BaseModel):
+    value: Union[int, str, None] = Field(
+        ...,
+        description="Facet value; the first year of a decade for `decade`, null for books without one",
+        json_schema_extra={"example": "eng"}
+    )
+    count: int = Field(..., description="Number of matching books with the value", json_schema_extra={"example": 12})
+
+
+class BookFacetsResponse(BaseModel):
+    total: int = Field(..., description="Number of matching books", json_schema_extra={"example": 42})
+    language: List[FacetCount] = Field(default_factory=list, description="Counts by language")
+    decade: List[FacetCount] = Field(default_factory=list, description="Counts by decade of `first_publish_year`")
+    ebook_access: List[FacetCount] = Field(default_factory=list, description="Counts by `ebook_access`")
+    author: List[FacetCount] = Field(default_factory=list, description="Counts by author")
+
+
 class StoreBooksResponse(BaseModel):
     inserted_books: int = Field(
         ...,
@@ -66,6 +111,29 @@ class StoreBooksResponse(BaseModel):
         description="Summary message for the operation",
         json_schema_extra={"example": "50 books of requested author already exist in the database"}
     )
+    updated_books: int = Field(
+        0,
+        description="Number of stored books whose details changed upstream and were updated",
+        json_schema_extra={"example": 1}
+    )
+    up_to_date: bool = Field(
+        False,
+        description="True when the author was fetched less than `AUTHOR_FRESHNESS_TTL` seconds ago, "
+                    "so OpenLibrary was not queried and nothing was stored"
+    )
+
+
+class BatchStoreBooksResponse(BaseModel):
+    results: Dict[str, StoreBooksResponse] = Field(
+        default_factory=dict,
+        description="Summary of the operation per requested author"
+    )
+    errors: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Authors whose books could not be fetched, with the reason",
+        json_schema_extra={"example": {"Unknown Author": "No books found for author"}}
+    )
+    summary: StoreBooksResponse = Field(..., description="Totals over all requested authors")
 
 
 class HealthResponse(BaseModel):
@@ -79,3 +147,126 @@ class HealthResponse(BaseModel):
         description="Status of external API connection",
         json_schema_extra={"example": "failed"}
     )
+    external_api_latency_ms: Optional[float] = Field(
+        None,
+        description="Duration of the last external API check in milliseconds",
+        json_schema_extra={"example": 182.4}
+    )
+    database_status: str = Field(
+        "unknown",
+        description="Status of database connection",
+        json_schema_extra={"example": "ok"}
+    )
+    database_latency_ms: Optional[float] = Field(
+        None,
+        description="Duration of the last database check in milliseconds",
+        json_schema_extra={"example": 1.3}
+    )
+    database_replicas: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Status of every read replica: ok, lagging or failed",
+        json_schema_extra={"example": {"replica-0": "ok"}}
+    )
+    checked_at: Optional[datetime] = Field(
+        None,
+        description="Time of the last check",
+        json_schema_extra={"example": "2024-01-01T12:00:00Z"}
+    )
+
+
+class ProbeResponse(BaseModel):
+    status: str = Field(
+        ...,
+        description="Probe result",
+        json_schema_extra={"example": "ok"}
+    )
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool = Field(
+        ...,
+        description="Whether the OpenLibrary response cache is enabled",
+        json_schema_extra={"example": True}
+    )
+    hits: int = Field(0, description="Lookups answered from the cache", json_schema_extra={"example": 120})
+    misses: int = Field(0, description="Lookups that went to OpenLibrary", json_schema_extra={"example": 14})
+    revalidations: int = Field(
+        0,
+        description="Expired entries confirmed as unchanged by OpenLibrary",
+        json_schema_extra={"example": 3}
+    )
+    evictions: int = Field(0, description="Entries evicted by the size limits", json_schema_extra={"example": 0})
+    entries: int = Field(0, description="Number of cached responses", json_schema_extra={"example": 11})
+    bytes: int = Field(0, description="Approximate size of cached responses", json_schema_extra={"example": 48213})
+
+
+class ListingCacheStatsResponse(BaseModel):
+    enabled: bool = Field(
+        ...,
+        description="Whether the GET /books page cache is enabled",
+        json_schema_extra={"example": True}
+    )
+    hits: int = Field(0, description="Pages served from the cache", json_schema_extra={"example": 940})
+    misses: int = Field(0, description="Pages read from the database", json_schema_extra={"example": 60})
+    hit_ratio: float = Field(0.0, description="Share of lookups served from the cache", json_schema_extra={"example": 0.94})
+    invalidations: int = Field(
+        0,
+        description="Times the cache was emptied because the catalog version changed",
+        json_schema_extra={"example": 2}
+    )
+    evictions: int = Field(0, description="Pages evicted by the size limits", json_schema_extra={"example": 0})
+    entries: int = Field(0, description="Number of cached pages", json_schema_extra={"example": 25})
+    bytes: int = Field(0, description="Approximate size of cached pages", json_schema_extra={"example": 524288})
+    version: Optional[int] = Field(None, description="Catalog version of the cached pages", json_schema_extra={"example": 42})
+
+
+class IngestJobResponse(BaseModel):
+    id: str = Field(
+        ...,
+        description="Identifier of the job",
+        json_schema_extra={"example": "3f6c1f8e-1d2a-4c55-9a43-2f1f0b5a9e1d"}
+    )
+    author: str = Field(..., description="Author whose books are fetched", json_schema_extra={"example": "J.R.R. Tolkien"})
+    state: str = Field(
+        ...,
+        description="Job state: `queued`, `running`, `succeeded` or `failed`",
+        json_schema_extra={"example": "running"}
+    )
+    pages_fetched: int = Field(0, description="OpenLibrary result pages fetched and stored so far",
+                               json_schema_extra={"example": 3})
+    inserted_books: int = Field(0, description="Books inserted so far", json_schema_extra={"example": 250})
+    inserted_authors: int = Field(0, description="Authors inserted so far", json_schema_extra={"example": 4})
+    duplicates_count: int = Field(0, description="Duplicates skipped so far", json_schema_extra={"example": 12})
+    result: Optional[StoreBooksResponse] = Field(None, description="Final summary, once the job has succeeded")
+    error: Optional[str] = Field(
+        None,
+        description="Reason of the failure, once the job has failed",
+        json_schema_extra={"example": "No books found for author"}
+    )
+    created_at: Optional[datetime] = Field(None, description="Time the job was queued")
+    started_at: Optional[datetime] = Field(None, description="Time the job was last started")
+    finished_at: Optional[datetime] = Field(None, description="Time the job finished")
+
+
+class OpenLibraryStatsResponse(BaseModel):
+    circuit_state: str = Field(
+        ...,
+        description="Circuit breaker state: `closed`, `open` or `half_open`",
+        json_schema_extra={"example": "closed"}
+    )
+    circuit_transitions: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Number of transitions into every circuit breaker state",
+        json_schema_extra={"example": {"closed": 1, "open": 1, "half_open": 1}}
+    )
+    requests: int = Field(0, description="Requests sent to OpenLibrary, retries included",
+                          json_schema_extra={"example": 420})
+    retries: int = Field(0, description="Requests repeated after a failure", json_schema_extra={"example": 7})
+    failures: int = Field(0, description="Requests that failed or got a retryable status",
+                          json_schema_extra={"example": 9})
+    short_circuited: int = Field(0, description="Requests rejected by the open circuit breaker",
+                                 json_schema_extra={"example": 30})
+    rate_limited: int = Field(0, description="Requests delayed by the client-side rate limit",
+                              json_schema_extra={"example": 55})
+    rate_limited_seconds: float = Field(0, description="Total delay added by the rate limit",
+                                        json_schema_extra={"example": 4.2})
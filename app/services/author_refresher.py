@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.clients.response_cache import ResponseCache
+from app.core.database import SessionLocal
+from app.core.settings import settings
+from app.services.author_sync_manager import AuthorQueryCounter, AuthorSyncManager, author_queries
+from app.services.book_service import BookService
+
+logger = logging.getLogger(__name__)
+
+
+class AuthorRefresher:
+    """
+    Refreshes stale authors in the background, the most queried first.
+
+    Every round halves the query counts in `author_syncs` and adds the ones collected by
+    this process, so the priority follows recent queries; it then
+    fetches up to `batch_size` authors whose last fetch is older than the freshness TTL,
+    one after another, through `BookService.refresh_author`. The per-author advisory lock
+    and the freshness check under it keep refreshers of several processes from fetching
+    the same author twice. Cached OpenLibrary responses are revalidated, so a refresh
+    never records an author as synced from cached pages alone.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        cache: Optional[ResponseCache] = None,
+        session_factory: Callable = SessionLocal,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        queries: AuthorQueryCounter = author_queries
+    ):
+        """
+        Args:
+            http_client (httpx.AsyncClient): Shared HTTP client used to reach OpenLibrary.
+            cache (Optional[ResponseCache]): OpenLibrary response cache, if enabled.
+            session_factory (Callable): Factory of database sessions.
+            interval (Optional[float]): Seconds between refresh rounds. Defaults to settings.
+            batch_size (Optional[int]): Authors refreshed per round. Defaults to settings.
+            queries (AuthorQueryCounter): Counter of author queries flushed every round.
+        """
+        self.http_client = http_client
+        self.cache = cache
+        self.session_factory = session_factory
+        self.interval = interval or settings.author_refresh_interval
+        self.batch_size = batch_size or settings.author_refresh_batch_size
+        self.queries = queries
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the background refresh loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancels the background refresh loop and waits for it to finish."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh_once(self) -> int:
+        """
+        Runs one refresh round.
+
+        Returns:
+            int: Number of authors that were due for a refresh.
+        """
+        async with self.session_factory() as db:
+            manager = AuthorSyncManager(db)
+            await manager.decay_query_counts()
+            await manager.add_query_counts(self.queries.drain())
+            authors = await manager.stale_authors(settings.author_freshness_ttl, self.batch_size)
+
+        for author in authors:
+            try:
+                async with self.session_factory() as db:
+                    service = BookService(db, OpenLibraryAPIClient(self.http_client, self.cache, revalidate=True))
+                    await service.refresh_author(author)
+            except HTTPException as e:
+                logger.warning("Refresh of author %r failed: %s", author, e.detail)
+        return len(authors)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_once()
+            except Exception:
+                logger.exception("Author refresh round failed")
@@ -0,0 +1,141 @@
+import hashlib
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+import orjson
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.models.author_sync_model import AuthorSync
+
+# Distinct authors whose queries are counted between two flushes; later names wait for the next flush.
+MAX_COUNTED_AUTHORS = 10_000
+
+
+def doc_fingerprint(doc: dict) -> bytes:
+    """Digest of the fields of an OpenLibrary doc that are stored."""
+    return hashlib.sha256(orjson.dumps([doc.get(field) for field in OpenLibraryAPIClient.SEARCH_FIELDS])).digest()
+
+
+def content_hash(fingerprints: Iterable[bytes]) -> str:
+    """Hash of an author's bibliography from its `doc_fingerprint`s; pages may arrive in any order."""
+    return hashlib.sha256(b"".join(sorted(fingerprints))).hexdigest()
+
+
+class AuthorQueryCounter:
+    """
+    Counts in memory how often authors are requested by this process.
+
+    Counting on the request path costs no query (GET /books may run on a replica);
+    `AuthorRefresher` adds the counts to `author_syncs.query_count` periodically.
+    """
+    def __init__(self, max_authors: int = MAX_COUNTED_AUTHORS):
+        self.max_authors = max_authors
+        self._counts: Counter = Counter()
+
+    def add(self, author_key: str):
+        if author_key in self._counts or len(self._counts) < self.max_authors:
+            self._counts[author_key] += 1
+
+    def drain(self) -> Dict[str, int]:
+        """Returns the counts since the last call and starts over."""
+        counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+
+author_queries = AuthorQueryCounter()
+
+
+class AuthorSyncManager:
+    """
+    Manages the `author_syncs` table: when each author's bibliography was last fetched
+    from OpenLibrary, what it contained, and how often the author is requested.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_sync(self, author_key: str) -> Optional[AuthorSync]:
+        return (await self.db.execute(
+            select(AuthorSync).where(AuthorSync.author_key == author_key)
+        )).scalar_one_or_none()
+
+    async def record_fetch(self, author_key: str, author_name: str, num_found: Optional[int],
+                           fetched_hash: str) -> bool:
+        """
+        Record a completed fetch of an author.
+
+        Args:
+            author_key (str): Normalized author name.
+            author_name (str): Name the author was fetched with.
+            num_found (Optional[int]): `numFound` reported by OpenLibrary.
+            fetched_hash (str): `content_hash` of the fetched docs.
+
+        Returns:
+            bool: True when the content differs from the previous fetch (or there was none).
+        """
+        row = (await self.db.execute(
+            insert(AuthorSync)
+            .values(
+                author_key=author_key, author_name=author_name, last_fetched_at=func.now(), changed_at=func.now(),
+                num_found=num_found, content_hash=fetched_hash
+            )
+            .on_conflict_do_update(
+                index_elements=[AuthorSync.author_key],
+                set_={
+                    "last_fetched_at": func.now(),
+                    "changed_at": case(
+                        (AuthorSync.content_hash == fetched_hash, AuthorSync.changed_at), else_=func.now()
+                    ),
+                    "num_found": num_found,
+                    "content_hash": fetched_hash,
+                }
+            )
+            .returning(AuthorSync.changed_at, AuthorSync.last_fetched_at)
+        )).one()
+        await self.db.commit()
+        # Both are now() of this transaction unless the content is the same as before.
+        return row.changed_at == row.last_fetched_at
+
+    async def get_syncs(self, author_keys: Iterable[str]) -> Dict[str, AuthorSync]:
+        """Returns the sync records of the given authors that exist, by author key."""
+        rows = await self.db.execute(select(AuthorSync).where(AuthorSync.author_key.in_(set(author_keys))))
+        return {sync.author_key: sync for sync in rows.scalars()}
+
+    async def stale_authors(self, ttl: float, limit: int) -> list[str]:
+        """
+        Returns up to `limit` names of authors fetched at least `ttl` seconds ago, the
+        most queried first.
+        """
+        rows = await self.db.execute(
+            select(AuthorSync.author_name)
+            .where(AuthorSync.last_fetched_at <= func.now() - timedelta(seconds=ttl))
+            .order_by(AuthorSync.query_count.desc(), AuthorSync.last_fetched_at)
+            .limit(limit)
+        )
+        return list(rows.scalars())
+
+    async def decay_query_counts(self):
+        """
+        Halve every `query_count`, so the refresh priority follows recent queries: an
+        author's count is about twice its queries of the last refresh round, and authors
+        no longer queried drop to 0. `AuthorRefresher` runs it once per round.
+        """
+        await self.db.execute(
+            update(AuthorSync).where(AuthorSync.query_count > 0).values(query_count=AuthorSync.query_count // 2)
+        )
+        await self.db.commit()
+
+    async def add_query_counts(self, counts: Dict[str, int]):
+        """Add counts from `AuthorQueryCounter.drain` to the authors' `query_count`; unknown authors are ignored."""
+        if not counts:
+            return
+        await self.db.execute(
+            update(AuthorSync.__table__)
+            .where(AuthorSync.author_key == bindparam("key"))
+            .values(query_count=AuthorSync.query_count + bindparam("count")),
+            [{"key": key, "count": count} for key, count in counts.items()]
+        )
+        await self.db.commit()
@@ -1,8 +1,25 @@
-from typing import Optional, Dict, Union
+import json
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, Optional, Dict, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, func, insert, literal, null, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
-from app.models.book_model import Books, Authors
+from app.core.metrics import record_ingest
+from app.core.text import book_dedupe_hash
+from app.models.book_listing_model import BookListing, listing_values
+from app.models.book_model import Books, Authors, book_authors, UNKNOWN_YEAR
+from app.models.catalog_facet_model import FACETS, NULL_VALUE, TOTAL, CatalogFacet, facet_counts, grouped_facets
+from app.models.catalog_version_model import CatalogVersion
+
+# Sort expressions of GET /books, each backed by a composite index of `book_listings` ending with `book_id`.
+SORT_KEYS = {
+    "id": BookListing.book_id,
+    "title": BookListing.title,
+    "first_publish_year": func.coalesce(BookListing.first_publish_year, UNKNOWN_YEAR),
+}
 
 
 class BookDataManager:
@@ -10,67 +27,374 @@ class BookDataManager:
     Manages storage and retrieval of books in the local database.
 
     This class provides methods to:
-    - Store books retrieved from an external API, handling duplicates gracefully.
+    - Store books retrieved from an external API idempotently, skipping duplicates.
     - Retrieve books from the database, optionally filtered by author and/or title.
+    - Count books by language, decade, ebook access and author (facets).
+
+    Listings are read from the `book_listings` read model, which the store methods
+    update in the same transaction as `books`, `authors` and `book_authors`, together
+    with the `catalog_facets` counts.
     """
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        # Changes of `catalog_facets` counts written with the next catalog version bump.
+        self._facet_changes = Counter()
 
-    def store_books(self, docs: list[dict]) -> Dict[str, Union[int, str]]:
+    async def store_books(self, docs: list[dict], bulk: bool = False,
+                          chunk_size: int = 500) -> Dict[str, Union[int, str]]:
         """
-        Store books in the local database, skipping duplicates based on title+authors.
+        Store books in the local database, skipping duplicates.
+
+        A doc is a duplicate when a stored book has its OpenLibrary work `key` or the
+        same title and authors (compared with `book_dedupe_hash`). Both are unique
+        indexes of `books`, and rows are written with `INSERT ... ON CONFLICT DO NOTHING`,
+        so storing the same docs again, also concurrently, inserts nothing.
 
         Args:
             docs (list[dict]): List of book dictionaries from external API.
+            bulk (bool): Use the set-based ingest path (a few statements per chunk
+                instead of several round trips per doc).
+            chunk_size (int): Number of docs handled per chunk in bulk mode.
 
         Returns:
             dict: summary with counts of inserted books/authors and duplicates.
         """
+        if bulk:
+            return await self._store_books_bulk(docs, chunk_size)
+
         inserted_books = 0
         inserted_authors = 0
         duplicates_count = 0
+        author_ids: Dict[str, int] = {}
+        links = []
+        listings = []
 
         for doc in docs:
-            title = doc.get("title")
-            ebook_access = doc.get("ebook_access")
-            first_publish_year = doc.get("first_publish_year")
-            language = doc.get("language", "")
-
-            authors_names = doc.get("author_name") or []
-
-            existing_book = (
-                self.db.query(Books)
-                .join(Books.authors)
-                .filter(Books.title == title)
-                .filter(Authors.name.in_(authors_names))
-                .first()
-            )
-            if existing_book:
+            authors_names = list(dict.fromkeys(doc.get("author_name") or []))
+            book_id = (await self.db.execute(
+                pg_insert(Books).values(self._book_values(doc, authors_names)).on_conflict_do_nothing()
+                .returning(Books.id)
+            )).scalar_one_or_none()
+            if book_id is None:
                 duplicates_count += 1
                 continue
 
-            authors_objs = []
             for name in authors_names:
-                author = self.db.query(Authors).filter_by(name=name).first()
-                if not author:
-                    author = Authors(name=name)
-                    self.db.add(author)
-                    self.db.flush()
-                    inserted_authors += 1
-                authors_objs.append(author)
-
-            book = Books(
-                title=title,
-                ebook_access=ebook_access,
-                first_publish_year=first_publish_year,
-                language=language,
-                authors=authors_objs
-            )
-            self.db.add(book)
+                if name not in author_ids:
+                    author_id = (await self.db.execute(select(Authors.id).filter_by(name=name))).scalar_one_or_none()
+                    if author_id is None:
+                        author_id = (await self.db.execute(
+                            pg_insert(Authors).values(name=name).on_conflict_do_nothing(index_elements=[Authors.name])
+                            .returning(Authors.id)
+                        )).scalar_one_or_none()
+                        if author_id is None:
+                            # Inserted by a concurrent transaction after the lookup.
+                            author_id = (await self.db.execute(select(Authors.id).filter_by(name=name))).scalar_one()
+                        else:
+                            inserted_authors += 1
+                    author_ids[name] = author_id
+                links.append({"book_id": book_id, "author_id": author_ids[name]})
+            listings.append(self._listing_values(book_id, doc, authors_names))
             inserted_books += 1
 
-        self.db.commit()
+        if inserted_books:
+            if links:
+                await self.db.execute(insert(book_authors), links)
+            await self.db.execute(insert(BookListing), listings)
+            self._facet_changes.update(facet_counts(listings))
+            await self._bump_catalog_version()
+        await self.db.commit()
+
+        result = self.summary(inserted_books, inserted_authors, duplicates_count)
+        record_ingest(result)
+        return result
+
+    async def _store_books_bulk(self, docs: list[dict], chunk_size: int) -> Dict[str, Union[int, str]]:
+        """
+        Set-based variant of `store_books`.
+
+        Each chunk of docs is written with one multi-row `INSERT ... ON CONFLICT DO
+        NOTHING RETURNING` into `books`, whose returned rows tell the inserted books from
+        the duplicates, followed by a lookup of the authors of the new books and
+        multi-row INSERTs for the missing authors, `book_authors` and `book_listings`
+        (batched by SQLAlchemy's "insertmanyvalues").
+        """
+        counts = {None: self.zero_counts()}
+        author_ids: Dict[str, int] = {}
+        for start in range(0, len(docs), chunk_size):
+            chunk = [(None, doc) for doc in docs[start:start + chunk_size]]
+            await self._store_chunk(chunk, author_ids, counts)
+
+        if counts[None]["inserted_books"]:
+            await self._bump_catalog_version()
+        await self.db.commit()
+
+        result = self.summary(**counts[None])
+        record_ingest(result)
+        return result
+
+    async def _store_chunk(
+        self,
+        chunk: list[tuple[Optional[str], dict]],
+        author_ids: Dict[str, int],
+        counts: Dict[Optional[str], Dict[str, int]]
+    ):
+        """
+        Write one chunk of `(label, doc)` pairs and add the outcome to `counts[label]`.
+
+        `author_ids` carries the authors resolved by earlier chunks, so they are not
+        looked up again. Docs repeating an earlier doc of the chunk are counted before the
+        INSERT; the database finds those repeating stored books (or earlier chunks).
+        """
+        candidates: Dict[str, tuple[Optional[str], dict, list[str]]] = {}
+        for label, doc in chunk:
+            authors_names = list(dict.fromkeys(doc.get("author_name") or []))
+            values = self._book_values(doc, authors_names)
+            if values["dedupe_hash"] in candidates:
+                counts[label]["duplicates_count"] += 1
+                continue
+            candidates[values["dedupe_hash"]] = (label, values, authors_names)
+
+        if not candidates:
+            return
+
+        rows = (await self.db.execute(
+            pg_insert(Books).on_conflict_do_nothing().returning(Books.id, Books.dedupe_hash),
+            [values for _, values, _ in candidates.values()]
+        )).all()
+        book_ids = {dedupe_hash: book_id for book_id, dedupe_hash in rows}
+        new_books = []
+        for dedupe_hash, (label, values, authors_names) in candidates.items():
+            if dedupe_hash in book_ids:
+                counts[label]["inserted_books"] += 1
+                new_books.append((book_ids[dedupe_hash], label, values, authors_names))
+            else:
+                counts[label]["duplicates_count"] += 1
+
+        if not new_books:
+            return
+
+        await self._resolve_authors(new_books, author_ids, counts)
+
+        links = [
+            {"book_id": book_id, "author_id": author_ids[name]}
+            for book_id, _, _, authors_names in new_books
+            for name in authors_names
+        ]
+        if links:
+            await self.db.execute(insert(book_authors), links)
+        listings = [
+            self._listing_values(book_id, values, authors_names)
+            for book_id, _, values, authors_names in new_books
+        ]
+        await self.db.execute(insert(BookListing), listings)
+        self._facet_changes.update(facet_counts(listings))
+
+    async def _resolve_authors(
+        self,
+        new_books: list[tuple[int, Optional[str], dict, list[str]]],
+        author_ids: Dict[str, int],
+        counts: Dict[Optional[str], Dict[str, int]]
+    ):
+        """
+        Add the ids of the authors of `new_books` to `author_ids`, inserting missing
+        authors. A new author is credited to the label of the first book naming it.
+        """
+        labels: Dict[str, Optional[str]] = {}
+        for _, label, _, authors_names in new_books:
+            for name in authors_names:
+                if name not in author_ids:
+                    labels.setdefault(name, label)
+        if not labels:
+            return
+
+        rows = await self.db.execute(select(Authors.id, Authors.name).where(Authors.name.in_(labels)))
+        author_ids.update({name: author_id for author_id, name in rows})
+        missing = sorted(name for name in labels if name not in author_ids)
+        if not missing:
+            return
+
+        rows = await self.db.execute(
+            pg_insert(Authors).on_conflict_do_nothing(index_elements=[Authors.name])
+            .returning(Authors.id, Authors.name),
+            [{"name": name} for name in missing]
+        )
+        for author_id, name in rows:
+            author_ids[name] = author_id
+            counts[labels[name]]["inserted_authors"] += 1
+        raced = [name for name in missing if name not in author_ids]
+        if raced:
+            # Inserted by a concurrent transaction between the lookup and the INSERT.
+            rows = await self.db.execute(select(Authors.id, Authors.name).where(Authors.name.in_(raced)))
+            author_ids.update({name: author_id for author_id, name in rows})
+
+    @staticmethod
+    def _book_values(doc: dict, authors_names: list[str]) -> dict:
+        """Returns the `books` row of an OpenLibrary doc."""
+        return {
+            "title": doc.get("title"),
+            "ebook_access": doc.get("ebook_access"),
+            "first_publish_year": doc.get("first_publish_year"),
+            "language": doc.get("language") or [],
+            "openlibrary_key": doc.get("key"),
+            "dedupe_hash": book_dedupe_hash(doc.get("title") or "", authors_names),
+        }
+
+    @staticmethod
+    def _listing_values(book_id: int, values: dict, authors_names: list[str]) -> dict:
+        return listing_values(
+            book_id, values.get("title"), values.get("ebook_access"), values.get("first_publish_year"),
+            values.get("language"), authors_names
+        )
+
+    async def refresh_books(self, docs: list[dict], bulk: bool = False,
+                            chunk_size: int = 500) -> Dict[str, Union[int, str]]:
+        """
+        Store docs of an author fetched again, writing only what is new or changed.
+
+        Docs are matched to stored books by work key, or by dedupe hash for books stored
+        without one, in one query. Unknown docs go through `store_books`; books whose
+        `ebook_access`, `first_publish_year` or `language` changed (or that have no work
+        key yet) are updated together with their `book_listings` row; unchanged docs are
+        not written and count as duplicates. Titles and authors are not updated: a doc
+        matched by work key keeps the stored ones, and a changed doc without a work key
+        gets a new dedupe hash and is stored as a new book.
+
+        Args:
+            docs (list[dict]): List of book dictionaries from external API.
+            bulk (bool): Passed to `store_books` for the new docs.
+            chunk_size (int): Passed to `store_books` for the new docs.
+
+        Returns:
+            dict: `store_books` summary with an additional `updated_books` count.
+        """
+        values = [self._book_values(doc, list(dict.fromkeys(doc.get("author_name") or []))) for doc in docs]
+        keys = {row["openlibrary_key"] for row in values if row["openlibrary_key"]}
+        rows = (await self.db.execute(
+            select(
+                Books.id, Books.openlibrary_key, Books.dedupe_hash, Books.ebook_access, Books.first_publish_year,
+                Books.language, BookListing.title, BookListing.authors
+            )
+            .outerjoin(BookListing, BookListing.book_id == Books.id)
+            .where(or_(Books.openlibrary_key.in_(keys), Books.dedupe_hash.in_({row["dedupe_hash"] for row in values})))
+        )).all() if values else []
+        by_key = {row.openlibrary_key: row for row in rows if row.openlibrary_key}
+        by_hash = {row.dedupe_hash: row for row in rows if row.dedupe_hash}
+
+        new_docs = []
+        changed: Dict[int, tuple] = {}
+        unchanged = 0
+        for doc, row in zip(docs, values):
+            stored = by_key.get(row["openlibrary_key"]) or by_hash.get(row["dedupe_hash"])
+            if stored is None:
+                new_docs.append(doc)
+            elif stored.id in changed or (
+                (stored.ebook_access, stored.first_publish_year, list(stored.language or []))
+                == (row["ebook_access"], row["first_publish_year"], row["language"])
+                and (stored.openlibrary_key or not row["openlibrary_key"])
+            ):
+                unchanged += 1
+            else:
+                changed[stored.id] = (stored, row)
+
+        result = await self.store_books(new_docs, bulk=bulk, chunk_size=chunk_size) if new_docs \
+            else self.summary(0, 0, 0)
+        if changed:
+            await self._update_books(list(changed.values()))
+            await self._bump_catalog_version()
+            await self.db.commit()
+        result = self.summary(result["inserted_books"], result["inserted_authors"], result["duplicates_count"] + unchanged)
+        result["updated_books"] = len(changed)
+        record_ingest({"inserted_books": 0, "inserted_authors": 0, "duplicates_count": unchanged,
+                       "updated_books": len(changed)})
+        return result
+
+    async def _update_books(self, changed: list[tuple]):
+        """Write the new fields of `(stored row, values)` pairs to `books` and their `book_listings` rows."""
+        fields = ("ebook_access", "first_publish_year", "language")
+        params = [
+            {"b_id": stored.id, "b_key": row["openlibrary_key"], **{f"b_{field}": row[field] for field in fields}}
+            for stored, row in changed
+        ]
+        await self.db.execute(
+            update(Books.__table__)
+            .where(Books.id == bindparam("b_id"))
+            .values(
+                openlibrary_key=func.coalesce(Books.openlibrary_key, bindparam("b_key")),
+                **{field: bindparam(f"b_{field}") for field in fields}
+            ),
+            params
+        )
+        listings = [
+            listing_values(stored.id, stored.title, row["ebook_access"], row["first_publish_year"], row["language"],
+                           stored.authors)
+            for stored, row in changed if stored.title is not None
+        ]
+        if listings:
+            self._facet_changes.subtract(facet_counts(
+                {"ebook_access": stored.ebook_access, "first_publish_year": stored.first_publish_year,
+                 "language": stored.language or [], "authors": stored.authors}
+                for stored, _ in changed if stored.title is not None
+            ))
+            self._facet_changes.update(facet_counts(listings))
+            await self.db.execute(
+                update(BookListing.__table__)
+                .where(BookListing.book_id == bindparam("b_id"))
+                .values({column: bindparam(f"b_{column}") for column in (*fields, "payload")}),
+                [
+                    {"b_id": listing["book_id"], **{f"b_{column}": listing[column] for column in (*fields, "payload")}}
+                    for listing in listings
+                ]
+            )
+
+    async def _bump_catalog_version(self):
+        """
+        Increments the catalog version in the current transaction, so it becomes visible
+        together with the stored books. Run it right before the commit: the row stays
+        locked until then, which serializes concurrent ingest transactions.
+
+        The `catalog_facets` changes collected since the last bump are written first, in
+        one statement and in key order, so concurrent writers lock the counter rows in
+        the same order.
+        """
+        changes = sorted((key, count) for key, count in self._facet_changes.items() if count)
+        self._facet_changes.clear()
+        if changes:
+            statement = pg_insert(CatalogFacet)
+            await self.db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[CatalogFacet.facet, CatalogFacet.value],
+                    set_={"count": CatalogFacet.count + statement.excluded.count}
+                ),
+                [{"facet": facet, "value": value, "count": count} for (facet, value), count in changes]
+            )
+        await self.db.execute(
+            pg_insert(CatalogVersion)
+            .values(id=1, version=1)
+            .on_conflict_do_update(
+                index_elements=[CatalogVersion.id],
+                set_={"version": CatalogVersion.version + 1, "updated_at": func.now()}
+            )
+        )
 
+    async def get_catalog_version(self) -> tuple[int, Optional[datetime]]:
+        """
+        Returns the catalog version and the time of the last write that bumped it;
+        `(0, None)` before the first books are stored.
+        """
+        row = (await self.db.execute(
+            select(CatalogVersion.version, CatalogVersion.updated_at).where(CatalogVersion.id == 1)
+        )).first()
+        return (row.version, row.updated_at) if row else (0, None)
+
+    @staticmethod
+    def zero_counts() -> Dict[str, int]:
+        """Counts of the `StoreBooksResponse` payload before anything is stored."""
+        return {"inserted_books": 0, "inserted_authors": 0, "duplicates_count": 0}
+
+    @staticmethod
+    def summary(inserted_books: int, inserted_authors: int, duplicates_count: int) -> Dict[str, Union[int, str]]:
+        """Build the `StoreBooksResponse` payload for the given counts."""
         message = (
             f"{duplicates_count} book{'s' if duplicates_count != 1 else ''} of requested author already exist in the database"
             if duplicates_count else ""
@@ -83,18 +407,214 @@ class BookDataManager:
             "message": message
         }
 
-    def get_books(self, author: Optional[str] = None, title: Optional[str] = None):
+    @staticmethod
+    async def warm_up(conn: AsyncConnection):
+        """Runs the GET /books listing queries once on `conn`, e.g. to prepare them on a fresh pool connection."""
+        async with AsyncSession(bind=conn) as db:
+            await BookDataManager(db).get_books(limit=1)
+
+    async def get_books(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        search: Optional[str] = None,
+        min_similarity: float = 0.3,
+        sort: str = "id",
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        language: Optional[str] = None
+    ):
         """
         Retrieve books from the local database, optionally filtered by author and/or title.
+
+        Books are read from the `book_listings` read model in one query, without joins or
+        relationship loading; the author filter matches the joined author names through
+        a trigram index.
+
+        Results are ordered by `sort` (`id`, `title` or `first_publish_year`) with `id` as a
+        tie-breaker, and paginated with a keyset: `after` is the `(sort value, id)` pair of
+        the last book of the previous page. Every returned `BookListing` gets a `sort_key`
+        attribute holding its own pair.
+
+        With `search`, only books whose title or any author name is trigram-similar to the
+        phrase (at least `min_similarity`) are returned, best matches first, and `sort` is
+        ignored. The `%` operator used for matching is served by the `pg_trgm` GIN indexes;
+        author names are matched on `authors`, so that branch is a semi-join.
+        """
+        query = await self._listing_query(author, title, language, search, min_similarity, sort, descending, after)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [self._listing_row(book, key) for book, key in (await self.db.execute(query)).all()]
+
+    async def iter_books(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        search: Optional[str] = None,
+        min_similarity: float = 0.3,
+        sort: str = "id",
+        descending: bool = False,
+        after: Optional[tuple] = None,
+        batch_size: int = 1000,
+        language: Optional[str] = None
+    ) -> AsyncIterator[BookListing]:
         """
-        query = self.db.query(Books)
+        Stream all books matching the filters, in the same order as `get_books`.
+
+        Rows are read from a server-side cursor `batch_size` at a time (`yield_per`), so
+        memory use does not depend on how many books match.
+        """
+        query = await self._listing_query(author, title, language, search, min_similarity, sort, descending, after)
+        result = await self.db.stream(query.execution_options(yield_per=batch_size))
+        async for book, key in result:
+            yield self._listing_row(book, key)
+
+    async def estimate_books_count(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        search: Optional[str] = None,
+        min_similarity: float = 0.3,
+        language: Optional[str] = None
+    ) -> int:
+        """
+        Estimate how many books match the filters from the planner's row estimate.
+
+        Runs `EXPLAIN` instead of `COUNT(*)`, so the cost does not grow with the number
+        of matching rows. The result is only as accurate as the table statistics.
+        """
+        query = self._filtered_query(author, title, language)
+        if search:
+            query, _ = await self._apply_search(query, search, min_similarity)
+        connection = await self.db.connection()
+        compiled = query.compile(dialect=connection.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def _listing_query(
+        self,
+        author: Optional[str],
+        title: Optional[str],
+        language: Optional[str],
+        search: Optional[str],
+        min_similarity: float,
+        sort: str,
+        descending: bool,
+        after: Optional[tuple]
+    ):
+        query = self._filtered_query(author, title, language)
+        if search:
+            query, sort_key = await self._apply_search(query, search, min_similarity)
+            if after is not None:
+                query = query.where(or_(
+                    sort_key < after[0],
+                    and_(sort_key == after[0], BookListing.book_id > after[1])
+                ))
+            query = query.order_by(sort_key.desc(), BookListing.book_id)
+        else:
+            sort_key = SORT_KEYS[sort]
+            if after is not None:
+                position = tuple_(sort_key, BookListing.book_id) if sort != "id" else BookListing.book_id
+                value = tuple_(*after) if sort != "id" else after[1]
+                query = query.where(position < value if descending else position > value)
+            if descending:
+                query = query.order_by(sort_key.desc(), BookListing.book_id.desc())
+            else:
+                query = query.order_by(sort_key, BookListing.book_id)
+        return query.add_columns(sort_key)
+
+    @staticmethod
+    def _listing_row(book: BookListing, key) -> BookListing:
+        book.sort_key = (key, book.book_id)
+        return book
+
+    @staticmethod
+    def _filtered_query(author: Optional[str], title: Optional[str], language: Optional[str] = None, columns=None):
+        query = select(*(columns or [BookListing]))
         if author:
-            query = query.join(Books.authors).filter(Authors.name.ilike(f"%{author}%"))
+            query = query.where(BookListing.authors_text.ilike(f"%{author}%"))
         if title:
-            query = query.filter(Books.title.ilike(f"%{title}%"))
-        results = query.all()
+            query = query.where(BookListing.title.ilike(f"%{title}%"))
+        if language:
+            query = query.where(BookListing.language.op("@>")(array([language])))
+        return query
+
+    async def get_facets(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        language: Optional[str] = None,
+        limit: int = 10
+    ) -> dict:
+        """
+        Count the books matching the filters by language, decade of `first_publish_year`,
+        `ebook_access` and author.
 
-        for book in results:
-            book.authors_list = [author.name for author in book.authors]
+        Without filters the counts are read from `catalog_facets`, which the store methods
+        keep up to date: one query reading `limit` rows per facet from an index, whatever
+        the size of the catalog. With filters, the matching `book_listings` rows (found
+        through the same indexes as `get_books`, and the GIN index of `language`) are
+        grouped in one query.
 
-        return results
+        Returns:
+            dict: `total` number of matching books and, for every facet of `FACETS`, up to
+            `limit` `(value, count)` pairs, the most frequent first. The value is text,
+            None for books without an `ebook_access` or `first_publish_year`.
+        """
+        if author or title or language:
+            rows = await self._grouped_facets(author, title, language, limit)
+        else:
+            rows = await self._counted_facets(limit)
+
+        facets = {"total": 0, **{facet: [] for facet in FACETS}}
+        for facet, value, count in rows:
+            if facet == TOTAL:
+                facets["total"] = count
+            elif count:
+                facets[facet].append((value, count))
+        return facets
+
+    async def _counted_facets(self, limit: int):
+        def top(facet: str):
+            return (
+                select(CatalogFacet.facet, func.nullif(CatalogFacet.value, NULL_VALUE), CatalogFacet.count)
+                .where(CatalogFacet.facet == facet, CatalogFacet.count > 0)
+                .order_by(CatalogFacet.count.desc(), CatalogFacet.value)
+                .limit(limit)
+            )
+
+        return (await self.db.execute(union_all(top(TOTAL), *(top(facet) for facet in FACETS)))).all()
+
+    async def _grouped_facets(self, author: Optional[str], title: Optional[str], language: Optional[str], limit: int):
+        listings = self._filtered_query(author, title, language, columns=[
+            BookListing.language, BookListing.first_publish_year, BookListing.ebook_access, BookListing.authors
+        ]).cte("matching_listings")
+        groups = [select(literal(TOTAL).label("facet"), null(), func.count()).select_from(listings)]
+        for facet, query in grouped_facets(listings).items():
+            grouped = query.subquery()
+            groups.append(
+                select(literal(facet).label("facet"), grouped.c.value, grouped.c.count)
+                .order_by(grouped.c.count.desc(), grouped.c.value)
+                .limit(limit)
+            )
+        return (await self.db.execute(union_all(*groups))).all()
+
+    async def _apply_search(self, query, search: str, min_similarity: float):
+        await self.db.execute(
+            select(func.set_config("pg_trgm.similarity_threshold", str(min_similarity), True))
+        )
+        matching_authors = (
+            select(book_authors.c.book_id)
+            .join(Authors, Authors.id == book_authors.c.author_id)
+            .where(Authors.name.op("%")(search))
+        )
+        author_name = func.unnest(BookListing.authors).column_valued("author_name")
+        author_score = select(func.max(func.similarity(author_name, search))).scalar_subquery()
+        score = func.greatest(func.similarity(BookListing.title, search), func.coalesce(author_score, 0))
+        query = query.where(or_(BookListing.title.op("%")(search), BookListing.book_id.in_(matching_authors)))
+        return query, score
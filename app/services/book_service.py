@@ -1,75 +1,491 @@
-import requests
+import asyncio
+import time
+from datetime import datetime
 
+import httpx
 from fastapi import HTTPException, status
 
 from app.clients.open_library_api_client import OpenLibraryAPIClient
-from typing import Optional, List
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, List
 
-from sqlalchemy.orm import Session
+from app.core.database import LockTimeoutError, SessionLocal, advisory_lock
+from app.core.instrumentation import record_serialization
+from app.core.listing_cache import CachedListing, ListingCache, listing_key
+from app.core.metrics import AUTHOR_SYNCS
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import dumps_book, dumps_book_line, dumps_books
+from app.core.single_flight import SingleFlight
+from app.core.text import normalize_name
+from app.core.settings import settings
 
-from app.models.schemas import StoreBooksResponse, BookResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.author_sync_model import AuthorSync
+from app.models.catalog_facet_model import FACETS
+from app.models.schemas import BatchStoreBooksResponse, BookFacetsResponse, BookPage, FacetCount, StoreBooksResponse
+from app.services.author_sync_manager import AuthorSyncManager, author_queries, content_hash, doc_fingerprint
 from app.services.book_data_manager import BookDataManager
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Streamed rows after the first are sent in chunks of about this many bytes rather than
+# one per row, so per-message overhead (and the flush of a compressed stream) is paid
+# once per chunk. A chunk is sent early once this many seconds passed since the last
+# one, so slow reads do not hold back rows already encoded.
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_FLUSH_INTERVAL = 0.1
+
+# JSON types a cursor's sort value may have for each ordering; anything else would reach
+# the keyset comparison and fail in the database instead of being rejected as a bad cursor.
+CURSOR_VALUE_TYPES = {
+    "id": (int,),
+    "title": (str,),
+    "first_publish_year": (int,),
+    "search": (int, float),
+}
+
+# Ingests of one author in flight in this process, keyed by normalized author name.
+ingest_flights = SingleFlight()
+
 
 class BookService:
     """
     Service layer responsible for fetching books from an external API
     and interacting with the database via BookDataManager.
     """
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, client: Optional[OpenLibraryAPIClient] = None,
+                 session_factory: Optional[Callable] = None):
         """
         Initialize the BookService with a database session.
 
         Args:
-            db (Session): SQLAlchemy session connected to the database.
+            db (AsyncSession): SQLAlchemy async session connected to the database.
+            client (Optional[OpenLibraryAPIClient]): OpenLibrary client backed by the
+                shared HTTP client. Only needed for fetching books.
+            session_factory (Optional[Callable]): Factory of the sessions coalesced ingests
+                run on. Defaults to `SessionLocal`.
         """
         self.book_data_manager = BookDataManager(db)
-        self.client = OpenLibraryAPIClient()
+        self.author_sync_manager = AuthorSyncManager(db)
+        self.client = client
+        self.session_factory = session_factory or SessionLocal
 
-    def fetch_and_store_books(self, author_name: str) -> StoreBooksResponse:
+    async def fetch_and_store_books(
+        self,
+        author_name: str,
+        on_page: Optional[Callable[[int, Dict[str, int]], Awaitable[None]]] = None
+    ) -> StoreBooksResponse:
         """
         Fetch books by author from OpenLibrary API and store them in the database.
 
+        The author's bibliography is fetched page by page and every page is stored
+        as soon as it arrives. Both the network and the database waits happen on
+        the event loop.
+
+        An author fetched less than `author_freshness_ttl` seconds ago is not fetched
+        again (`up_to_date` in the response). Pages of an author fetched before go through
+        `BookDataManager.refresh_books` as they arrive, which writes only new and changed
+        docs; only their fingerprints are kept for the content hash of the bibliography.
+        Every call counts as a query of the author for the background refresh priority.
+
+        Concurrent calls for the same author (compared with `normalize_name`) are
+        coalesced: the first one does the work and the others get its result; only the
+        first caller's `on_page` is called. The shared ingest runs on a session of its own,
+        not on the caller's, so it can outlive a cancelled caller while others wait for
+        it; it is cancelled when every caller is. Across processes and nodes, a Postgres
+        advisory lock on the author lets only one ingest of an author run at a time.
+
         Args:
             author_name (str): Name of the author to fetch books for.
+            on_page (Optional[Callable]): Awaited after every stored page with the number
+                of pages fetched so far and the running `inserted_books`, `inserted_authors`
+                and `duplicates_count` totals.
 
         Returns:
             StoreBooksResponse: Pydantic model containing summary of inserted books,
             inserted authors, duplicates count, and optional message.
 
         Raises:
-            HTTPException: If fetching from OpenLibrary fails.
+            HTTPException: If fetching from OpenLibrary fails, or 503 if another process
+                keeps ingesting the author for longer than `ingest_lock_timeout`.
         """
+        key = normalize_name(author_name)
+        author_queries.add(key)
+        return await self.refresh_author(author_name, on_page)
+
+    async def refresh_author(
+        self,
+        author_name: str,
+        on_page: Optional[Callable[[int, Dict[str, int]], Awaitable[None]]] = None
+    ) -> StoreBooksResponse:
+        """`fetch_and_store_books` without counting a query of the author, e.g. for `AuthorRefresher`."""
+        key = normalize_name(author_name)
+        return await ingest_flights.run(key, lambda: self._fetch_and_store_books_locked(author_name, key, on_page))
+
+    async def _fetch_and_store_books_locked(
+        self,
+        author_name: str,
+        key: str,
+        on_page: Optional[Callable[[int, Dict[str, int]], Awaitable[None]]]
+    ) -> StoreBooksResponse:
         try:
-            docs = self.client.fetch_books_by_author(author_name)
-        except requests.exceptions.RequestException as e:
+            async with advisory_lock(f"ingest:{key}", timeout=settings.ingest_lock_timeout) as conn:
+                async with self.session_factory(bind=conn) as db:
+                    ingest = BookService(db, self.client, self.session_factory)
+                    return await ingest._fetch_and_store_books(author_name, key, on_page)
+        except LockTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Books of author '{author_name}' are being stored by another request, try again later"
+            )
+
+    async def _fetch_and_store_books(
+        self,
+        author_name: str,
+        key: str,
+        on_page: Optional[Callable[[int, Dict[str, int]], Awaitable[None]]]
+    ) -> StoreBooksResponse:
+        # Checked under the lock: an ingest that waited for another one finds its result fresh.
+        sync = await self.author_sync_manager.get_sync(key)
+        if sync is not None and sync.is_fresh(settings.author_freshness_ttl):
+            AUTHOR_SYNCS.labels("fresh").inc()
+            return self._up_to_date_response(sync)
+
+        counts = {"inserted_books": 0, "inserted_authors": 0, "duplicates_count": 0, "updated_books": 0}
+        pages_fetched = 0
+        fingerprints = []
+        num_found = None
+
+        def record_num_found(value: int):
+            nonlocal num_found
+            num_found = value
+
+        def add(result: dict):
+            for name in counts:
+                counts[name] += result.get(name, 0)
+
+        try:
+            async for docs in self.client.iter_books_by_author(author_name, on_num_found=record_num_found):
+                fingerprints.extend(doc_fingerprint(doc) for doc in docs)
+                # Known authors: only new and changed docs are written.
+                store = self.book_data_manager.store_books if sync is None else self.book_data_manager.refresh_books
+                add(await store(docs, bulk=settings.ingest_bulk, chunk_size=settings.ingest_chunk_size))
+                pages_fetched += 1
+                if on_page is not None:
+                    await on_page(pages_fetched, {name: counts[name] for name in BookDataManager.zero_counts()})
+        except httpx.HTTPError as e:
             raise HTTPException(
                 status_code=status.HTTP_502_BAD_GATEWAY,
                 detail=f"Failed to fetch books from OpenLibrary: {str(e)}"
             )
-        result = self.book_data_manager.store_books(docs)
-        return StoreBooksResponse(**result)
+        changed = await self.author_sync_manager.record_fetch(key, author_name, num_found, content_hash(fingerprints))
+        AUTHOR_SYNCS.labels("changed" if changed else "unchanged").inc()
+        updated_books = counts.pop("updated_books")
+        return StoreBooksResponse(**BookDataManager.summary(**counts), updated_books=updated_books)
+
+    @staticmethod
+    def _up_to_date_response(sync: AuthorSync) -> StoreBooksResponse:
+        return StoreBooksResponse(
+            inserted_books=0,
+            inserted_authors=0,
+            duplicates_count=0,
+            message=f"Books of requested author were fetched at {sync.last_fetched_at.isoformat()}, "
+                    f"OpenLibrary was not queried",
+            up_to_date=True
+        )
+
+    async def fetch_and_store_books_batch(self, authors: List[str]) -> BatchStoreBooksResponse:
+        """
+        Fetch books of several authors from OpenLibrary API and store them in the database.
+
+        Authors are fetched concurrently, at most `ingest_batch_concurrency` at a time
+        (each of them with up to `openlibrary_max_concurrency` page requests in flight).
+        Names that normalize to the same author are fetched once, and authors fetched
+        less than `author_freshness_ttl` seconds ago not at all. Every other author goes
+        through `refresh_author`, so it is coalesced with and locked against other
+        ingests of the same author, and changed books of known authors are updated.
+
+        Args:
+            authors (List[str]): Names of the authors to fetch books for.
+
+        Returns:
+            BatchStoreBooksResponse: Summary per author, the authors that could not be
+            fetched with the reason, and the totals.
+        """
+        unique_authors = {}
+        for author in authors:
+            unique_authors.setdefault(normalize_name(author), author)
+        for key in unique_authors:
+            author_queries.add(key)
+        fresh = {
+            key: sync for key, sync in (await self.author_sync_manager.get_syncs(unique_authors)).items()
+            if sync.is_fresh(settings.author_freshness_ttl)
+        }
+        AUTHOR_SYNCS.labels("fresh").inc(len(fresh))
+        semaphore = asyncio.Semaphore(settings.ingest_batch_concurrency)
+
+        async def fetch(author: str) -> tuple[str, Optional[StoreBooksResponse], Optional[str]]:
+            async with semaphore:
+                try:
+                    return author, await self.refresh_author(author), None
+                except HTTPException as e:
+                    return author, None, str(e.detail)
+
+        fetched = await asyncio.gather(*(fetch(author) for key, author in unique_authors.items() if key not in fresh))
+        stored = {author: response for author, response, _ in fetched if response is not None}
+        errors = {author: error for author, _, error in fetched if error is not None}
+
+        results = {
+            author: self._up_to_date_response(fresh[key]) if key in fresh else stored[author]
+            for key, author in unique_authors.items() if key in fresh or author in stored
+        }
+        totals = {
+            key: sum(getattr(response, key) for response in stored.values())
+            for key in BookDataManager.zero_counts()
+        }
+        return BatchStoreBooksResponse(
+            results=results,
+            errors=errors,
+            summary=StoreBooksResponse(
+                **BookDataManager.summary(**totals),
+                updated_books=sum(response.updated_books for response in stored.values())
+            )
+        )
+
+    async def get_catalog_version(self) -> tuple[int, Optional[datetime]]:
+        """Returns the catalog version and the time of its last change, see `BookDataManager.get_catalog_version`."""
+        return await self.book_data_manager.get_catalog_version()
 
-    def get_books(self, author: Optional[str] = None, title: Optional[str] = None) -> List[BookResponse]:
+    async def get_books(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        search: Optional[str] = None,
+        min_similarity: float = 0.3,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+        order: str = "asc",
+        include_total: bool = False,
+        language: Optional[str] = None
+    ) -> BookPage:
         """
-        Retrieve books from the database, optionally filtered by author and/or title.
+        Retrieve a page of books from the database, optionally filtered by author and/or title.
+
+        An `author` filter counts as a query of that author for the background refresh
+        priority (`AuthorRefresher`).
 
         Args:
             author (Optional[str]): Filter books by author name (partial match).
             title (Optional[str]): Filter books by title (partial match).
+            search (Optional[str]): Fuzzy phrase matched against titles and author names;
+                results are ordered by similarity.
+            min_similarity (float): Minimum trigram similarity for `search` matches.
+            limit (Optional[int]): Maximum number of books on the page. No limit when None.
+            cursor (Optional[str]): Opaque cursor returned with the previous page.
+            sort (str): Sort field: `id`, `title` or `first_publish_year`. Ignored with `search`.
+            order (str): Sort direction: `asc` or `desc`. Ignored with `search`.
+            include_total (bool): Whether to add the planner's estimate of matching books.
+            language (Optional[str]): Filter books available in this language (exact code).
 
         Returns:
-            List[BookResponse]: List of books validated and serialized as Pydantic models.
+            BookPage: The listing rows of the page, the next page cursor and, optionally,
+            the approximate total. The rows are not validated as `BookResponse` models;
+            `app.core.serialization` turns them into JSON with the same fields.
+
+        Raises:
+            HTTPException: 400 if the cursor is malformed or was issued for another ordering.
         """
-        books = self.book_data_manager.get_books(author, title)
-        response = [
-            BookResponse(
-                title=book.title,
-                ebook_access=book.ebook_access,
-                first_publish_year=book.first_publish_year,
-                authors=book.authors_list,
-                language=book.language
+        ordering = self._ordering(search, sort, order)
+        after = self._decode_after(cursor, ordering)
+        if author:
+            author_queries.add(normalize_name(author))
+
+        books = await self.book_data_manager.get_books(
+            author,
+            title,
+            search=search,
+            min_similarity=min_similarity,
+            sort=sort,
+            descending=order == "desc",
+            after=after,
+            limit=limit + 1 if limit else None,
+            language=language
+        )
+        next_cursor = None
+        if limit and len(books) > limit:
+            books = books[:limit]
+            next_cursor = encode_cursor([*ordering, *books[-1].sort_key])
+
+        total_estimate = None
+        if include_total:
+            total_estimate = await self.book_data_manager.estimate_books_count(
+                author, title, search=search, min_similarity=min_similarity, language=language
             )
-            for book in books
-        ]
-        return response
+
+        return BookPage.model_construct(items=books, next_cursor=next_cursor, total_estimate=total_estimate)
+
+    async def get_serialized_books(self, catalog_version: int, cache: Optional[ListingCache],
+                                   **params) -> CachedListing:
+        """
+        Returns a page of `get_books` serialized as a JSON array, from `cache` when it
+        holds the page for `catalog_version`.
+
+        Args:
+            catalog_version (int): Catalog version read for the request, before the page.
+            cache (Optional[ListingCache]): Cache of serialized pages, if enabled.
+            **params: Filters, paging and ordering of `get_books`.
+
+        Returns:
+            CachedListing: The JSON body with the next page cursor and total estimate.
+        """
+        key = listing_key(**params)
+        cached = cache.get(catalog_version, key) if cache is not None else None
+        if cached is not None:
+            if params.get("author"):
+                author_queries.add(normalize_name(params["author"]))
+            return cached
+
+        page = await self.get_books(**params)
+        started = time.perf_counter()
+        body = dumps_books(page.items)
+        record_serialization(time.perf_counter() - started)
+        if cache is not None:
+            cache.set(catalog_version, key, body, page.next_cursor, page.total_estimate)
+        return CachedListing(body, page.next_cursor, page.total_estimate)
+
+    async def get_facets(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        language: Optional[str] = None,
+        limit: int = 10
+    ) -> BookFacetsResponse:
+        """
+        Count the books matching the filters by language, decade, `ebook_access` and author.
+
+        Args:
+            author (Optional[str]): Filter books by author name (partial match).
+            title (Optional[str]): Filter books by title (partial match).
+            language (Optional[str]): Filter books available in this language (exact code).
+            limit (int): Maximum number of values per facet, the most frequent first.
+
+        Returns:
+            BookFacetsResponse: The number of matching books and the counts of every facet.
+        """
+        if author:
+            author_queries.add(normalize_name(author))
+        facets = await self.book_data_manager.get_facets(author, title, language, limit)
+        counts = {
+            facet: [
+                FacetCount(value=int(value) if facet == "decade" and value is not None else value, count=count)
+                for value, count in facets[facet]
+            ]
+            for facet in FACETS
+        }
+        return BookFacetsResponse(total=facets["total"], **counts)
+
+    def stream_books(
+        self,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        search: Optional[str] = None,
+        min_similarity: float = 0.3,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+        order: str = "asc",
+        media_type: str = NDJSON_MEDIA_TYPE,
+        language: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream all books matching the filters as encoded chunks.
+
+        Takes the same filters, ordering and cursor as `get_books`, but has no page limit.
+        Books are encoded as they are read from the database, so memory use stays
+        constant for exports of any size. The opening `[` of a JSON array and the first
+        book are sent at once; later books are batched into chunks of up to
+        `STREAM_CHUNK_BYTES`, sent at least every `STREAM_FLUSH_INTERVAL` seconds.
+
+        Args:
+            media_type (str): `application/x-ndjson` for one JSON object per line,
+                `application/json` for a single JSON array.
+
+        Returns:
+            AsyncIterator[bytes]: Encoded response body chunks.
+
+        Raises:
+            HTTPException: 400 if the cursor is malformed or was issued for another ordering.
+        """
+        after = self._decode_after(cursor, self._ordering(search, sort, order))
+        books = self.book_data_manager.iter_books(
+            author,
+            title,
+            search=search,
+            min_similarity=min_similarity,
+            sort=sort,
+            descending=order == "desc",
+            after=after,
+            batch_size=settings.books_stream_batch_size,
+            language=language
+        )
+        if media_type == NDJSON_MEDIA_TYPE:
+            return self._ndjson(books)
+        return self._json_array(books)
+
+    async def _ndjson(self, books: AsyncIterator) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks(dumps_book_line(book) async for book in books):
+            yield chunk
+
+    async def _json_array(self, books: AsyncIterator) -> AsyncIterator[bytes]:
+        async def elements():
+            separator = b""
+            async for book in books:
+                yield separator + dumps_book(book)
+                separator = b","
+
+        yield b"["
+        async for chunk in self._chunks(elements()):
+            yield chunk
+        yield b"]"
+
+    @staticmethod
+    async def _chunks(parts: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Sends the first part at once, then joins parts up to the size and time bounds."""
+        chunk = bytearray()
+        flushed_at = None
+        async for part in parts:
+            chunk += part
+            now = time.monotonic()
+            if flushed_at is None or len(chunk) >= STREAM_CHUNK_BYTES or now - flushed_at >= STREAM_FLUSH_INTERVAL:
+                yield bytes(chunk)
+                chunk.clear()
+                flushed_at = now
+        if chunk:
+            yield bytes(chunk)
+
+    @staticmethod
+    def _ordering(search: Optional[str], sort: str, order: str) -> list[str]:
+        return ["search"] if search else [sort, order]
+
+    @staticmethod
+    def _decode_after(cursor: Optional[str], ordering: list[str]) -> Optional[tuple]:
+        """Returns the keyset position stored in `cursor`, checking it matches `ordering`."""
+        if not cursor:
+            return None
+        try:
+            payload = decode_cursor(cursor)
+        except ValueError:
+            payload = []
+        if (payload[:-2] != ordering or len(payload) != len(ordering) + 2
+                or not BookService._is_cursor_value(payload[-2], CURSOR_VALUE_TYPES[ordering[0]])
+                or not BookService._is_cursor_value(payload[-1], (int,))):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor for the requested ordering"
+            )
+        return tuple(payload[-2:])
+
+    @staticmethod
+    def _is_cursor_value(value, types: tuple) -> bool:
+        # JSON booleans decode to `bool`, a subclass of `int`, so they are excluded explicitly.
+        return isinstance(value, types) and not isinstance(value, bool)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, read_router
+from app.core.replicas import ReplicaRouter
+from app.core.settings import settings
+
+
+class HealthProber:
+    """
+    Checks OpenLibrary, the database and its read replicas in the background and keeps
+    the last result. Failing replicas are taken out of read rotation.
+
+    Health endpoints answer from `snapshot` only, so a probe request never waits on
+    (or triggers) outbound traffic. The snapshot holds the status and latency of every
+    checked component and the time of the last check.
+    """
+    EXTERNAL_API_PATH = "/books/OL1M.json"
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        session_factory: Callable = SessionLocal,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        replica_router: ReplicaRouter = read_router
+    ):
+        """
+        Args:
+            http_client (httpx.AsyncClient): Shared HTTP client used to reach OpenLibrary.
+            session_factory (Callable): Factory of database sessions.
+            interval (Optional[float]): Seconds between checks. Defaults to settings.
+            timeout (Optional[float]): Timeout of a single check. Defaults to settings.
+            replica_router (ReplicaRouter): Router whose replicas are checked.
+        """
+        self.http_client = http_client
+        self.session_factory = session_factory
+        self.interval = interval or settings.health_probe_interval
+        self.timeout = timeout or settings.health_probe_timeout
+        self.replica_router = replica_router
+        self.snapshot = {
+            "app_status": "ok",
+            "external_api_status": "unknown",
+            "external_api_latency_ms": None,
+            "database_status": "unknown",
+            "database_latency_ms": None,
+            "database_replicas": {},
+            "checked_at": None,
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the background probing loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancels the background probing loop and waits for it to finish."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def is_ready(self) -> bool:
+        """
+        Returns True when the last check reached the database and is recent enough.
+
+        OpenLibrary is deliberately not part of readiness: the service can still serve
+        stored books while the external API is down.
+        """
+        checked_at = self.snapshot["checked_at"]
+        if checked_at is None or self.snapshot["database_status"] != "ok":
+            return False
+        age = (datetime.now(timezone.utc) - checked_at).total_seconds()
+        return age <= settings.health_probe_max_age
+
+    def record_database_check(self, ok: bool, latency_ms: float):
+        """Updates the database part of the snapshot with a check done elsewhere, e.g. the startup pool warm-up."""
+        self.snapshot = dict(
+            self.snapshot,
+            database_status="ok" if ok else "failed",
+            database_latency_ms=round(latency_ms, 1),
+            checked_at=datetime.now(timezone.utc)
+        )
+
+    async def probe_once(self):
+        """Runs all checks concurrently and replaces the snapshot with their results."""
+        (external_status, external_latency), (database_status, database_latency), replicas = await asyncio.gather(
+            self._timed(self._check_external_api),
+            self._timed(self._check_database),
+            self.replica_router.check(self.timeout, settings.db_replica_max_lag)
+        )
+        self.snapshot = {
+            "app_status": "ok",
+            "external_api_status": external_status,
+            "external_api_latency_ms": external_latency,
+            "database_status": database_status,
+            "database_latency_ms": database_latency,
+            "database_replicas": replicas,
+            "checked_at": datetime.now(timezone.utc),
+        }
+
+    async def _run(self):
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    async def _timed(self, check: Callable[[], Awaitable[bool]]) -> tuple[str, float]:
+        started = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(check(), timeout=self.timeout)
+        except Exception:
+            ok = False
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        return ("ok" if ok else "failed"), latency_ms
+
+    async def _check_external_api(self) -> bool:
+        response = await self.http_client.get(self.EXTERNAL_API_PATH, timeout=self.timeout)
+        return response.status_code == 200
+
+    async def _check_database(self) -> bool:
+        async with self.session_factory() as db:
+            await db.execute(text("SELECT 1"))
+            return True
@@ -0,0 +1,122 @@
+import uuid
+from datetime import timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ingest_job_model import IngestJob, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
+from app.models.schemas import IngestJobResponse, StoreBooksResponse
+
+
+class IngestJobManager:
+    """
+    Manages the `ingest_jobs` table used as a persistent queue of ingestion jobs.
+
+    Jobs are claimed with `FOR UPDATE SKIP LOCKED`, so any number of workers (also in
+    other processes) can poll the same table without taking the same job twice.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(self, author: str) -> IngestJob:
+        """
+        Queue a new ingestion job for `author`.
+
+        Args:
+            author (str): Name of the author whose books should be fetched.
+
+        Returns:
+            IngestJob: The stored job in the `queued` state.
+        """
+        job = IngestJob(id=str(uuid.uuid4()), author=author, state=JOB_QUEUED)
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[IngestJob]:
+        return await self.db.get(IngestJob, job_id)
+
+    async def claim_next_job(self, stale_after: float) -> Optional[IngestJob]:
+        """
+        Move the oldest claimable job to `running` and return it.
+
+        A job is claimable when it is queued, or when it is running but has not
+        reported progress for `stale_after` seconds (its worker died, e.g. on restart).
+
+        Args:
+            stale_after (float): Seconds without progress after which a running job is retried.
+
+        Returns:
+            Optional[IngestJob]: The claimed job, or None when nothing is waiting.
+        """
+        claimable = (
+            select(IngestJob.id)
+            .where(or_(
+                IngestJob.state == JOB_QUEUED,
+                and_(
+                    IngestJob.state == JOB_RUNNING,
+                    IngestJob.updated_at < func.now() - timedelta(seconds=stale_after)
+                )
+            ))
+            .order_by(IngestJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        job = (await self.db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == claimable)
+            .values(state=JOB_RUNNING, started_at=func.now(), error=None)
+            .returning(IngestJob)
+        )).scalar_one_or_none()
+        await self.db.commit()
+        return job
+
+    async def update_progress(self, job_id: str, pages_fetched: int, totals: Dict[str, int]):
+        """Record the pages fetched and rows stored so far; also marks the job as alive."""
+        await self._update(job_id, pages_fetched=pages_fetched, **totals)
+
+    async def finish_job(self, job_id: str, result: StoreBooksResponse):
+        await self._update(job_id, state=JOB_SUCCEEDED, finished_at=func.now(), **result.model_dump(
+            include={"inserted_books", "inserted_authors", "duplicates_count", "message", "updated_books", "up_to_date"}
+        ))
+
+    async def fail_job(self, job_id: str, error: str):
+        await self._update(job_id, state=JOB_FAILED, finished_at=func.now(), error=error)
+
+    async def requeue_job(self, job_id: str):
+        """Put an interrupted job back in the queue, e.g. when its worker is shut down."""
+        await self._update(job_id, state=JOB_QUEUED)
+
+    async def _update(self, job_id: str, **values):
+        await self.db.execute(update(IngestJob).where(IngestJob.id == job_id).values(**values))
+        await self.db.commit()
+
+    @staticmethod
+    def to_response(job: IngestJob) -> IngestJobResponse:
+        result = None
+        if job.state == JOB_SUCCEEDED:
+            result = StoreBooksResponse(
+                inserted_books=job.inserted_books,
+                inserted_authors=job.inserted_authors,
+                duplicates_count=job.duplicates_count,
+                message=job.message or "",
+                updated_books=job.updated_books,
+                up_to_date=job.up_to_date
+            )
+        return IngestJobResponse(
+            id=job.id,
+            author=job.author,
+            state=job.state,
+            pages_fetched=job.pages_fetched,
+            inserted_books=job.inserted_books,
+            inserted_authors=job.inserted_authors,
+            duplicates_count=job.duplicates_count,
+            result=result,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
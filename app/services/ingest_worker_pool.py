@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.clients.response_cache import ResponseCache
+from app.core.database import SessionLocal
+from app.core.settings import settings
+from app.models.ingest_job_model import IngestJob
+from app.services.book_service import BookService
+from app.services.ingest_job_manager import IngestJobManager
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWorkerPool:
+    """
+    Runs queued ingestion jobs in a fixed number of background workers.
+
+    Jobs live in the `ingest_jobs` table, so the HTTP request that queues a job returns
+    immediately and queued work survives a restart. Every worker claims one job at a
+    time and runs `BookService.fetch_and_store_books` with its own database sessions,
+    recording progress after every stored page.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        cache: Optional[ResponseCache] = None,
+        session_factory: Callable = SessionLocal,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        stale_after: Optional[float] = None
+    ):
+        """
+        Args:
+            http_client (httpx.AsyncClient): Shared HTTP client used to reach OpenLibrary.
+            cache (Optional[ResponseCache]): OpenLibrary response cache, if enabled.
+            session_factory (Callable): Factory of database sessions.
+            workers (Optional[int]): Number of jobs run concurrently. Defaults to settings.
+            poll_interval (Optional[float]): Seconds an idle worker waits before checking the
+                table again (jobs queued by this process wake the workers immediately).
+                Defaults to settings.
+            stale_after (Optional[float]): Seconds without progress after which a running job
+                is considered abandoned and retried. Defaults to settings.
+        """
+        self.http_client = http_client
+        self.cache = cache
+        self.session_factory = session_factory
+        self.workers = workers or settings.ingest_workers
+        self.poll_interval = poll_interval or settings.ingest_poll_interval
+        self.stale_after = stale_after or settings.ingest_job_stale_after
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Starts the background workers."""
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 0.0):
+        """
+        Stops the workers.
+
+        Workers stop claiming new jobs right away; the jobs they are running get up to
+        `timeout` seconds to finish. Workers still busy after that are cancelled and their
+        jobs are queued again.
+
+        Args:
+            timeout (float): Seconds running jobs may take to finish.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks and timeout > 0:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, author: str) -> IngestJob:
+        """
+        Queue an ingestion job for `author` and wake up an idle worker.
+
+        Args:
+            author (str): Name of the author whose books should be fetched.
+
+        Returns:
+            IngestJob: The stored job in the `queued` state.
+        """
+        async with self.session_factory() as db:
+            job = await IngestJobManager(db).create_job(author)
+        self._wakeup.set()
+        return job
+
+    async def run_next(self) -> bool:
+        """
+        Claim and run a single job.
+
+        Returns:
+            bool: True if a job was run, False if none was waiting.
+        """
+        async with self.session_factory() as db:
+            job = await IngestJobManager(db).claim_next_job(self.stale_after)
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                if await self.run_next():
+                    continue
+            except Exception:
+                logger.exception("Ingest worker failed to run a job")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: IngestJob):
+        async def on_page(pages_fetched: int, totals: Dict[str, int]):
+            async with self.session_factory() as progress_db:
+                await IngestJobManager(progress_db).update_progress(job.id, pages_fetched, totals)
+
+        try:
+            async with self.session_factory() as db:
+                service = BookService(db, OpenLibraryAPIClient(self.http_client, self.cache))
+                result = await service.fetch_and_store_books(job.author, on_page=on_page)
+        except asyncio.CancelledError:
+            async with self.session_factory() as db:
+                await IngestJobManager(db).requeue_job(job.id)
+            raise
+        except HTTPException as e:
+            error = str(e.detail)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            async with self.session_factory() as db:
+                await IngestJobManager(db).finish_job(job.id, result)
+            return
+        async with self.session_factory() as db:
+            await IngestJobManager(db).fail_job(job.id, error)
@@ -0,0 +1,88 @@
+"""
+Compares two results files of `bench.suite` and fails on regressions.
+
+Latencies (`*_ms`) regress when they grow, throughputs (`rps`, `*_per_s`) when they
+drop; other numbers (request and error counts) are reported by the suite but not
+compared. A metric regresses when it is worse than the baseline by more than
+`--max-regression` (a fraction, 0.1 = 10%).
+
+Usage:
+    python -m bench.compare bench-baseline.json bench-results.json --max-regression 0.1
+"""
+import argparse
+import json
+import math
+import sys
+from typing import Optional
+
+
+def higher_is_better(metric: str) -> Optional[bool]:
+    """Returns the direction of `metric`, or None when it is not compared."""
+    if metric.endswith("_ms"):
+        return False
+    if metric == "rps" or metric.endswith("_per_s"):
+        return True
+    return None
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[dict]:
+    """
+    Compare the metrics of two suite results.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        current (dict): Results of the run being checked.
+        max_regression (float): Largest accepted relative worsening, e.g. 0.1 for 10%.
+
+    Returns:
+        list[dict]: One entry per compared metric with the `scenario`, `metric`,
+            `baseline` and `current` values, the relative `change` (positive = worse)
+            and whether it is a `regression`.
+    """
+    rows = []
+    for scenario, metrics in baseline["results"].items():
+        for metric, base in metrics.items():
+            direction = higher_is_better(metric)
+            value = current["results"].get(scenario, {}).get(metric)
+            if direction is None or value is None or not base or math.isnan(base) or math.isnan(value):
+                continue
+            change = (value - base) / base
+            worse = -change if direction else change
+            rows.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": base,
+                "current": value,
+                "change": worse,
+                "regression": worse > max_regression,
+            })
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    print(f"{'scenario':>18} {'metric':>12} {'baseline':>11} {'current':>11} {'worse by':>9}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['scenario']:>18} {row['metric']:>12} {row['baseline']:>11.2f} {row['current']:>11.2f} "
+              f"{row['change']:>+8.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.max_regression)
+    print_comparison(rows)
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
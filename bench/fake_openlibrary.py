@@ -0,0 +1,99 @@
+"""
+Local stand-in for the OpenLibrary API used by the benchmarks.
+
+`/search.json` answers with generated docs: every author has `--docs-per-author`
+books, served in pages of the requested `limit`. Every response is delayed by
+`--latency` seconds and a share of `--error-rate` requests fails with 503, so the
+retry path of the client is exercised as well. The generated docs depend only on the
+author name, so repeated runs ingest the same catalog.
+
+Usage:
+    python -m bench.fake_openlibrary --port 8090 --docs-per-author 500 --latency 0.05
+    OPENLIBRARY_BASE_URL=http://127.0.0.1:8090 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LANGUAGES = ("eng", "pol", "ger", "fre", "spa")
+
+
+def generate_doc(author: str, index: int) -> dict:
+    """Returns the `index`-th book of `author`; every fifth book has a co-author."""
+    digest = hashlib.md5(f"{author}|{index}".encode()).hexdigest()
+    names = [author]
+    if index % 5 == 0:
+        names.append(f"Co-author {digest[:6]}")
+    return {
+        "title": f"{author} book {index} {digest[:12]}",
+        "author_name": names,
+        "ebook_access": "no_ebook" if index % 3 else "public",
+        "first_publish_year": 1900 + int(digest[:4], 16) % 120,
+        "language": [LANGUAGES[index % len(LANGUAGES)]],
+        "key": f"/works/OL{int(digest[:12], 16)}W",
+    }
+
+
+def create_app(docs_per_author: int = 200, latency: float = 0.0, error_rate: float = 0.0,
+               seed: int = 0) -> Starlette:
+    """
+    Args:
+        docs_per_author (int): `numFound` of every author search.
+        latency (float): Seconds every response is delayed by.
+        error_rate (float): Share of requests answered with 503, between 0 and 1.
+        seed (int): Seed of the error sampling, for reproducible runs.
+    """
+    rng = random.Random(seed)
+
+    async def delay_or_fail():
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return None
+
+    async def search(request: Request):
+        failure = await delay_or_fail()
+        if failure is not None:
+            return failure
+        author = request.query_params.get("author", "")
+        page = max(int(request.query_params.get("page", 1)), 1)
+        limit = max(int(request.query_params.get("limit", 100)), 1)
+        start = (page - 1) * limit
+        end = min(start + limit, docs_per_author)
+        docs = [generate_doc(author, index) for index in range(start, end)]
+        return JSONResponse({"numFound": docs_per_author, "start": start, "docs": docs})
+
+    async def edition(request: Request):
+        failure = await delay_or_fail()
+        return failure or JSONResponse({"key": "/books/OL1M", "title": "Health check"})
+
+    return Starlette(routes=[
+        Route("/search.json", search),
+        Route("/books/{edition_id}.json", edition),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--docs-per-author", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.docs_per_author, args.latency, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Load test of GET /books: requests per second and latency percentiles under concurrency.
+
+`--clients` concurrent clients send requests back to back for `--duration` seconds
+against every `--target` in turn. Passing two running servers compares them in one
+report, e.g. the current async stack and the sync (psycopg2 + threadpool) stack
+checked out from the commit before the async migration:
+
+    git worktree add ../library-sync <commit before the migration>
+    (cd ../library-sync && uvicorn app.main:app --port 8001) &
+    uvicorn app.main:app --port 8000 &
+    python -m bench.load_test --target http://127.0.0.1:8001 http://127.0.0.1:8000
+
+Both servers should use the same database, seeded beforehand (e.g. with POST /books
+or `bench.trigram_search`), and run with a single worker process.
+
+Usage:
+    python -m bench.load_test --target http://127.0.0.1:8000 --clients 200 --duration 30
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench.stats import percentiles
+
+
+async def client_loop(http: httpx.AsyncClient, path: str, params: dict, deadline: float,
+                      latencies: list[float], errors: list[int]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await http.get(path, params=params)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(1)
+
+
+async def run(target: str, clients: int, duration: float, path: str, params: dict) -> dict:
+    latencies: list[float] = []
+    errors: list[int] = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60) as http:
+        await http.get(path, params=params)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            client_loop(http, path, params, deadline, latencies, errors) for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        **percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", nargs="+", default=["http://127.0.0.1:8000"])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--path", default="/books")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--author", default=None)
+    args = parser.parse_args()
+
+    params = {"limit": args.limit}
+    if args.author:
+        params["author"] = args.author
+
+    print(f"{'target':>28} {'clients':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for target in args.target:
+        stats = asyncio.run(run(target, args.clients, args.duration, args.path, params))
+        print(f"{target:>28} {args.clients:>8} {stats['requests']:>9} {stats['errors']:>7} "
+              f"{stats['rps']:>9.0f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark of GET /books response serialization, without a database.
+
+Compares, for listings of every `--sizes` books:
+- `pydantic`: the former path, building a `BookResponse` per row and letting FastAPI
+  validate the list against `response_model` and dump it (`serialize_response`)
+- `orjson`: `app.core.serialization.dumps_books` straight from the ORM rows
+and reports rows per second of each, plus the time gzip (and Brotli, when installed)
+takes to compress the resulting body with the application settings.
+
+Usage:
+    python -m bench.serialization --sizes 1000 100000
+"""
+import argparse
+import asyncio
+import gzip
+import statistics
+import time
+
+from fastapi.routing import serialize_response
+
+from app.api.v1.books import router
+from app.core.compression import brotli
+from app.core.serialization import dumps_books
+from app.core.settings import settings
+from app.models.book_model import Books
+from app.models.schemas import BookResponse
+from bench.store_books import generate_docs
+
+
+def listing_rows(count: int) -> list[Books]:
+    """Transient `Books` rows shaped like the result of `BookDataManager.get_books`."""
+    rows = []
+    for i, doc in enumerate(generate_docs(count)):
+        book = Books(id=i + 1, title=doc["title"], ebook_access=doc["ebook_access"],
+                     first_publish_year=doc["first_publish_year"], language=doc["language"])
+        book.authors_list = doc["author_name"]
+        rows.append(book)
+    return rows
+
+
+def books_response_field():
+    return next(route.response_field for route in router.routes if route.path == "/books" and "GET" in route.methods)
+
+
+async def pydantic_path(rows: list[Books], field) -> bytes:
+    models = [
+        BookResponse(title=book.title, ebook_access=book.ebook_access, first_publish_year=book.first_publish_year,
+                     authors=book.authors_list, language=book.language)
+        for book in rows
+    ]
+    return await serialize_response(field=field, response_content=models, dump_json=True)
+
+
+def timed(function, repeat: int) -> float:
+    """Median seconds of `repeat` calls."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run(count: int, repeat: int) -> dict:
+    rows = listing_rows(count)
+    field = books_response_field()
+    old_body = asyncio.run(pydantic_path(rows, field))
+    new_body = dumps_books(rows)
+    assert old_body == new_body, "both paths have to produce the same JSON"
+
+    results = {
+        "pydantic_rows_per_s": count / timed(lambda: asyncio.run(pydantic_path(rows, field)), repeat),
+        "orjson_rows_per_s": count / timed(lambda: dumps_books(rows), repeat),
+        "body_bytes": len(new_body),
+        "gzip_ms": timed(lambda: gzip.compress(new_body, settings.response_gzip_level), repeat) * 1000,
+        "gzip_bytes": len(gzip.compress(new_body, settings.response_gzip_level)),
+    }
+    if brotli is not None:
+        results["brotli_ms"] = timed(
+            lambda: brotli.compress(new_body, quality=settings.response_brotli_quality), repeat
+        ) * 1000
+        results["brotli_bytes"] = len(brotli.compress(new_body, quality=settings.response_brotli_quality))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for count in args.sizes:
+        results = run(count, args.repeat)
+        print(f"{count} books: " + ", ".join(
+            f"{name} {value:,.0f}" if value >= 100 else f"{name} {value:.2f}" for name, value in results.items()
+        ))
+        print(f"  orjson is {results['orjson_rows_per_s'] / results['pydantic_rows_per_s']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
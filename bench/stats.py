@@ -0,0 +1,14 @@
+import statistics
+
+
+def percentiles(timings_ms: list[float]) -> dict:
+    """Returns the p50, p95 and p99 of `timings_ms` (nearest rank), NaN when empty."""
+    if not timings_ms:
+        return {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+    timings = sorted(timings_ms)
+    last = len(timings) - 1
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(last, int(len(timings) * 0.95))],
+        "p99_ms": timings[min(last, int(len(timings) * 0.99))],
+    }
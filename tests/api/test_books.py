@@ -1,37 +1,74 @@
+import pytest
 from fastapi import HTTPException
-from fastapi.testclient import TestClient
-from app.main import app
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from app.clients.response_cache import MemoryCacheBackend
+from app.core.listing_cache import ListingCache
+from app.core.replicas import READ_PRIMARY_COOKIE, ReplicaRouter
+from app.dependencies.cache import get_listing_cache
+from app.main import app
+from app.models.schemas import BatchStoreBooksResponse, BookFacetsResponse, BookPage, FacetCount
 from app.services.book_service import BookService
 from tests.conftest import mock_get_books
 
-client = TestClient(app)
+DEFAULT_QUERY = {
+    "search": None, "min_similarity": 0.3, "limit": 100, "cursor": None,
+    "sort": "id", "order": "asc", "include_total": False, "language": None
+}
+
+
+@pytest.fixture(autouse=True)
+def catalog_version():
+    """GET /books reads the catalog version for its validators; tests that need one patch it again."""
+    with patch.object(BookService, "get_catalog_version", return_value=(0, None)) as get_catalog_version:
+        yield get_catalog_version
 
 
-def test_fetch_and_store_books_success(mock_db):
+def test_fetch_and_store_books_success(client, mock_db):
     mock_result = {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
 
     with patch.object(BookService, 'fetch_and_store_books', return_value=mock_result) as mock_service:
         response = client.post("/books", json={"author": "J.R.R. Tolkien"})
         assert response.status_code == 200
-        assert response.json() == mock_result
+        assert response.json() == {**mock_result, "updated_books": 0, "up_to_date": False}
 
         mock_service.assert_called_once_with("J.R.R. Tolkien")
 
 
-def test_fetch_and_store_books_service_error(mock_db):
+def test_fetch_and_store_books_service_error(client, mock_db):
     with patch.object(BookService, "fetch_and_store_books", side_effect=HTTPException(status_code=502)):
         response = client.post("/books", json={"author": "George Orwell"})
         assert response.status_code == 502
 
 
-def test_fetch_and_store_books_invalid_request_simple():
+def test_fetch_and_store_books_invalid_request_simple(client):
     response = client.post("/books", json={"author": ""})
     assert response.status_code == 422
 
 
-def test_get_books_no_filters(mock_db):
+def test_fetch_and_store_books_batch(client, mock_db):
+    summary = {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
+    mock_result = BatchStoreBooksResponse(
+        results={"J.R.R. Tolkien": summary},
+        errors={"Nobody": "No books found for author 'Nobody'"},
+        summary=summary
+    )
+
+    with patch.object(BookService, "fetch_and_store_books_batch", return_value=mock_result) as mock_service:
+        response = client.post("/books/batch", json={"authors": ["J.R.R. Tolkien", "Nobody"]})
+
+    assert response.status_code == 200
+    assert response.json()["results"]["J.R.R. Tolkien"] == {**summary, "updated_books": 0, "up_to_date": False}
+    assert response.json()["errors"] == {"Nobody": "No books found for author 'Nobody'"}
+    mock_service.assert_awaited_once_with(["J.R.R. Tolkien", "Nobody"])
+
+
+def test_fetch_and_store_books_batch_invalid_request(client):
+    assert client.post("/books/batch", json={"authors": []}).status_code == 422
+    assert client.post("/books/batch", json={"authors": ["George Orwell", ""]}).status_code == 422
+
+
+def test_get_books_no_filters(client, mock_db):
     fake_books = [
         {
             "title": "1984",
@@ -41,14 +78,14 @@ def test_get_books_no_filters(mock_db):
             "language": ["eng"]
         }
     ]
-    with patch.object(BookService, "get_books", return_value=fake_books) as mock_service:
+    with patch.object(BookService, "get_books", return_value=BookPage(items=fake_books)) as mock_service:
         response = client.get("/books")
         assert response.status_code == 200
         assert response.json() == fake_books
-        mock_service.assert_called_once_with(author=None, title=None)
+        mock_service.assert_called_once_with(author=None, title=None, **DEFAULT_QUERY)
 
 
-def test_get_books_with_author_filter(mock_db):
+def test_get_books_with_author_filter(client, mock_db):
     fake_books = [
         {
             "title": "Brave New World",
@@ -58,14 +95,14 @@ def test_get_books_with_author_filter(mock_db):
             "language": ["eng"]
         }
     ]
-    with patch.object(BookService, "get_books", return_value=fake_books) as mock_service:
+    with patch.object(BookService, "get_books", return_value=BookPage(items=fake_books)) as mock_service:
         response = client.get("/books", params={"author": "Aldous Huxley"})
         assert response.status_code == 200
         assert response.json() == fake_books
-        mock_service.assert_called_once_with(author="Aldous Huxley", title=None)
+        mock_service.assert_called_once_with(author="Aldous Huxley", title=None, **DEFAULT_QUERY)
 
 
-def test_get_books_with_title_filter(mock_db):
+def test_get_books_with_title_filter(client, mock_db):
     fake_books = [
         {
             "title": "The Hobbit",
@@ -75,14 +112,14 @@ def test_get_books_with_title_filter(mock_db):
             "language": ["eng"]
         }
     ]
-    with patch.object(BookService, "get_books", return_value=fake_books) as mock_service:
+    with patch.object(BookService, "get_books", return_value=BookPage(items=fake_books)) as mock_service:
         response = client.get("/books", params={"title": "The Hobbit"})
         assert response.status_code == 200
         assert response.json() == fake_books
-        mock_service.assert_called_once_with(author=None, title="The Hobbit")
+        mock_service.assert_called_once_with(author=None, title="The Hobbit", **DEFAULT_QUERY)
 
 
-def test_get_books_with_author_and_title_filter(mock_db):
+def test_get_books_with_author_and_title_filter(client, mock_db):
     fake_books = [
         {
             "title": "1984",
@@ -93,18 +130,186 @@ def test_get_books_with_author_and_title_filter(mock_db):
         }
     ]
 
-    with patch.object(BookService, "get_books", return_value=fake_books) as mock_service:
+    with patch.object(BookService, "get_books", return_value=BookPage(items=fake_books)) as mock_service:
         response = client.get("/books", params={"author": "George Orwell", "title": "1984"})
 
         assert response.status_code == 200
         assert response.json() == fake_books
-        mock_service.assert_called_once_with(author="George Orwell", title="1984")
+        mock_service.assert_called_once_with(author="George Orwell", title="1984", **DEFAULT_QUERY)
 
 
-def test_get_books_with_author_and_mismatch_title_filter(mock_db):
+def test_get_books_with_author_and_mismatch_title_filter(client, mock_db):
     with patch.object(BookService, "get_books", side_effect=mock_get_books) as mock_service:
         response = client.get("/books", params={"author": "George Orwell", "title": "xyz"})
         assert response.status_code == 200
         assert response.json() == []
 
-        mock_service.assert_called_once_with(author="George Orwell", title="xyz")
+        mock_service.assert_called_once_with(author="George Orwell", title="xyz", **DEFAULT_QUERY)
+
+
+def test_get_books_with_search(client, mock_db):
+    with patch.object(BookService, "get_books", return_value=BookPage()) as mock_service:
+        response = client.get("/books", params={"search": "tolkein", "min_similarity": 0.5})
+        assert response.status_code == 200
+        mock_service.assert_called_once_with(
+            author=None, title=None, **dict(DEFAULT_QUERY, search="tolkein", min_similarity=0.5)
+        )
+
+
+def test_get_books_with_invalid_min_similarity(client):
+    response = client.get("/books", params={"search": "tolkein", "min_similarity": 2})
+    assert response.status_code == 422
+
+
+def test_get_books_paging_headers(client, mock_db):
+    page = BookPage(items=[], next_cursor="abc", total_estimate=1234)
+    with patch.object(BookService, "get_books", return_value=page) as mock_service:
+        response = client.get("/books", params={
+            "limit": 10, "cursor": "xyz", "sort": "title", "order": "desc", "include_total": True
+        })
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == "abc"
+        assert response.headers["X-Total-Count-Estimate"] == "1234"
+        mock_service.assert_called_once_with(
+            author=None, title=None, search=None, min_similarity=0.3,
+            limit=10, cursor="xyz", sort="title", order="desc", include_total=True, language=None
+        )
+
+
+def test_get_books_last_page_has_no_cursor_header(client, mock_db):
+    with patch.object(BookService, "get_books", return_value=BookPage()):
+        response = client.get("/books")
+        assert "X-Next-Cursor" not in response.headers
+        assert "X-Total-Count-Estimate" not in response.headers
+
+
+def test_get_books_invalid_paging_params(client):
+    assert client.get("/books", params={"limit": 0}).status_code == 422
+    assert client.get("/books", params={"limit": 100000}).status_code == 422
+    assert client.get("/books", params={"sort": "language"}).status_code == 422
+
+
+def test_get_books_stream_ndjson_with_accept_header(client, mock_db):
+    chunks = [b'{"title":"1984"}\n', b'{"title":"Animal Farm"}\n']
+    with patch.object(BookService, "stream_books", return_value=iter(chunks)) as mock_stream:
+        response = client.get("/books", params={"author": "George Orwell"},
+                              headers={"Accept": "application/x-ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.text.splitlines() == ['{"title":"1984"}', '{"title":"Animal Farm"}']
+        assert mock_stream.call_args.kwargs["media_type"] == "application/x-ndjson"
+        assert mock_stream.call_args.kwargs["author"] == "George Orwell"
+
+
+def test_get_books_stream_json_array_with_query_flag(client, mock_db):
+    with patch.object(BookService, "stream_books", return_value=iter([b"[", b"]"])) as mock_stream, \
+            patch.object(BookService, "get_books") as mock_get_books:
+        response = client.get("/books", params={"stream": "json"})
+        assert response.status_code == 200
+        assert response.json() == []
+        assert mock_stream.call_args.kwargs["media_type"] == "application/json"
+        mock_get_books.assert_not_called()
+
+
+def test_get_books_reads_from_primary_after_write(client, mock_db):
+    router = ReplicaRouter(MagicMock(), {"replica-0": MagicMock()})
+    summary = {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
+
+    with patch("app.dependencies.db.read_router", router), \
+            patch.object(router, "choose", wraps=router.choose) as choose, \
+            patch.object(BookService, "get_catalog_version", return_value=(1, None)), \
+            patch.object(BookService, "get_books", return_value=BookPage(items=[])), \
+            patch.object(BookService, "fetch_and_store_books", return_value=summary):
+        assert client.get("/books").status_code == 200
+        choose.assert_called_with(prefer_primary=False)
+
+        response = client.post("/books", json={"author": "George Orwell"})
+        assert READ_PRIMARY_COOKIE in response.cookies
+
+        assert client.get("/books").status_code == 200
+        choose.assert_called_with(prefer_primary=True)
+
+
+def test_get_books_conditional_get(client, mock_db):
+    with patch.object(BookService, "get_catalog_version", return_value=(7, None)), \
+            patch.object(BookService, "get_books", return_value=BookPage(items=[])) as mock_service:
+        response = client.get("/books", params={"author": "George Orwell"})
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"].startswith("public")
+
+        response = client.get("/books", params={"author": "George Orwell"}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        mock_service.assert_called_once()
+
+        other = client.get("/books", params={"author": "Aldous Huxley"}, headers={"If-None-Match": etag})
+        assert other.status_code == 200
+
+    with patch.object(BookService, "get_catalog_version", return_value=(8, None)), \
+            patch.object(BookService, "get_books", return_value=BookPage(items=[])):
+        response = client.get("/books", params={"author": "George Orwell"}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+def test_get_books_openapi_schema_uses_book_response(client):
+    schema = client.get("/openapi.json").json()
+
+    content = schema["paths"]["/books"]["get"]["responses"]["200"]["content"]["application/json"]
+    assert content["schema"] == {"type": "array", "items": {"$ref": "#/components/schemas/BookResponse"},
+                                 "title": "Response Get Books Books Get"}
+
+
+def test_get_book_facets(client, mock_db):
+    facets = BookFacetsResponse(
+        total=2,
+        language=[FacetCount(value="eng", count=2)],
+        decade=[FacetCount(value=1940, count=2)],
+        ebook_access=[FacetCount(value=None, count=2)],
+        author=[FacetCount(value="George Orwell", count=2)]
+    )
+    with patch.object(BookService, "get_catalog_version", return_value=(7, None)), \
+            patch.object(BookService, "get_facets", return_value=facets) as mock_service:
+        response = client.get("/books/facets", params={"author": "George Orwell", "language": "eng", "limit": 5})
+        assert response.status_code == 200
+        assert response.json()["decade"] == [{"value": 1940, "count": 2}]
+        assert response.json()["ebook_access"] == [{"value": None, "count": 2}]
+        mock_service.assert_called_once_with(author="George Orwell", title=None, language="eng", limit=5)
+
+        revalidated = client.get("/books/facets", params={"author": "George Orwell", "language": "eng", "limit": 5},
+                                 headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+        mock_service.assert_called_once()
+
+
+def test_get_book_facets_invalid_limit(client):
+    assert client.get("/books/facets", params={"limit": 0}).status_code == 422
+
+
+def test_get_books_serves_cached_page_of_current_catalog_version(client, mock_db):
+    cache = ListingCache(MemoryCacheBackend(max_entries=10, max_bytes=100_000))
+    app.dependency_overrides[get_listing_cache] = lambda: cache
+    try:
+        with patch.object(BookService, "get_catalog_version", return_value=(7, None)), \
+                patch.object(BookService, "get_books", side_effect=mock_get_books) as mock_service:
+            first = client.get("/books", params={"author": "George Orwell"})
+            second = client.get("/books", params={"author": "George Orwell"})
+            assert second.content == first.content
+            assert mock_service.call_count == 1
+
+            client.get("/books", params={"author": "George Orwell", "limit": 10})
+            assert mock_service.call_count == 2
+
+        with patch.object(BookService, "get_catalog_version", return_value=(8, None)), \
+                patch.object(BookService, "get_books", side_effect=mock_get_books) as mock_service:
+            third = client.get("/books", params={"author": "George Orwell"})
+            assert third.json() == first.json()
+            mock_service.assert_called_once()
+
+        stats = client.get("/health/cache/books").json()
+    finally:
+        app.dependency_overrides.pop(get_listing_cache)
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["invalidations"] == 1
+    assert stats["enabled"] is False  # the application's own cache is disabled in tests
@@ -1,32 +1,42 @@
-import responses
-from fastapi.testclient import TestClient
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.dependencies.health import get_health_prober
 from app.main import app
+from app.services.health_prober import HealthProber
 
-client = TestClient(app)
 
-@responses.activate
-def test_health_success():
-    responses.add(
-        responses.GET,
-        "http://openlibrary.org/books/OL1M.json?m=history",
-        json={"key": "value"},
-        status=200
-    )
+@pytest.fixture
+def prober(client):
+    prober = HealthProber(http_client=None)
+    app.dependency_overrides[get_health_prober] = lambda: prober
+    yield prober
+    app.dependency_overrides.pop(get_health_prober)
+
+
+def test_health_success(client, prober):
+    prober.snapshot = {
+        "app_status": "ok",
+        "external_api_status": "ok",
+        "external_api_latency_ms": 120.5,
+        "database_status": "ok",
+        "database_latency_ms": 1.2,
+        "checked_at": datetime.now(timezone.utc),
+    }
 
     response = client.get("/health")
     assert response.status_code == 200
     data = response.json()
     assert data["app_status"] == "ok"
     assert data["external_api_status"] == "ok"
+    assert data["external_api_latency_ms"] == 120.5
+    assert data["database_status"] == "ok"
 
 
-@responses.activate
-def test_health_failed_status():
-    responses.add(
-        responses.GET,
-        "http://openlibrary.org/books/OL1M.json?m=history",
-        status=500
-    )
+def test_health_failed_status(client, prober):
+    prober.snapshot = dict(prober.snapshot, external_api_status="failed", checked_at=datetime.now(timezone.utc))
 
     response = client.get("/health")
     data = response.json()
@@ -34,15 +44,60 @@ def test_health_failed_status():
     assert data["external_api_status"] == "failed"
 
 
-@responses.activate
-def test_health_request_exception():
-    responses.add(
-        responses.GET,
-        "http://openlibrary.org/books/OL1M.json?m=history",
-        body=responses.ConnectionError("Timeout")
-    )
-
+def test_health_before_first_check(client, prober):
     response = client.get("/health")
     data = response.json()
     assert response.status_code == 200
-    assert data["external_api_status"] == "failed"
+    assert data["external_api_status"] == "unknown"
+    assert data["checked_at"] is None
+
+
+def test_health_does_not_call_external_api(client, prober):
+    with patch.object(HealthProber, "probe_once") as mock_probe:
+        client.get("/health")
+        client.get("/health/ready")
+        client.get("/health/live")
+    mock_probe.assert_not_called()
+
+
+def test_liveness(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readiness_ok(client, prober):
+    prober.snapshot = dict(prober.snapshot, database_status="ok", checked_at=datetime.now(timezone.utc))
+
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readiness_database_failed(client, prober):
+    prober.snapshot = dict(prober.snapshot, database_status="failed", checked_at=datetime.now(timezone.utc))
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "unavailable"}
+
+
+def test_readiness_stale_snapshot(client, prober):
+    prober.snapshot = dict(
+        prober.snapshot,
+        database_status="ok",
+        checked_at=datetime.now(timezone.utc) - timedelta(hours=1)
+    )
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+
+
+def test_openlibrary_stats(client):
+    response = client.get("/health/openlibrary")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["circuit_state"] == "closed"
+    assert set(data["circuit_transitions"]) == {"closed", "open", "half_open"}
+    assert data["short_circuited"] == 0
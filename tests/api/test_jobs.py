@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.dependencies.ingest import get_ingest_worker_pool
+from app.main import app
+from app.models.ingest_job_model import IngestJob, JOB_QUEUED, JOB_SUCCEEDED
+from app.services.ingest_job_manager import IngestJobManager
+
+
+def make_job(**values):
+    defaults = dict(id="job-1", author="J.R.R. Tolkien", state=JOB_QUEUED, pages_fetched=0, inserted_books=0,
+                    inserted_authors=0, duplicates_count=0, updated_books=0, up_to_date=False, created_at=datetime.now(timezone.utc))
+    return IngestJob(**{**defaults, **values})
+
+
+@pytest.fixture
+def pool(client):
+    pool = MagicMock()
+    pool.submit = AsyncMock(return_value=make_job())
+    app.dependency_overrides[get_ingest_worker_pool] = lambda: pool
+    yield pool
+    app.dependency_overrides.pop(get_ingest_worker_pool)
+
+
+def test_ingest_returns_202_with_job(client, pool):
+    response = client.post("/ingest", json={"author": "J.R.R. Tolkien"})
+
+    assert response.status_code == 202
+    assert response.headers["location"] == "/jobs/job-1"
+    assert response.json()["state"] == "queued"
+    assert response.json()["result"] is None
+    pool.submit.assert_awaited_once_with("J.R.R. Tolkien")
+
+
+def test_ingest_validates_author(client, pool):
+    response = client.post("/ingest", json={"author": ""})
+    assert response.status_code == 422
+    pool.submit.assert_not_called()
+
+
+def test_get_job_succeeded_includes_result(client):
+    job = make_job(state=JOB_SUCCEEDED, pages_fetched=3, inserted_books=250, inserted_authors=1,
+                   duplicates_count=2, updated_books=3, message="2 books of requested author already exist in the database")
+    with patch.object(IngestJobManager, "get_job", return_value=job) as mock_get_job:
+        response = client.get("/jobs/job-1")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pages_fetched"] == 3
+    assert data["result"] == {
+        "inserted_books": 250,
+        "inserted_authors": 1,
+        "duplicates_count": 2,
+        "message": "2 books of requested author already exist in the database",
+        "updated_books": 3,
+        "up_to_date": False
+    }
+    mock_get_job.assert_awaited_once_with("job-1")
+
+
+def test_get_job_not_found(client):
+    with patch.object(IngestJobManager, "get_job", return_value=None):
+        response = client.get("/jobs/missing")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Job not found"
@@ -0,0 +1,49 @@
+from app.core.metrics import MetricsRegistry, record_ingest, registry
+
+
+def test_metrics_count_requests_by_route_template(client):
+    client.get("/health/live")
+    client.get("/jobs/missing-job")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{route="/health/live",method="GET",status="200"}' in body
+    assert 'http_requests_total{route="/jobs/{job_id}",method="GET",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{route="/health/live",method="GET",status="200",le="+Inf"}' in body
+    assert "missing-job" not in body
+
+
+def test_metrics_include_scrape_time_gauges(client):
+    body = client.get("/metrics").text
+    assert 'db_pool_connections{database="primary",state="checked_out"}' in body
+    assert "threadpool_threads_limit 40" in body
+    assert 'openlibrary_circuit_state{state="closed"} 1' in body
+
+
+def test_metrics_ingest_counters():
+    before = registry.render()
+    record_ingest({"inserted_books": 3, "inserted_authors": 1, "duplicates_count": 2})
+    after = registry.render()
+
+    def value(body, name):
+        return float(next(line for line in body.splitlines() if line.startswith(name + " ")).split()[1])
+
+    assert value(after, "ingest_books_total") - value(before, "ingest_books_total") == 3
+    assert value(after, "ingest_duplicates_total") - value(before, "ingest_duplicates_total") == 2
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    latency.labels("/a").observe(0.05)
+    latency.labels("/a").observe(0.5)
+    latency.labels("/a").observe(3)
+
+    lines = metrics.render().splitlines()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.55' in lines
@@ -0,0 +1,181 @@
+import logging
+import uuid
+from unittest.mock import patch
+
+import httpx
+import respx
+
+from app.clients.response_cache import MemoryCacheBackend
+from app.core.listing_cache import ListingCache
+from app.core.settings import settings
+from app.dependencies.cache import get_listing_cache
+from app.main import app
+
+AUTHOR = "Query Budget Author"
+DOCS = [
+    {"title": f"Query Budget Book {i}", "author_name": [AUTHOR], "first_publish_year": 2000 + i, "language": ["eng"],
+     "key": f"/works/OL{9000 + i}W"}
+    for i in range(30)
+]
+
+
+def store_author_books(client, author=AUTHOR, docs=DOCS):
+    with respx.mock(assert_all_called=False) as mock:
+        mock.get("https://openlibrary.org/search.json").mock(
+            return_value=httpx.Response(200, json={"numFound": len(docs), "docs": docs})
+        )
+        return client.post("/books", json={"author": author})
+
+
+def test_store_books_query_budget_does_not_grow_with_docs(client, assert_max_queries):
+    response = store_author_books(client)
+
+    assert response.status_code == 200
+    assert "upstream;dur=" in response.headers["Server-Timing"]
+    # advisory lock (4) + books, author lookup and inserts, independent of the number of docs
+    assert_max_queries(response, 10)
+
+
+def test_store_books_again_writes_only_the_sync_record(client, assert_max_queries):
+    store_author_books(client)
+
+    response = store_author_books(client)
+
+    assert response.status_code == 200
+    assert response.json()["inserted_books"] == 0
+    assert response.json()["updated_books"] == 0
+    assert response.json()["duplicates_count"] == len(DOCS)
+    # advisory lock (4) + sync record, one lookup of the page's books and the sync update
+    assert_max_queries(response, 7)
+
+
+def test_store_books_skips_fresh_author(client, assert_max_queries):
+    store_author_books(client)
+
+    with patch.object(settings, "author_freshness_ttl", 3600.0):
+        response = store_author_books(client)
+
+    assert response.status_code == 200
+    assert response.json()["up_to_date"] is True
+    assert response.json()["inserted_books"] == 0
+    assert 'desc="0 calls"' in response.headers["Server-Timing"]
+    # advisory lock (4) + sync record
+    assert_max_queries(response, 5)
+
+
+def test_get_books_query_budget(client, assert_max_queries):
+    store_author_books(client)
+
+    params = {"author": AUTHOR, "limit": 100}
+    response = client.get("/books", params=params)
+    assert response.status_code == 200
+    assert {doc["title"] for doc in DOCS} <= {book["title"] for book in response.json()}
+    # the catalog version and the page from the read model, no query per book
+    assert_max_queries(response, 2)
+
+    # a revalidation with a matching ETag only reads the catalog version
+    revalidated = client.get("/books", params=params, headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert_max_queries(revalidated, 1)
+
+    response = client.get("/books", params={"author": AUTHOR, "include_total": True})
+    assert_max_queries(response, 3)
+
+
+def test_get_books_cached_page_only_reads_catalog_version(client, assert_max_queries):
+    author, other = f"Cached Author {uuid.uuid4().hex}", f"Other Author {uuid.uuid4().hex}"
+    store_author_books(client, author, [{"title": f"Cached Book {i}", "author_name": [author]} for i in range(2)])
+    cache = ListingCache(MemoryCacheBackend(max_entries=10, max_bytes=1_000_000))
+    app.dependency_overrides[get_listing_cache] = lambda: cache
+    try:
+        params = {"author": author, "limit": 100}
+        first = client.get("/books", params=params)
+        cached = client.get("/books", params=params)
+        assert cached.content == first.content
+        # the catalog version only; the page comes from the cache
+        assert_max_queries(cached, 1)
+
+        # storing any books changes the catalog version, so the page is read again
+        store_author_books(client, other, [{"title": "Other Book", "author_name": [other, author]}])
+        fresh = client.get("/books", params=params)
+        assert [book["title"] for book in fresh.json()] == ["Cached Book 0", "Cached Book 1", "Other Book"]
+        assert_max_queries(fresh, 2)
+        assert cache.stats()["invalidations"] == 1
+    finally:
+        app.dependency_overrides.pop(get_listing_cache)
+
+
+def test_get_book_facets_query_budget(client, assert_max_queries):
+    store_author_books(client)
+
+    response = client.get("/books/facets")
+    assert response.status_code == 200
+    # the catalog version and the precomputed counts
+    assert_max_queries(response, 2)
+
+    response = client.get("/books/facets", params={"author": AUTHOR, "language": "eng"})
+    assert response.status_code == 200
+    assert response.json()["total"] == len(DOCS)
+    assert response.json()["decade"] == [
+        {"value": 2000, "count": 10}, {"value": 2010, "count": 10}, {"value": 2020, "count": 10}
+    ]
+    assert response.json()["author"] == [{"value": AUTHOR, "count": len(DOCS)}]
+    # the catalog version and one grouping query
+    assert_max_queries(response, 2)
+
+
+def test_book_facet_counts_follow_stored_books(client):
+    author = f"Facet Author {uuid.uuid4().hex}"
+    docs = [
+        {"title": f"Facet Book {i}", "author_name": [author], "first_publish_year": 1990 + i,
+         "ebook_access": "public", "language": ["pol"]}
+        for i in range(3)
+    ]
+    before = client.get("/books/facets").json()
+
+    assert store_author_books(client, author, docs).json()["inserted_books"] == len(docs)
+
+    after = client.get("/books/facets").json()
+    assert after["total"] == before["total"] + len(docs)
+    filtered = client.get("/books/facets", params={"author": author}).json()
+    assert filtered["total"] == len(docs)
+    assert filtered["language"] == [{"value": "pol", "count": len(docs)}]
+    assert filtered["ebook_access"] == [{"value": "public", "count": len(docs)}]
+
+
+def test_batch_updates_changed_books_of_known_author(client):
+    author = f"Batch Author {uuid.uuid4().hex}"
+    doc = {"title": "Batch Book", "author_name": [author], "first_publish_year": 2000, "key": f"/works/{author}"}
+    assert store_author_books(client, author, [doc]).json()["inserted_books"] == 1
+    # the next fetch has to reach the (mocked) OpenLibrary again
+    client.app.state.openlibrary_cache.backend.clear()
+
+    with respx.mock(assert_all_called=False) as mock:
+        mock.get("https://openlibrary.org/search.json").mock(
+            return_value=httpx.Response(200, json={"numFound": 1, "docs": [{**doc, "first_publish_year": 2001}]})
+        )
+        response = client.post("/books/batch", json={"authors": [author]})
+
+    assert response.json()["results"][author]["updated_books"] == 1
+    books = client.get("/books", params={"author": author}).json()
+    assert [book["first_publish_year"] for book in books] == [2001]
+
+
+def test_server_timing_header_without_queries(client):
+    response = client.get("/health/live")
+
+    timing = response.headers["Server-Timing"]
+    assert 'db;dur=0.0;desc="0 queries"' in timing
+    assert "serialization;dur=" in timing
+    assert "total;dur=" in timing
+
+
+def test_slow_query_log_has_caller_and_redacted_parameters(client, caplog):
+    with patch.object(settings, "slow_query_threshold", 1e-9), \
+            caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        client.get("/books", params={"author": "Secret Author Name"})
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("app/services/book_data_manager.py" in message for message in messages)
+    assert all("Secret Author Name" not in message for message in messages)
+    assert any("<str>" in message for message in messages)
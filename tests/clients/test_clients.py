@@ -1,18 +1,19 @@
+import asyncio
 from unittest.mock import patch
 
 import respx
 from fastapi import HTTPException
-from fastapi.testclient import TestClient
-from app.main import app
 from app.clients.open_library_api_client import OpenLibraryAPIClient
-import responses
 import httpx
 import pytest
 
-client = TestClient(app)
 
+def make_client():
+    return OpenLibraryAPIClient(httpx.AsyncClient(base_url="https://openlibrary.org"))
 
-def test_fetch_books_by_author_success():
+
+@pytest.mark.anyio
+async def test_fetch_books_by_author_success():
     with respx.mock:
         route = respx.get("https://openlibrary.org/search.json").mock(
             return_value=httpx.Response(200, json={
@@ -36,8 +37,8 @@ def test_fetch_books_by_author_success():
             )
         )
 
-        api_client = OpenLibraryAPIClient()
-        result = api_client.fetch_books_by_author("George Orwell")
+        api_client = make_client()
+        result = await api_client.fetch_books_by_author("George Orwell")
         titles_from_response = {book["title"] for book in result}
         expected_titles = {"1984", "Animal Farm"}
 
@@ -45,43 +46,130 @@ def test_fetch_books_by_author_success():
         assert route.called
 
 
-def test_fetch_books_by_author_empty_response():
-    responses.add(
-        responses.GET,
-        "https://openlibrary.org/search.json?author=xyz123",
-        json={"docs": []},
-        status=200,
-    )
+@pytest.mark.anyio
+async def test_fetch_books_by_author_empty_response():
+    with respx.mock:
+        respx.get("https://openlibrary.org/search.json").mock(
+            return_value=httpx.Response(200, json={"docs": []})
+        )
 
-    api_client = OpenLibraryAPIClient()
-    with pytest.raises(HTTPException) as exc:
-        api_client.fetch_books_by_author("xyz123")
+        api_client = make_client()
+        with pytest.raises(HTTPException) as exc:
+            await api_client.fetch_books_by_author("xyz123")
     assert exc.value.status_code == 404
     assert "No books found for author 'xyz123'" in exc.value.detail
 
 
-def test_fetch_books_conn_error(monkeypatch):
-    api_client = OpenLibraryAPIClient()
+@pytest.mark.anyio
+async def test_fetch_books_requests_only_stored_fields():
+    with respx.mock:
+        route = respx.get("https://openlibrary.org/search.json").mock(
+            return_value=httpx.Response(200, json={"docs": [{"title": "1984"}]})
+        )
+
+        await make_client().fetch_books_by_author("George Orwell")
+
+    params = route.calls.last.request.url.params
+    assert params["author"] == "George Orwell"
+    assert params["fields"] == "title,author_name,ebook_access,first_publish_year,language,key"
+
+
+@pytest.mark.anyio
+async def test_iter_books_by_author_fetches_all_pages():
+    def search(request):
+        page = int(request.url.params["page"])
+        docs = [{"title": f"Book {page}-{i}", "author_name": ["George Orwell"]} for i in range(2)]
+        if page == 3:
+            docs = docs[:1]
+        return httpx.Response(200, json={"numFound": 5, "docs": docs})
+
+    with respx.mock:
+        route = respx.get("https://openlibrary.org/search.json").mock(side_effect=search)
+
+        api_client = make_client()
+        pages = [page async for page in api_client.iter_books_by_author(
+            "George Orwell", page_size=2, max_concurrency=2
+        )]
+
+    assert route.call_count == 3
+    assert pages[0] == [{"title": "Book 1-0", "author_name": ["George Orwell"]},
+                        {"title": "Book 1-1", "author_name": ["George Orwell"]}]
+    titles = {doc["title"] for page in pages for doc in page}
+    assert titles == {"Book 1-0", "Book 1-1", "Book 2-0", "Book 2-1", "Book 3-0"}
+    assert {call.request.url.params["limit"] for call in route.calls} == {"2"}
+
+
+@pytest.mark.anyio
+async def test_iter_books_by_author_cancelled_awaits_page_tasks():
+    cleaned_up = []
+
+    async def search(request):
+        if request.url.params["page"] != "1":
+            try:
+                await asyncio.Event().wait()
+            finally:
+                # e.g. a connection being returned to the pool
+                await asyncio.sleep(0.01)
+                cleaned_up.append(request.url.params["page"])
+        return httpx.Response(200, json={"numFound": 3, "docs": [{"title": "1984"}]})
+
+    with respx.mock:
+        respx.get("https://openlibrary.org/search.json").mock(side_effect=search)
+
+        pages = make_client().iter_books_by_author("George Orwell", page_size=1, max_concurrency=2)
+        await pages.__anext__()
+        # waits for the remaining pages, which never arrive
+        waiting = asyncio.create_task(pages.__anext__())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    assert sorted(cleaned_up) == ["2", "3"]
+
+
+@pytest.mark.anyio
+async def test_iter_books_by_author_empty_response():
+    with respx.mock:
+        respx.get("https://openlibrary.org/search.json").mock(
+            return_value=httpx.Response(200, json={"numFound": 0, "docs": []})
+        )
+
+        api_client = make_client()
+        with pytest.raises(HTTPException) as exc:
+            await api_client.iter_books_by_author("xyz123").__anext__()
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_fetch_books_conn_error():
+    api_client = make_client()
 
     with patch.object(
             api_client.client, "get", side_effect=httpx.RequestError("Connection error")
     ):
         with pytest.raises(HTTPException) as exc:
-            api_client.fetch_books_by_author("Tolkien")
+            await api_client.fetch_books_by_author("Tolkien")
 
     assert exc.value.status_code == 503
     assert "OpenLibrary unavailable: Connection error" in exc.value.detail
 
 
-def test_fetch_books_server_error(monkeypatch):
-    api_client = OpenLibraryAPIClient()
+@pytest.mark.anyio
+async def test_fetch_books_server_error():
+    api_client = make_client()
 
     with patch.object(
             api_client.client, "get", side_effect=httpx.HTTPStatusError(
                 "Server error", request=None, response=type("Response", (), {"status_code": 500})())
     ):
         with pytest.raises(HTTPException) as exc:
-            api_client.fetch_books_by_author("Tolkien")
+            await api_client.fetch_books_by_author("Tolkien")
 
     assert exc.value.status_code == 500
     assert "OpenLibrary API error: Server error" in exc.value.detail
+
+
+def test_app_lifespan_manages_shared_http_client(client):
+    http_client = client.app.state.http_client
+    assert isinstance(http_client, httpx.AsyncClient)
+    assert not http_client.is_closed
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.clients.resilience import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker, ResilientTransport, TokenBucket
+)
+from app.core.metrics import OPENLIBRARY_DURATION, OPENLIBRARY_ERRORS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_transport(responses, breaker=None, limiter=None, max_attempts=3):
+    """Transport answering with `responses` in order; exceptions in the list are raised."""
+    sent = []
+    delays = []
+
+    def handler(request):
+        sent.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    transport = ResilientTransport(
+        httpx.MockTransport(handler),
+        breaker=breaker,
+        limiter=limiter,
+        max_attempts=max_attempts,
+        base_delay=0.1,
+        max_delay=1.0,
+        max_retry_after=10.0,
+        jitter=lambda low, high: high,
+        sleep=sleep
+    )
+    return transport, sent, delays
+
+
+@pytest.mark.anyio
+async def test_retries_retryable_status_with_backoff():
+    transport, sent, delays = make_transport([httpx.Response(503), httpx.Response(502), httpx.Response(200)])
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("https://openlibrary.org/search.json")
+
+    assert response.status_code == 200
+    assert len(sent) == 3
+    assert delays == [0.1, 0.2]
+    assert transport.stats()["retries"] == 2
+
+
+@pytest.mark.anyio
+async def test_retry_honours_retry_after():
+    transport, _, delays = make_transport([
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(200),
+    ])
+    async with httpx.AsyncClient(transport=transport) as client:
+        await client.get("https://openlibrary.org/search.json")
+
+    assert delays == [3.0]
+
+
+@pytest.mark.parametrize("usegmt", [True, False])
+def test_retry_after_http_date(usegmt):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    # without `usegmt` the date ends in "-0000", which parses as a naive datetime
+    value = format_datetime(retry_at if usegmt else retry_at.replace(tzinfo=None), usegmt=usegmt)
+
+    delay = ResilientTransport._retry_after(httpx.Response(429, headers={"Retry-After": value}))
+
+    assert 25 < delay <= 30
+
+
+@pytest.mark.anyio
+async def test_retry_after_above_limit_is_returned():
+    transport, sent, _ = make_transport([httpx.Response(429, headers={"Retry-After": "120"})])
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("https://openlibrary.org/search.json")
+
+    assert response.status_code == 429
+    assert len(sent) == 1
+
+
+@pytest.mark.anyio
+async def test_retries_transport_errors_until_attempts_run_out():
+    errors = [httpx.ConnectError("refused") for _ in range(3)]
+    transport, sent, _ = make_transport(errors)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://openlibrary.org/search.json")
+
+    assert len(sent) == 3
+
+
+@pytest.mark.anyio
+async def test_does_not_retry_non_idempotent_requests():
+    transport, sent, _ = make_transport([httpx.Response(503)])
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.post("https://openlibrary.org/search.json")
+
+    assert response.status_code == 503
+    assert len(sent) == 1
+
+
+@pytest.mark.anyio
+async def test_open_circuit_fails_fast_as_503():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=FakeClock())
+    transport, sent, _ = make_transport([httpx.Response(503), httpx.Response(503)], breaker=breaker)
+    client = OpenLibraryAPIClient(httpx.AsyncClient(base_url="https://openlibrary.org", transport=transport))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await client.fetch_books_by_author("George Orwell")
+
+    assert exc_info.value.status_code == 503
+    assert "circuit breaker is open" in exc_info.value.detail
+    assert len(sent) == 2
+    assert breaker.state == CIRCUIT_OPEN
+    assert transport.stats()["short_circuited"] == 1
+
+
+def test_circuit_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.transitions == {CIRCUIT_CLOSED: 1, CIRCUIT_OPEN: 2, CIRCUIT_HALF_OPEN: 2}
+
+
+@pytest.mark.anyio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=2)
+
+    waits = [await bucket.acquire() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+
+
+@pytest.mark.anyio
+async def test_cancelled_probe_releases_half_open_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+
+    async def hang(request):
+        await asyncio.sleep(60)
+
+    transport = ResilientTransport(httpx.MockTransport(hang), breaker=breaker)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("https://openlibrary.org/search.json"), timeout=0.05)
+
+    assert breaker.allow()
+
+
+@pytest.mark.anyio
+async def test_observes_latency_and_errors_per_endpoint():
+    transport, _, _ = make_transport([httpx.Response(503)] * 2 + [httpx.ConnectError("down")], max_attempts=1)
+    search_errors = OPENLIBRARY_ERRORS.labels("search", "503")
+    transport_errors = OPENLIBRARY_ERRORS.labels("books", "transport")
+    observed = sum(OPENLIBRARY_DURATION.labels("search").counts)
+    errors_before, transport_before = search_errors.value, transport_errors.value
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        await client.get("https://openlibrary.org/search.json")
+        await client.get("https://openlibrary.org/search.json")
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://openlibrary.org/books/OL1M.json")
+
+    assert sum(OPENLIBRARY_DURATION.labels("search").counts) - observed == 2
+    assert search_errors.value - errors_before == 2
+    assert transport_errors.value - transport_before == 1
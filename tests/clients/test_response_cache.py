@@ -0,0 +1,153 @@
+import threading
+import time
+
+import httpx
+import pytest
+import respx
+from fastapi import HTTPException
+
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.clients.response_cache import CacheEntry, MemoryCacheBackend, ResponseCache, SqliteCacheBackend
+
+SEARCH_URL = "https://openlibrary.org/search.json"
+
+
+def make_client(cache):
+    return OpenLibraryAPIClient(httpx.AsyncClient(base_url="https://openlibrary.org"), cache)
+
+
+def make_cache(ttl=60.0, negative_ttl=10.0):
+    return ResponseCache(MemoryCacheBackend(max_entries=10, max_bytes=10_000), ttl=ttl, negative_ttl=negative_ttl)
+
+
+def test_memory_backend_evicts_least_recently_used_entry():
+    backend = MemoryCacheBackend(max_entries=2, max_bytes=10_000)
+    backend.set("a", CacheEntry({"docs": []}, time.time() + 60))
+    backend.set("b", CacheEntry({"docs": []}, time.time() + 60))
+    backend.get("a")
+    backend.set("c", CacheEntry({"docs": []}, time.time() + 60))
+
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert backend.stats()["evictions"] == 1
+
+
+def test_memory_backend_evicts_by_size():
+    backend = MemoryCacheBackend(max_entries=10, max_bytes=100)
+    backend.set("a", CacheEntry({}, time.time() + 60, size=60))
+    backend.set("b", CacheEntry({}, time.time() + 60, size=60))
+
+    assert backend.get("a") is None
+    assert backend.stats() == {"entries": 1, "bytes": 60, "evictions": 1}
+
+
+def test_sqlite_backend_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SqliteCacheBackend(path, max_entries=10, max_bytes=10_000)
+    backend.set("a", CacheEntry({"docs": [{"title": "1984"}]}, time.time() + 60, etag='"v1"', size=30))
+    backend.close()
+
+    reopened = SqliteCacheBackend(path, max_entries=10, max_bytes=10_000)
+    entry = reopened.get("a")
+    assert entry.body == {"docs": [{"title": "1984"}]}
+    assert entry.etag == '"v1"'
+
+
+def test_sqlite_backend_evicts_least_recently_used_entry(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=2, max_bytes=10_000)
+    backend.set("a", CacheEntry({}, time.time() + 60, size=1))
+    backend.set("b", CacheEntry({}, time.time() + 60, size=1))
+    backend.get("a")
+    backend.set("c", CacheEntry({}, time.time() + 60, size=1))
+
+    assert backend.get("b") is None
+    assert backend.stats() == {"entries": 2, "bytes": 2, "evictions": 1}
+
+
+@pytest.mark.anyio
+async def test_sqlite_backend_runs_outside_event_loop_thread(tmp_path):
+    threads = []
+
+    class RecordingBackend(SqliteCacheBackend):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+    backend = RecordingBackend(str(tmp_path / "cache.sqlite3"), max_entries=10, max_bytes=10_000)
+    cache = ResponseCache(backend, ttl=60, negative_ttl=10)
+    await cache.set("a", {"docs": [{"title": "1984"}]})
+
+    assert (await cache.get("a")).body == {"docs": [{"title": "1984"}]}
+    assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.anyio
+async def test_search_is_served_from_cache_for_normalized_author():
+    cache = make_cache()
+    with respx.mock:
+        route = respx.get(SEARCH_URL).mock(
+            return_value=httpx.Response(200, json={"docs": [{"title": "1984"}]})
+        )
+        api_client = make_client(cache)
+        await api_client.fetch_books_by_author("George Orwell")
+        result = await api_client.fetch_books_by_author("  george   ORWELL ")
+
+    assert result == [{"title": "1984"}]
+    assert route.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.anyio
+async def test_empty_result_is_cached_negatively():
+    cache = make_cache()
+    with respx.mock:
+        route = respx.get(SEARCH_URL).mock(return_value=httpx.Response(200, json={"docs": []}))
+        api_client = make_client(cache)
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                await api_client.fetch_books_by_author("xyz123")
+            assert exc.value.status_code == 404
+
+    assert route.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_expired_entry_is_revalidated_with_etag():
+    cache = make_cache(ttl=-1)
+    with respx.mock:
+        route = respx.get(SEARCH_URL).mock(side_effect=[
+            httpx.Response(200, json={"docs": [{"title": "1984"}]}, headers={"ETag": '"v1"'}),
+            httpx.Response(304),
+        ])
+        api_client = make_client(cache)
+        await api_client.fetch_books_by_author("George Orwell")
+        result = await api_client.fetch_books_by_author("George Orwell")
+
+    assert result == [{"title": "1984"}]
+    assert route.calls.last.request.headers["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidations"] == 1
+
+
+@pytest.mark.anyio
+async def test_revalidating_client_revalidates_fresh_entry():
+    cache = make_cache()
+    with respx.mock:
+        route = respx.get(SEARCH_URL).mock(side_effect=[
+            httpx.Response(200, json={"docs": [{"title": "1984"}]}, headers={"ETag": '"v1"'}),
+            httpx.Response(200, json={"docs": [{"title": "Animal Farm"}]}, headers={"ETag": '"v2"'}),
+        ])
+        await make_client(cache).fetch_books_by_author("George Orwell")
+        api_client = OpenLibraryAPIClient(httpx.AsyncClient(base_url="https://openlibrary.org"), cache, revalidate=True)
+        result = await api_client.fetch_books_by_author("George Orwell")
+
+    assert result == [{"title": "Animal Farm"}]
+    assert route.calls.last.request.headers["If-None-Match"] == '"v1"'
+
+
+def test_cache_stats_endpoint(client):
+    response = client.get("/health/cache")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] is True
+    assert {"hits", "misses", "evictions", "entries", "bytes"} <= data.keys()
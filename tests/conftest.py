@@ -1,11 +1,48 @@
+import os
+import re
+
+# Tests run against a disposable database: let the app create the schema, and keep
+# startup from reaching out to OpenLibrary.
+os.environ.setdefault("DB_CREATE_SCHEMA", "true")
+os.environ.setdefault("HTTP_WARMUP_CONNECTIONS", "0")
+# Ingest tests store the same authors again; freshness is tested explicitly.
+os.environ.setdefault("AUTHOR_FRESHNESS_TTL", "0")
+os.environ.setdefault("AUTHOR_REFRESH_INTERVAL", "0")
+# Tests patch the service behind GET /books; the page cache is tested explicitly.
+os.environ.setdefault("BOOKS_RESULT_CACHE_MAX_ENTRIES", "0")
+
 import pytest
 from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.models.schemas import BookPage
 from app.services.book_data_manager import BookDataManager
 
 
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Returns a check that a response ran at most `limit` SQL statements, read from the
+    `Server-Timing` header, so N+1 regressions fail the tests.
+    """
+    def check(response, limit: int):
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+        assert queries <= limit, f"{response.request.method} {response.request.url} ran {queries} SQL statements, expected at most {limit}"
+    return check
+
+
 @pytest.fixture
 def mock_db():
-    db = MagicMock()
+    db = MagicMock(spec=AsyncSession)
+    db.execute.return_value = MagicMock()
     return db
 
 
@@ -15,21 +52,25 @@ def book_manager(mock_db):
 
 
 @pytest.fixture
-def sample_books():
-    author1 = MagicMock()
-    author1.name = "George Orwell"
+def books_result(mock_db):
+    """Result of `await db.execute(...)`; `all()` has to return `(book, sort value)` rows."""
+    return mock_db.execute.return_value
 
-    author2 = MagicMock()
-    author2.name = "Aldous Huxley"
 
-    book1 = MagicMock(title="1984", authors=[author1])
-    book2 = MagicMock(title="Animal Farm", authors=[author1])
-    book3 = MagicMock(title="Brave New World", authors=[author2])
+@pytest.fixture
+def sample_books():
+    """Rows of the `book_listings` read model, as returned by `BookDataManager.get_books`."""
+    def listing(book_id, title, authors):
+        return MagicMock(book_id=book_id, title=title, authors=authors, authors_list=authors)
 
-    return [book1, book2, book3]
+    return [
+        listing(1, "1984", ["George Orwell"]),
+        listing(2, "Animal Farm", ["George Orwell"]),
+        listing(3, "Brave New World", ["Aldous Huxley"]),
+    ]
 
 
-def mock_get_books(author=None, title=None):
+def mock_get_books(author=None, title=None, **kwargs):
     books = [
         {"title": "1984", "authors": ["George Orwell"], "ebook_access": "no_ebook",
          "first_publish_year": 1949, "language": ["eng"]},
@@ -41,4 +82,9 @@ def mock_get_books(author=None, title=None):
         if (author is None or author in b["authors"])
         and (title is None or title == b["title"])
     ]
-    return result
+    return BookPage(items=result)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,48 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, accepts_encoding
+
+
+def make_client(body: str) -> TestClient:
+    app = Starlette(routes=[Route("/", lambda request: PlainTextResponse(body))])
+    return TestClient(CompressionMiddleware(app, minimum_size=100))
+
+
+def test_accepts_encoding():
+    assert accepts_encoding("gzip, deflate, br", "br")
+    assert accepts_encoding("br;q=0.5", "br")
+    assert not accepts_encoding("gzip, br;q=0", "br")
+    assert not accepts_encoding("gzip", "br")
+
+
+def test_compresses_large_responses_with_gzip_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    client = make_client("book " * 100)
+
+    response = client.get("/", headers={"Accept-Encoding": "br, gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.text == "book " * 100
+
+
+def test_keeps_small_responses_uncompressed():
+    response = make_client("book").get("/", headers={"Accept-Encoding": "br, gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "book"
+
+
+def test_prefers_brotli_when_installed():
+    pytest.importorskip("brotli")
+    client = make_client("book " * 100)
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.text == "book " * 100
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from app.core.http_cache import etag_matches, http_date, make_etag, not_modified_since
+
+
+def test_etag_depends_on_version_params_and_variant():
+    etag = make_etag(3, [("author", "Orwell"), ("limit", "10")])
+
+    assert etag == make_etag(3, [("limit", "10"), ("author", "Orwell")])
+    assert etag != make_etag(4, [("author", "Orwell"), ("limit", "10")])
+    assert etag != make_etag(3, [("author", "Orwell")])
+    assert etag != make_etag(3, [("author", "Orwell"), ("limit", "10")], "application/x-ndjson")
+
+
+def test_etag_matches_weakly():
+    etag = make_etag(1, [])
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_not_modified_since_uses_second_precision():
+    last_modified = datetime(2024, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    header = http_date(last_modified)
+
+    assert header == "Mon, 01 Jan 2024 12:00:00 GMT"
+    assert not_modified_since(header, last_modified)
+    assert not not_modified_since("Mon, 01 Jan 2024 11:59:59 GMT", last_modified)
+    assert not not_modified_since("not a date", last_modified)
+    assert not not_modified_since(header, None)
@@ -0,0 +1,62 @@
+from app.clients.response_cache import MemoryCacheBackend
+from app.core.listing_cache import ListingCache, listing_key
+
+
+def make_cache(max_entries=10, max_bytes=10_000):
+    return ListingCache(MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes))
+
+
+def test_listing_key_ignores_parameter_order_and_unused_values():
+    assert listing_key(author="Orwell", limit=100, min_similarity=0.3, search=None) == \
+        listing_key(limit=100, search="", author="Orwell", min_similarity=0.5)
+    assert listing_key(author="Orwell", limit=100) != listing_key(author="Orwell", limit=10)
+    assert listing_key(search="orwel", min_similarity=0.3) != listing_key(search="orwel", min_similarity=0.5)
+
+
+def test_serves_pages_of_the_cached_version_only():
+    cache = make_cache()
+    key = listing_key(author="Orwell")
+    cache.set(7, key, b"[1]", next_cursor="abc", total_estimate=3)
+
+    entry = cache.get(7, key)
+    assert (entry.body, entry.next_cursor, entry.total_estimate) == (b"[1]", "abc", 3)
+
+    # a request that saw a newer catalog empties the cache
+    assert cache.get(8, key) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+    # a request that saw an older catalog (e.g. a lagging replica) is neither served nor cached
+    cache.set(8, key, b"[2]")
+    assert cache.get(7, key) is None
+    cache.set(7, key, b"[1]")
+    assert cache.get(8, key).body == b"[2]"
+
+
+def test_stats_report_hit_ratio_and_size():
+    cache = make_cache()
+    assert cache.stats()["hit_ratio"] == 0.0
+
+    key = listing_key(title="1984")
+    cache.get(1, key)
+    cache.set(1, key, b"x" * 100)
+    cache.get(1, key)
+    cache.get(1, key)
+    cache.get(1, key)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (3, 1, 0.75)
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 100 + len(key)
+    assert stats["version"] == 1
+
+
+def test_evicts_least_recently_used_pages_beyond_max_bytes():
+    cache = make_cache(max_bytes=400)
+    keys = [listing_key(title=str(i)) for i in range(3)]
+    for key in keys:
+        cache.set(1, key, b"x" * 100)
+
+    assert cache.get(1, keys[0]) is None
+    assert cache.get(1, keys[2]) is not None
+    assert cache.stats()["evictions"] == 1
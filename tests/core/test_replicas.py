@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import async_database_url
+from app.core.replicas import LEAST_CONNECTIONS, ReplicaRouter, read_primary_until, reads_from_primary
+from app.core.settings import settings
+
+
+def make_engine(checked_out: int = 0):
+    engine = MagicMock()
+    engine.sync_engine.pool.checkedout.return_value = checked_out
+    return engine
+
+
+def test_round_robin_skips_unhealthy_replicas():
+    primary, first, second, third = make_engine(), make_engine(), make_engine(), make_engine()
+    router = ReplicaRouter(primary, {"replica-0": first, "replica-1": second, "replica-2": third})
+    router.mark("replica-1", False)
+
+    assert [router.choose() for _ in range(4)] == [first, third, first, third]
+    assert router.choose(prefer_primary=True) is primary
+
+
+def test_least_connections_picks_least_busy_replica():
+    busy, idle = make_engine(checked_out=5), make_engine(checked_out=1)
+    router = ReplicaRouter(make_engine(), {"replica-0": busy, "replica-1": idle}, LEAST_CONNECTIONS)
+
+    assert router.choose() is idle
+
+
+def test_falls_back_to_primary_without_healthy_replicas():
+    primary = make_engine()
+    assert ReplicaRouter(primary).choose() is primary
+
+    router = ReplicaRouter(primary, {"replica-0": make_engine()})
+    router.mark("replica-0", False)
+    assert router.choose() is primary
+
+
+def test_read_primary_cookie_expires_after_window():
+    cookie = read_primary_until(5.0, now=1000.0)
+
+    assert reads_from_primary(cookie, now=1004.0)
+    assert not reads_from_primary(cookie, now=1007.0)
+    assert not reads_from_primary(None)
+    assert not reads_from_primary("garbage")
+
+
+@pytest.mark.anyio
+async def test_check_takes_failing_replica_out_of_rotation():
+    # Two local databases stand in for the replicas: the test database (reachable, no
+    # replication, so no lag) and a database that does not exist.
+    url = make_url(settings.database_url)
+    healthy = create_async_engine(async_database_url(settings.database_url))
+    broken = create_async_engine(async_database_url(url.set(database="missing_replica_db").render_as_string(False)))
+    router = ReplicaRouter(make_engine(), {"replica-0": healthy, "replica-1": broken})
+    try:
+        statuses = await router.check(timeout=5.0, max_lag=30.0)
+    finally:
+        await router.dispose()
+
+    assert statuses == {"replica-0": "ok", "replica-1": "failed"}
+    assert [router.choose() for _ in range(2)] == [healthy, healthy]
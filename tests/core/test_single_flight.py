@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_leaves_call_running_for_others():
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flights.run("key", call))
+    second = asyncio.create_task(flights.run("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+    assert calls == [1]
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.anyio
+async def test_call_is_cancelled_with_its_last_waiter():
+    flights = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def call():
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flights.run("key", call)) for _ in range(2)]
+    await started.wait()
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+    assert not flights.in_flight("key")
@@ -0,0 +1,207 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete, func, insert, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import schema
+from app.core.database import LockTimeoutError, advisory_lock, async_database_url, warm_up_pool
+from app.core.metrics import HTTP_IN_FLIGHT, drain_in_flight
+from app.core.schema import SCHEMA_VERSION, SchemaVersionError, prepare_schema
+from app.core.settings import settings
+from app.core.text import book_dedupe_hash
+from app.models.book_listing_model import BookListing
+from app.models.book_model import Authors, Books, book_authors
+from app.models.catalog_facet_model import NULL_VALUE, TOTAL, CatalogFacet
+
+
+@pytest.fixture
+async def engine():
+    # A dedicated engine: asyncpg connections belong to the event loop of the test.
+    engine = create_async_engine(async_database_url(settings.database_url), pool_size=2)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def other_engine():
+    # Another session than the pooled connections of `engine`, which could hold a leaked lock.
+    engine = create_async_engine(async_database_url(settings.database_url), pool_size=1)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_prepare_schema_creates_then_checks_version(engine):
+    assert await prepare_schema(engine, create=True) == SCHEMA_VERSION
+    assert await prepare_schema(engine, create=False) == SCHEMA_VERSION
+
+
+@pytest.mark.anyio
+async def test_prepare_schema_rejects_other_version(engine):
+    await prepare_schema(engine, create=True)
+
+    with patch.object(schema, "SCHEMA_VERSION", SCHEMA_VERSION + 1):
+        with pytest.raises(SchemaVersionError):
+            await prepare_schema(engine, create=False)
+        with pytest.raises(SchemaVersionError):
+            await prepare_schema(engine, create=True)
+
+
+@pytest.mark.anyio
+async def test_warm_up_pool_opens_connections_up_to_pool_size(engine):
+    warmed = []
+
+    async def warm_up(conn):
+        warmed.append(conn)
+
+    assert await warm_up_pool(5, warm_up, bind=engine) == 2
+    assert len(warmed) == 2
+    assert engine.sync_engine.pool.checkedin() == 2
+
+
+@pytest.mark.anyio
+async def test_advisory_lock_runs_block_on_its_connection(engine):
+    async with advisory_lock("test", bind=engine) as conn:
+        # the lock outlives the session's commits
+        async with AsyncSession(bind=conn) as db:
+            await db.execute(text("SELECT 1"))
+            await db.commit()
+        assert engine.sync_engine.pool.checkedout() == 1
+        with pytest.raises(LockTimeoutError):
+            async with advisory_lock("test", timeout=0.05, bind=engine):
+                pass
+
+    async with advisory_lock("test", timeout=0.05, bind=engine):
+        pass
+
+
+@pytest.mark.anyio
+async def test_advisory_lock_is_released_when_cancelled_while_unlocking(engine, other_engine):
+    entered = asyncio.Event()
+
+    async def hold():
+        async with advisory_lock("test", bind=engine):
+            entered.set()
+            await asyncio.Event().wait()
+
+    holder = asyncio.create_task(hold())
+    await entered.wait()
+    holder.cancel()
+    # the first cancellation starts the cleanup, the second one lands in it
+    await asyncio.sleep(0)
+    holder.cancel()
+    await asyncio.gather(holder, return_exceptions=True)
+
+    async with advisory_lock("test", timeout=0.5, bind=other_engine):
+        pass
+
+
+@pytest.mark.anyio
+async def test_advisory_lock_drops_connection_when_unlock_fails(engine, other_engine):
+    with patch("app.core.database._release_advisory_lock", side_effect=RuntimeError("connection lost")):
+        with pytest.raises(RuntimeError):
+            async with advisory_lock("test", bind=engine):
+                pass
+
+    async with advisory_lock("test", timeout=0.5, bind=other_engine):
+        pass
+
+
+@pytest.mark.anyio
+async def test_advisory_lock_reraises_other_database_errors(engine):
+    with pytest.raises(DBAPIError):
+        # an invalid lock_timeout, not a timed out wait
+        async with advisory_lock("test", timeout=-1, bind=engine):
+            pass
+
+
+@pytest.mark.anyio
+async def test_drain_in_flight_times_out_while_requests_run():
+    HTTP_IN_FLIGHT.inc()
+    try:
+        assert await drain_in_flight(timeout=0.05, poll_interval=0.01) is False
+    finally:
+        HTTP_IN_FLIGHT.dec()
+    assert await drain_in_flight(timeout=0.05) is True
+
+
+@pytest.mark.anyio
+async def test_upgrade_fills_book_listings_of_existing_books(engine):
+    await prepare_schema(engine, create=True)
+    async with engine.begin() as conn:
+        book_id = (await conn.execute(
+            insert(Books).values(title="Upgrade Book", language=["eng"]).returning(Books.id)
+        )).scalar_one()
+        author_id = (await conn.execute(
+            insert(Authors).values(name="Upgrade Author").returning(Authors.id)
+        )).scalar_one()
+        await conn.execute(insert(book_authors).values(book_id=book_id, author_id=author_id))
+    try:
+        async with engine.begin() as conn:
+            await schema.UPGRADES[1](conn)
+            listing = (await conn.execute(
+                select(BookListing).where(BookListing.book_id == book_id)
+            )).one()
+        assert listing.authors == ["Upgrade Author"]
+        assert json.loads(listing.payload)["title"] == "Upgrade Book"
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Books).where(Books.id == book_id))
+            await conn.execute(delete(Authors).where(Authors.id == author_id))
+
+
+@pytest.mark.anyio
+async def test_upgrade_hashes_stored_books_and_keeps_repeated_ones(engine):
+    await prepare_schema(engine, create=True)
+    async with engine.begin() as conn:
+        book_ids = (await conn.execute(
+            insert(Books).returning(Books.id),
+            [{"title": "Upgrade Twin", "language": []}, {"title": "upgrade  twin", "language": []}]
+        )).scalars().all()
+        await conn.execute(insert(BookListing), [
+            {"book_id": book_id, "title": title, "authors": ["Twin Author"], "payload": b"{}"}
+            for book_id, title in zip(book_ids, ["Upgrade Twin", "upgrade  twin"])
+        ])
+    try:
+        async with engine.begin() as conn:
+            # as in a version 2 database, the index comes with the upgrade
+            await conn.execute(text("DROP INDEX ux_books_dedupe_hash"))
+            await schema.UPGRADES[2](conn)
+            hashes = (await conn.execute(
+                select(Books.dedupe_hash).where(Books.id.in_(book_ids)).order_by(Books.id)
+            )).scalars().all()
+        assert hashes == [book_dedupe_hash("Upgrade Twin", ["Twin Author"]), None]
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Books).where(Books.id.in_(book_ids)))
+
+
+@pytest.mark.anyio
+async def test_upgrade_counts_stored_books_into_catalog_facets(engine):
+    await prepare_schema(engine, create=True)
+    async with engine.begin() as conn:
+        # as in a version 4 database, the index comes with the upgrade
+        await conn.execute(text("DROP INDEX ix_book_listings_language"))
+        await schema.UPGRADES[4](conn)
+        listed = (await conn.execute(select(func.count()).select_from(BookListing))).scalar_one()
+        total = (await conn.execute(
+            select(CatalogFacet.count).where(CatalogFacet.facet == TOTAL, CatalogFacet.value == NULL_VALUE)
+        )).scalar_one()
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("book_listings"))
+    assert total == listed
+    assert "ix_book_listings_language" in {index["name"] for index in indexes}
+
+
+@pytest.mark.anyio
+async def test_upgrade_adds_ingest_job_results(engine):
+    await prepare_schema(engine, create=True)
+    async with engine.begin() as conn:
+        # as in a version 5 database
+        await conn.execute(text("ALTER TABLE ingest_jobs DROP COLUMN updated_books, DROP COLUMN up_to_date"))
+        await schema.UPGRADES[5](conn)
+        columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns("ingest_jobs"))
+    assert {"updated_books", "up_to_date"} <= {column["name"] for column in columns}
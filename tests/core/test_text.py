@@ -0,0 +1,13 @@
+from app.core.text import book_dedupe_hash, normalize_name
+
+
+def test_normalize_name_folds_case_and_whitespace():
+    assert normalize_name("  J.R.R.   Tolkien ") == "j.r.r. tolkien"
+
+
+def test_book_dedupe_hash_ignores_case_whitespace_and_author_order():
+    stored = book_dedupe_hash("Good Omens", ["Terry Pratchett", "Neil Gaiman"])
+
+    assert book_dedupe_hash(" good  OMENS", ["neil gaiman", "Terry  Pratchett"]) == stored
+    assert book_dedupe_hash("Good Omens", ["Terry Pratchett"]) != stored
+    assert book_dedupe_hash("Good Omens 2", ["Terry Pratchett", "Neil Gaiman"]) != stored
@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.schemas import StoreBooksResponse
+from app.services.author_refresher import AuthorRefresher
+from app.services.author_sync_manager import AuthorQueryCounter, AuthorSyncManager
+from app.services.book_service import BookService
+
+RESULT = StoreBooksResponse(inserted_books=0, inserted_authors=0, duplicates_count=3, message="")
+
+
+def make_refresher(queries: AuthorQueryCounter) -> AuthorRefresher:
+    return AuthorRefresher(http_client=MagicMock(), session_factory=MagicMock(), interval=60, batch_size=2,
+                           queries=queries)
+
+
+@pytest.mark.anyio
+async def test_refresh_once_flushes_query_counts_and_refreshes_stale_authors():
+    queries = AuthorQueryCounter()
+    queries.add("george orwell")
+    queries.add("george orwell")
+
+    with patch.object(AuthorSyncManager, "decay_query_counts") as mock_decay, \
+            patch.object(AuthorSyncManager, "add_query_counts") as mock_counts, \
+            patch.object(AuthorSyncManager, "stale_authors", return_value=["George Orwell", "Nobody"]) as mock_stale, \
+            patch.object(BookService, "refresh_author",
+                         side_effect=[RESULT, HTTPException(status_code=404, detail="No books found")]) as mock_refresh, \
+            patch("app.services.author_refresher.OpenLibraryAPIClient") as mock_client:
+        assert await make_refresher(queries).refresh_once() == 2
+
+    mock_decay.assert_awaited_once()
+    mock_counts.assert_awaited_once_with({"george orwell": 2})
+    assert mock_stale.await_args.args[1] == 2
+    assert [call.args[0] for call in mock_refresh.await_args_list] == ["George Orwell", "Nobody"]
+    # refreshes are not answered from cached OpenLibrary pages
+    assert mock_client.call_args.kwargs["revalidate"] is True
+    assert queries.drain() == {}
+
+
+def test_query_counter_caps_distinct_authors():
+    queries = AuthorQueryCounter(max_authors=1)
+    queries.add("george orwell")
+    queries.add("aldous huxley")
+    queries.add("george orwell")
+
+    assert queries.drain() == {"george orwell": 2}
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import async_database_url
+from app.core.schema import prepare_schema
+from app.core.settings import settings
+from app.models.author_sync_model import AuthorSync
+from app.services.author_sync_manager import AuthorSyncManager
+
+KEYS = ("sync test author", "sync test other author")
+
+
+@pytest.fixture
+async def db():
+    # A dedicated engine: asyncpg connections belong to the event loop of the test.
+    engine = create_async_engine(async_database_url(settings.database_url), pool_size=1)
+    await prepare_schema(engine, create=True)
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        yield session
+        await session.execute(delete(AuthorSync).where(AuthorSync.author_key.in_(KEYS)))
+        await session.commit()
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_record_fetch_tracks_content_changes(db):
+    manager = AuthorSyncManager(db)
+
+    assert await manager.record_fetch(KEYS[0], "Sync Test Author", 2, "hash-1") is True
+    assert await manager.record_fetch(KEYS[0], "Sync Test Author", 2, "hash-1") is False
+    assert await manager.record_fetch(KEYS[0], "Sync Test Author", 3, "hash-2") is True
+
+    sync = await manager.get_sync(KEYS[0])
+    assert (sync.num_found, sync.content_hash) == (3, "hash-2")
+
+
+@pytest.mark.anyio
+async def test_stale_authors_most_queried_first(db):
+    manager = AuthorSyncManager(db)
+    await manager.record_fetch(KEYS[0], "Sync Test Author", 1, "hash")
+    await manager.record_fetch(KEYS[1], "Sync Test Other Author", 1, "hash")
+
+    await manager.add_query_counts({KEYS[1]: 5, KEYS[0]: 1, "never fetched author": 3})
+
+    stale = await manager.stale_authors(ttl=0, limit=1000)
+    assert stale.index("Sync Test Other Author") < stale.index("Sync Test Author")
+    assert "Sync Test Author" not in await manager.stale_authors(ttl=3600, limit=1000)
+
+
+@pytest.mark.anyio
+async def test_decayed_query_counts_follow_recent_queries(db):
+    manager = AuthorSyncManager(db)
+    await manager.record_fetch(KEYS[0], "Sync Test Author", 1, "hash")
+    await manager.record_fetch(KEYS[1], "Sync Test Other Author", 1, "hash")
+    await manager.add_query_counts({KEYS[0]: 8})
+
+    for _ in range(3):
+        await manager.decay_query_counts()
+        await manager.add_query_counts({KEYS[1]: 2})
+
+    syncs = await manager.get_syncs(KEYS)
+    # 8 -> 1 after three rounds without queries, while 2 queries per round settle at 3
+    assert syncs[KEYS[0]].query_count == 1
+    assert syncs[KEYS[1]].query_count == 3
+    stale = await manager.stale_authors(ttl=0, limit=1000)
+    assert stale.index("Sync Test Other Author") < stale.index("Sync Test Author")
@@ -1,37 +1,48 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.text import book_dedupe_hash
+from app.services.book_data_manager import BookDataManager
 
 client = TestClient(app)
 
 
-def test_store_books_counts(book_manager, mock_db):
+@pytest.mark.anyio
+async def test_store_books_counts(book_manager, mock_db):
     books = [
         {"title": "1984", "author_name": ["George Orwell"], "ebook_access": "no_ebook",
-         "first_publish_year": 1949, "language": ["eng"]},
+         "first_publish_year": 1949, "language": ["eng"], "key": "/works/OL1168083W"},
         {"title": "Brave New World", "author_name": ["Aldous Huxley"], "ebook_access": "no_ebook",
-         "first_publish_year": 1932, "language": ["eng"]},
+         "first_publish_year": 1932, "language": ["eng"], "key": "/works/OL64468W"},
     ]
 
-    mock_query = MagicMock()
-    mock_query.join.return_value.filter.return_value.filter.return_value.first.side_effect = [
-        None, None, MagicMock(), MagicMock()
-    ]
-    mock_db.query.return_value = mock_query
+    # per stored doc its book id, then the author lookup (not found) and insert;
+    # the repeated docs conflict and return no row
+    mock_db.execute.return_value.scalar_one_or_none.side_effect = [10, None, 1, 11, None, 2, None, None]
 
-    result = book_manager.store_books(books)
+    result = await book_manager.store_books(books)
     assert result["inserted_books"] == 2
     assert result["duplicates_count"] == 0
+    book_insert = mock_db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT DO NOTHING RETURNING books.id" in str(book_insert)
+    assert book_insert.params["openlibrary_key"] == "/works/OL1168083W"
+    assert book_insert.params["dedupe_hash"] == book_dedupe_hash("1984", ["George Orwell"])
 
-    result2 = book_manager.store_books(books)
+    result2 = await book_manager.store_books(books)
     assert result2["inserted_books"] == 0
     assert result2["duplicates_count"] == 2
     assert "2 books of requested author already exist in the database" in result2["message"]
 
 
-def test_store_books_empty_list(book_manager, mock_db):
-    result = book_manager.store_books([])
+@pytest.mark.anyio
+async def test_store_books_empty_list(book_manager, mock_db):
+    result = await book_manager.store_books([])
     assert result == {
         "inserted_books": 0,
         "inserted_authors": 0,
@@ -40,7 +51,8 @@ def test_store_books_empty_list(book_manager, mock_db):
     }
 
 
-def test_store_books_single_duplicate(book_manager, mock_db):
+@pytest.mark.anyio
+async def test_store_books_single_duplicate(book_manager, mock_db):
     books = {
         "title": "The Hobbit",
         "author_name": ["J.R.R. Tolkien"],
@@ -49,30 +61,38 @@ def test_store_books_single_duplicate(book_manager, mock_db):
         "language": ["eng"]
     }
 
-    mock_books_query = MagicMock()
-    mock_books_query.join.return_value.filter.return_value.filter.return_value.first.return_value = MagicMock()
-    mock_authors_query = MagicMock()
-    mock_authors_query.filter_by.return_value.first.return_value = None
-    mock_db.query = MagicMock(side_effect=[mock_books_query, mock_authors_query])
+    mock_db.execute.return_value.scalar_one_or_none.return_value = None
 
-    result = book_manager.store_books([books])
+    result = await book_manager.store_books([books])
 
     assert result["inserted_books"] == 0
     assert result["inserted_authors"] == 0
     assert result["duplicates_count"] == 1
     assert result["message"] == "1 book of requested author already exist in the database"
+    mock_db.execute.assert_awaited_once()
 
 
-def test_get_books_no_filter(book_manager, mock_db, sample_books):
-    books = sample_books[:2]
+def inserted_rows(*books):
+    """Result of the books INSERT ... RETURNING for `(id, title, authors)` of the inserted books."""
+    result = MagicMock()
+    result.all.return_value = [(book_id, book_dedupe_hash(title, authors)) for book_id, title, authors in books]
+    return result
+
+
+def with_keys(books):
+    return [(book, index) for index, book in enumerate(books, start=1)]
+
+
+def executed_sql(mock_db) -> str:
+    return str(mock_db.execute.call_args.args[0].compile())
+
 
-    mock_query = MagicMock()
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.all.return_value = books
-    mock_db.query.return_value = mock_query
+@pytest.mark.anyio
+async def test_get_books_no_filter(book_manager, books_result, mock_db, sample_books):
+    books = sample_books[:2]
+    books_result.all.return_value = with_keys(books)
 
-    result = book_manager.get_books()
+    result = await book_manager.get_books()
 
     assert len(result) == 2
     titles = [book.title for book in result]
@@ -81,19 +101,17 @@ def test_get_books_no_filter(book_manager, mock_db, sample_books):
     for book in result:
         assert hasattr(book, "authors_list")
         assert book.authors_list == ["George Orwell"]
+    assert "LIMIT" not in executed_sql(mock_db)
 
 
-def test_get_books_filter_author(book_manager, mock_db, sample_books):
+@pytest.mark.anyio
+async def test_get_books_filter_author(book_manager, books_result, mock_db, sample_books):
     books = sample_books
+    books_result.all.side_effect = lambda: with_keys(
+        [book for book in books if "George Orwell" in book.authors]
+    )
 
-    mock_query = MagicMock()
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.all.side_effect = lambda: [book for book in books if
-                                          any(a.name == "George Orwell" for a in book.authors)]
-    mock_db.query.return_value = mock_query
-
-    result = book_manager.get_books(author="George Orwell")
+    result = await book_manager.get_books(author="George Orwell")
 
     filtered_titles = [book.title for book in result]
     assert filtered_titles == ["1984", "Animal Farm"]
@@ -101,22 +119,19 @@ def test_get_books_filter_author(book_manager, mock_db, sample_books):
     for book in result:
         assert hasattr(book, "authors_list")
         assert "George Orwell" in book.authors_list
+    # one query on the read model, no join and no relationship loading
+    sql = executed_sql(mock_db)
+    assert "lower(book_listings.authors_text) LIKE lower(:authors_text_1)" in sql
+    assert "JOIN" not in sql and "authors.name" not in sql
+    mock_db.execute.assert_awaited_once()
 
 
-def test_get_books_filter_title(book_manager, mock_db, sample_books):
+@pytest.mark.anyio
+async def test_get_books_filter_title(book_manager, books_result, sample_books):
     books = sample_books
+    books_result.all.side_effect = lambda: with_keys([book for book in books if "1984" in book.title])
 
-    mock_query = MagicMock()
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-
-    mock_query.all.side_effect = lambda: [
-        book for book in books if "1984" in book.title
-    ]
-
-    mock_db.query.return_value = mock_query
-
-    result = book_manager.get_books(title="1984")
+    result = await book_manager.get_books(title="1984")
 
     filtered_titles = [book.title for book in result]
     assert filtered_titles == ["1984"]
@@ -126,23 +141,252 @@ def test_get_books_filter_title(book_manager, mock_db, sample_books):
         assert any(isinstance(name, str) for name in book.authors_list)
 
 
-def test_get_books_filter_author_and_title(book_manager, mock_db, sample_books):
+@pytest.mark.anyio
+async def test_get_books_filter_author_and_title(book_manager, books_result, sample_books):
     books = sample_books
-
-    mock_query = MagicMock()
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-
-    mock_query.all.side_effect = [
-        [book for book in books if book.title == "1984" and any(a.name == "George Orwell" for a in book.authors)],
+    books_result.all.side_effect = [
+        with_keys([book for book in books
+                   if book.title == "1984" and "George Orwell" in book.authors]),
         []
     ]
 
-    mock_db.query.return_value = mock_query
-
-    result1 = book_manager.get_books(author="George Orwell", title="1984")
+    result1 = await book_manager.get_books(author="George Orwell", title="1984")
     filtered_titles = [book.title for book in result1]
     assert filtered_titles == ["1984"]
 
-    result2 = book_manager.get_books(author="George Orwell", title="Brave New World")
+    result2 = await book_manager.get_books(author="George Orwell", title="Brave New World")
     assert result2 == []
+
+
+@pytest.mark.anyio
+async def test_get_books_keyset_page(book_manager, books_result, mock_db, sample_books):
+    book = sample_books[1]
+    book.book_id = 7
+    books_result.all.return_value = [(book, "Animal Farm")]
+
+    result = await book_manager.get_books(sort="title", after=("1984", 3), limit=2)
+
+    assert result[0].sort_key == ("Animal Farm", 7)
+    keyset_sql = executed_sql(mock_db)
+    assert "(book_listings.title, book_listings.book_id) > (:param_1, :param_2)" in keyset_sql
+    assert "LIMIT :param_3" in keyset_sql
+
+
+@pytest.mark.anyio
+async def test_estimate_books_count_uses_planner_estimate(book_manager, mock_db):
+    connection = mock_db.connection.return_value
+    connection.dialect = postgresql.asyncpg.dialect()
+    connection.exec_driver_sql = AsyncMock(return_value=MagicMock())
+    connection.exec_driver_sql.return_value.scalar.return_value = json.dumps([{"Plan": {"Plan Rows": 1234}}])
+
+    assert await book_manager.estimate_books_count(title="1984") == 1234
+    sql, params = connection.exec_driver_sql.call_args.args
+    assert sql.startswith("EXPLAIN (FORMAT JSON) ")
+    assert params == ("%1984%",)
+
+
+@pytest.mark.anyio
+async def test_store_books_bulk_inserts_new_books(book_manager, mock_db):
+    books = [
+        {"title": "1984", "author_name": ["George Orwell"], "ebook_access": "no_ebook",
+         "first_publish_year": 1949, "language": ["eng"]},
+        {"title": "Brave New World", "author_name": ["Aldous Huxley"], "ebook_access": "no_ebook",
+         "first_publish_year": 1932, "language": ["eng"]},
+    ]
+
+    mock_db.execute.side_effect = [
+        inserted_rows((10, "1984", ["George Orwell"]), (11, "Brave New World", ["Aldous Huxley"])),
+        [],
+        [(1, "Aldous Huxley"), (2, "George Orwell")],
+        None,
+        None,
+        None,
+        None,
+    ]
+
+    result = await book_manager.store_books(books, bulk=True)
+
+    assert result == {
+        "inserted_books": 2,
+        "inserted_authors": 2,
+        "duplicates_count": 0,
+        "message": ""
+    }
+    links = mock_db.execute.call_args_list[3].args[1]
+    assert links == [{"book_id": 10, "author_id": 2}, {"book_id": 11, "author_id": 1}]
+    listings = mock_db.execute.call_args_list[4].args[1]
+    assert [(row["book_id"], row["authors"]) for row in listings] == [(10, ["George Orwell"]), (11, ["Aldous Huxley"])]
+    assert json.loads(listings[0]["payload"]) == {
+        "title": "1984", "ebook_access": "no_ebook", "first_publish_year": 1949,
+        "authors": ["George Orwell"], "language": ["eng"]
+    }
+    facets = {(row["facet"], row["value"]): row["count"] for row in mock_db.execute.call_args_list[5].args[1]}
+    assert facets == {
+        ("author", "Aldous Huxley"): 1, ("author", "George Orwell"): 1, ("decade", "1930"): 1, ("decade", "1940"): 1,
+        ("ebook_access", "no_ebook"): 2, ("language", "eng"): 2, ("total", ""): 2,
+    }
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_store_books_bulk_counts_duplicates(book_manager, mock_db):
+    books = [
+        {"title": "1984", "author_name": ["George Orwell"]},
+        {"title": "1984", "author_name": ["George Orwell"]},
+        {"title": "Animal Farm", "author_name": ["George Orwell"]},
+    ]
+
+    mock_db.execute.side_effect = [inserted_rows()]
+
+    result = await book_manager.store_books(books, bulk=True)
+
+    assert result["inserted_books"] == 0
+    assert result["inserted_authors"] == 0
+    assert result["duplicates_count"] == 3
+    assert result["message"] == "3 books of requested author already exist in the database"
+    # the repeated doc is dropped before the INSERT, which finds the two stored books
+    statement, rows = mock_db.execute.call_args.args
+    assert "ON CONFLICT DO NOTHING" in str(statement.compile(dialect=postgresql.dialect()))
+    assert [row["title"] for row in rows] == ["1984", "Animal Farm"]
+    mock_db.execute.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_store_books_bulk_chunks_reuse_resolved_authors(book_manager, mock_db):
+    books = [
+        {"title": "1984", "author_name": ["George Orwell"]},
+        {"title": "Animal Farm", "author_name": ["George Orwell"]},
+    ]
+
+    mock_db.execute.side_effect = [
+        inserted_rows((10, "1984", ["George Orwell"])),
+        [],
+        [(1, "George Orwell")],
+        None,
+        None,
+        inserted_rows((11, "Animal Farm", ["George Orwell"])),
+        None,
+        None,
+        None,
+        None,
+    ]
+
+    result = await book_manager.store_books(books, bulk=True, chunk_size=1)
+
+    assert result["inserted_books"] == 2
+    assert result["inserted_authors"] == 1
+    # books, author lookup and insert, links and listings, then the second chunk without
+    # resolving its author again, then the facet counts of both chunks and one catalog version bump
+    assert mock_db.execute.call_count == 10
+    assert "catalog_facets" in str(mock_db.execute.call_args_list[-2].args[0])
+    assert "catalog_version" in str(mock_db.execute.call_args_list[-1].args[0])
+
+
+@pytest.mark.anyio
+async def test_get_books_search_ranks_by_similarity(book_manager, books_result, mock_db, sample_books):
+    books_result.all.return_value = [(sample_books[0], 0.6)]
+
+    result = await book_manager.get_books(search="1948", min_similarity=0.4)
+
+    assert [book.title for book in result] == ["1984"]
+    assert result[0].sort_key[0] == 0.6
+    threshold_stmt, listing_stmt = [call.args[0] for call in mock_db.execute.call_args_list]
+    threshold_sql = str(threshold_stmt.compile(compile_kwargs={"literal_binds": True}))
+    assert "set_config('pg_trgm.similarity_threshold', '0.4', true)" in threshold_sql
+    assert "ORDER BY greatest(" in str(listing_stmt.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.anyio
+async def test_iter_books_streams_with_yield_per(book_manager, mock_db, sample_books):
+    async def rows():
+        for row in with_keys(sample_books):
+            yield row
+
+    mock_db.stream.return_value = rows()
+
+    result = [book async for book in book_manager.iter_books(batch_size=2)]
+
+    assert [book.title for book in result] == ["1984", "Animal Farm", "Brave New World"]
+    assert result[2].authors_list == ["Aldous Huxley"]
+    assert mock_db.stream.call_args.args[0].get_execution_options()["yield_per"] == 2
+    mock_db.execute.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_refresh_books_writes_only_new_and_changed_docs(book_manager, mock_db):
+    docs = [
+        {"title": "1984", "author_name": ["George Orwell"], "key": "/works/OL1168083W",
+         "ebook_access": "borrowable", "first_publish_year": 1949, "language": ["eng"]},
+        {"title": "Animal Farm", "author_name": ["George Orwell"], "key": "/works/OL1168007W",
+         "ebook_access": "no_ebook", "first_publish_year": 1945, "language": ["eng"]},
+        {"title": "Homage to Catalonia", "author_name": ["George Orwell"], "key": "/works/OL1168106W"},
+    ]
+
+    def stored(book_id, doc, ebook_access):
+        return MagicMock(
+            id=book_id, openlibrary_key=doc["key"], dedupe_hash=book_dedupe_hash(doc["title"], doc["author_name"]),
+            ebook_access=ebook_access, first_publish_year=doc["first_publish_year"], language=doc["language"],
+            title=doc["title"], authors=doc["author_name"]
+        )
+
+    lookup = MagicMock()
+    lookup.all.return_value = [stored(1, docs[0], "no_ebook"), stored(2, docs[1], "no_ebook")]
+    mock_db.execute.side_effect = [lookup, None, None, None, None]
+    new_docs = {"inserted_books": 1, "inserted_authors": 0, "duplicates_count": 0, "message": ""}
+
+    with patch.object(BookDataManager, "store_books", return_value=new_docs) as mock_store:
+        result = await book_manager.refresh_books(docs, bulk=True)
+
+    assert result["inserted_books"] == 1
+    assert result["updated_books"] == 1
+    assert result["duplicates_count"] == 1
+    assert [doc["title"] for doc in mock_store.call_args.args[0]] == ["Homage to Catalonia"]
+    books_update, listings_update = mock_db.execute.call_args_list[1:3]
+    assert books_update.args[1] == [{
+        "b_id": 1, "b_key": "/works/OL1168083W", "b_ebook_access": "borrowable",
+        "b_first_publish_year": 1949, "b_language": ["eng"]
+    }]
+    assert json.loads(listings_update.args[1][0]["b_payload"])["ebook_access"] == "borrowable"
+    # the changed book moves between ebook_access counts
+    assert sorted(mock_db.execute.call_args_list[3].args[1], key=lambda row: row["count"]) == [
+        {"facet": "ebook_access", "value": "no_ebook", "count": -1},
+        {"facet": "ebook_access", "value": "borrowable", "count": 1},
+    ]
+    assert "catalog_version" in str(mock_db.execute.call_args_list[4].args[0])
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_get_facets_without_filters_reads_counters(book_manager, books_result, mock_db):
+    books_result.all.return_value = [
+        ("total", None, 3), ("language", "eng", 3), ("decade", "1940", 2), ("decade", None, 1),
+        ("author", "George Orwell", 2), ("author", "Aldous Huxley", 0),
+    ]
+
+    result = await book_manager.get_facets(limit=5)
+
+    assert result == {
+        "total": 3,
+        "language": [("eng", 3)],
+        "decade": [("1940", 2), (None, 1)],
+        "ebook_access": [],
+        "author": [("George Orwell", 2)],
+    }
+    sql = executed_sql(mock_db)
+    assert "catalog_facets" in sql
+    assert "book_listings" not in sql
+    mock_db.execute.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_get_facets_with_filters_groups_matching_listings(book_manager, books_result, mock_db):
+    books_result.all.return_value = [("total", None, 0)]
+
+    result = await book_manager.get_facets(author="Orwell", language="eng", limit=5)
+
+    assert result["total"] == 0
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "book_listings.language @> ARRAY[" in sql
+    assert sql.count("GROUP BY") == 4
+    assert "catalog_facets" not in sql
+    mock_db.execute.assert_awaited_once()
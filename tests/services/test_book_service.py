@@ -1,13 +1,61 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+
+import httpx
 import pytest
-import requests
 from fastapi import HTTPException
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
+from app.clients.open_library_api_client import OpenLibraryAPIClient
+from app.core.database import LockTimeoutError
+from app.core.instrumentation import track_queries
+from app.core.serialization import dumps_books
+from app.models.author_sync_model import AuthorSync
+from app.services.author_sync_manager import AuthorSyncManager, content_hash, doc_fingerprint
 from app.services.book_service import BookService
-from app.models.schemas import StoreBooksResponse, BookResponse
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.schemas import BookPage, StoreBooksResponse, BookResponse
+
+
+@pytest.fixture(autouse=True)
+def no_advisory_lock():
+    @asynccontextmanager
+    async def lock(key, timeout=None):
+        yield Mock()
+
+    with patch("app.services.book_service.advisory_lock", side_effect=lock) as mock_lock:
+        yield mock_lock
+
+
+@pytest.fixture(autouse=True)
+def ingest_session(mock_db):
+    """Coalesced ingests open their own session; tests get `mock_db` for it as well."""
+    @asynccontextmanager
+    async def session(bind=None):
+        yield mock_db
+
+    with patch("app.services.book_service.SessionLocal", side_effect=session) as session_local:
+        yield session_local
 
 
-def test_fetch_and_store_books_success(mock_db):
+@pytest.fixture(autouse=True)
+def author_syncs():
+    """Authors without a sync record, i.e. fetched for the first time."""
+    with patch.object(AuthorSyncManager, "get_sync", return_value=None) as get_sync, \
+            patch.object(AuthorSyncManager, "get_syncs", return_value={}), \
+            patch.object(AuthorSyncManager, "record_fetch", return_value=True) as record_fetch:
+        yield Mock(get_sync=get_sync, record_fetch=record_fetch)
+
+
+async def iter_pages(*pages):
+    for page in pages:
+        yield page
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_success(mock_db):
     mock_docs = [
         {"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"],
          "first_publish_year": 1937, "language": ["en"], "ebook_access": "no_ebook"},
@@ -20,12 +68,12 @@ def test_fetch_and_store_books_success(mock_db):
         "duplicates_count": 0,
         "message": ""
     }
-    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.fetch_books_by_author",
-               return_value=mock_docs):
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               return_value=iter_pages(mock_docs)):
         with patch("app.services.book_data_manager.BookDataManager.store_books",
                    return_value=mock_store_result):
-            service = BookService(db=mock_db)
-            response = service.fetch_and_store_books("J.R.R. Tolkien")
+            service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+            response = await service.fetch_and_store_books("J.R.R. Tolkien")
 
     assert isinstance(response, StoreBooksResponse)
     assert response.inserted_books == 2
@@ -33,21 +81,254 @@ def test_fetch_and_store_books_success(mock_db):
     assert response.duplicates_count == 0
 
 
-def test_fetch_and_store_books_api_failure(mock_db):
+@pytest.mark.anyio
+async def test_fetch_and_store_books_sums_pages(mock_db):
+    pages = [
+        [{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"]}],
+        [{"title": "The Silmarillion", "author_name": ["J.R.R. Tolkien"]}],
+    ]
+    store_results = [
+        {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""},
+        {"inserted_books": 0, "inserted_authors": 0, "duplicates_count": 1,
+         "message": "1 book of requested author already exist in the database"},
+    ]
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               return_value=iter_pages(*pages)):
+        with patch("app.services.book_data_manager.BookDataManager.store_books",
+                   side_effect=store_results) as mock_store:
+            service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+            on_page = AsyncMock()
+            response = await service.fetch_and_store_books("J.R.R. Tolkien", on_page=on_page)
+
+    assert mock_store.call_count == 2
+    assert on_page.await_args_list[-1].args == (
+        2, {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 1}
+    )
+    assert response.inserted_books == 1
+    assert response.inserted_authors == 1
+    assert response.duplicates_count == 1
+    assert response.message == "1 book of requested author already exist in the database"
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_skips_fresh_author(mock_db, author_syncs):
+    author_syncs.get_sync.return_value = AuthorSync(last_fetched_at=datetime.now(timezone.utc) - timedelta(minutes=5))
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author") as mock_iter, \
+            patch("app.services.book_service.settings.author_freshness_ttl", 3600.0):
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        response = await service.fetch_and_store_books("J.R.R. Tolkien")
+
+    assert response.up_to_date is True
+    assert response.inserted_books == 0
+    mock_iter.assert_not_called()
+    author_syncs.record_fetch.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_refreshes_known_author(mock_db, author_syncs):
+    author_syncs.get_sync.return_value = AuthorSync(last_fetched_at=datetime.now(timezone.utc) - timedelta(days=1))
+    docs = [{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"], "key": "/works/OL262758W"}]
+
+    async def iter_books(author, on_num_found):
+        on_num_found(1)
+        yield docs
+
+    refreshed = {"inserted_books": 0, "inserted_authors": 0, "duplicates_count": 0, "message": "", "updated_books": 1}
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               side_effect=iter_books), \
+            patch("app.services.book_data_manager.BookDataManager.refresh_books", return_value=refreshed), \
+            patch("app.services.book_data_manager.BookDataManager.store_books") as mock_store:
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        response = await service.fetch_and_store_books("J.R.R. Tolkien")
+
+    assert response.updated_books == 1
+    assert response.up_to_date is False
+    mock_store.assert_not_called()
+    author_syncs.record_fetch.assert_awaited_once_with(
+        "j.r.r. tolkien", "J.R.R. Tolkien", 1, content_hash(doc_fingerprint(doc) for doc in docs)
+    )
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_refreshes_known_author_page_by_page(mock_db, author_syncs):
+    author_syncs.get_sync.return_value = AuthorSync(last_fetched_at=datetime.now(timezone.utc) - timedelta(days=1))
+    pages = [[{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"]}],
+             [{"title": "The Silmarillion", "author_name": ["J.R.R. Tolkien"]}]]
+    progress = []
+
+    async def on_page(pages_fetched, totals):
+        progress.append((pages_fetched, mock_refresh.await_count, totals["inserted_books"]))
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               return_value=iter_pages(*pages)), \
+            patch("app.services.book_data_manager.BookDataManager.refresh_books", return_value={
+                "inserted_books": 1, "inserted_authors": 0, "duplicates_count": 0, "message": "", "updated_books": 0
+            }) as mock_refresh, \
+            patch("app.services.book_data_manager.BookDataManager.store_books") as mock_store:
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        response = await service.fetch_and_store_books("J.R.R. Tolkien", on_page=on_page)
+
+    # every page is written before the next one is fetched
+    assert progress == [(1, 1, 1), (2, 2, 2)]
+    assert [call.args[0] for call in mock_refresh.call_args_list] == pages
+    assert response.inserted_books == 2
+    mock_store.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_coalesces_concurrent_calls(mock_db, no_advisory_lock):
+    release = asyncio.Event()
+
+    async def store_books(docs, **kwargs):
+        await release.wait()
+        return {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               side_effect=lambda author, **kwargs: iter_pages([{"title": "The Hobbit", "author_name": [author]}])) as mock_iter, \
+            patch("app.services.book_data_manager.BookDataManager.store_books", side_effect=store_books):
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        calls = [
+            asyncio.create_task(service.fetch_and_store_books(name))
+            for name in ("J.R.R. Tolkien", "j.r.r.  tolkien", "J.R.R. Tolkien")
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        responses = await asyncio.gather(*calls)
+
+    assert mock_iter.call_count == 1
+    assert no_advisory_lock.call_args.args[0] == "ingest:j.r.r. tolkien"
+    assert all(response.inserted_books == 1 for response in responses)
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_runs_ingest_on_own_session(mock_db, ingest_session):
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               return_value=iter_pages([{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"]}])), \
+            patch("app.services.book_data_manager.BookDataManager.store_books", autospec=True,
+                  return_value={"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}) as mock_store:
+        service = BookService(db=Mock(), client=OpenLibraryAPIClient(Mock()))
+        await service.fetch_and_store_books("J.R.R. Tolkien")
+
+    ingest_session.assert_called_once()
+    assert mock_store.call_args.args[0].db is mock_db
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_survives_cancelled_first_caller(mock_db):
+    release = asyncio.Event()
+
+    async def store_books(docs, **kwargs):
+        await release.wait()
+        return {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               side_effect=lambda author, **kwargs: iter_pages([{"title": "The Hobbit", "author_name": [author]}])), \
+            patch("app.services.book_data_manager.BookDataManager.store_books", side_effect=store_books) as mock_store:
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        first = asyncio.create_task(service.fetch_and_store_books("J.R.R. Tolkien"))
+        second = asyncio.create_task(service.fetch_and_store_books("J.R.R. Tolkien"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        response = await second
+
+    assert first.cancelled()
+    assert response.inserted_books == 1
+    assert mock_store.await_count == 1
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_lock_timeout(mock_db, no_advisory_lock):
+    no_advisory_lock.side_effect = LockTimeoutError("busy")
+    service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.fetch_and_store_books("J.R.R. Tolkien")
+
+    assert exc_info.value.status_code == 503
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_api_failure(mock_db):
     with patch(
-            "app.clients.open_library_api_client.OpenLibraryAPIClient.fetch_books_by_author",
-            side_effect=requests.exceptions.RequestException("API down")
+            "app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+            side_effect=httpx.RequestError("API down")
     ):
-        service = BookService(db=mock_db)
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
 
         with pytest.raises(HTTPException) as exc_info:
-            service.fetch_and_store_books("J.K. Rowling")
+            await service.fetch_and_store_books("J.K. Rowling")
 
     assert exc_info.value.status_code == 502
     assert "Failed to fetch books from OpenLibrary: API down" in exc_info.value.detail
 
 
-def test_get_books_returns_list(mock_db):
+@pytest.mark.anyio
+async def test_fetch_and_store_books_batch(mock_db, no_advisory_lock):
+    pages = {
+        "J.R.R. Tolkien": [[{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"]}]],
+        "George Orwell": [[{"title": "1984", "author_name": ["George Orwell"]}],
+                          [{"title": "Animal Farm", "author_name": ["George Orwell"]}]],
+    }
+
+    def iter_books(author, **kwargs):
+        if author == "Nobody":
+            raise HTTPException(status_code=404, detail="No books found for author 'Nobody'")
+        return iter_pages(*pages[author])
+
+    def store_books(docs, **kwargs):
+        duplicate = docs[0]["title"] == "Animal Farm"
+        return {"inserted_books": 0 if duplicate else 1, "inserted_authors": 0 if duplicate else 1,
+                "duplicates_count": 1 if duplicate else 0, "message": ""}
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               side_effect=iter_books) as mock_iter, \
+            patch("app.services.book_data_manager.BookDataManager.store_books", side_effect=store_books):
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        response = await service.fetch_and_store_books_batch(
+            ["J.R.R. Tolkien", "George Orwell", "george  orwell", "Nobody"]
+        )
+
+    assert mock_iter.call_count == 3
+    # every author is ingested under its lock, as in `fetch_and_store_books`
+    assert sorted(call.args[0] for call in no_advisory_lock.call_args_list) == [
+        "ingest:george orwell", "ingest:j.r.r. tolkien", "ingest:nobody"
+    ]
+    assert list(response.results) == ["J.R.R. Tolkien", "George Orwell"]
+    assert response.results["George Orwell"].duplicates_count == 1
+    assert response.errors == {"Nobody": "No books found for author 'Nobody'"}
+    assert response.summary.inserted_books == 2
+    assert response.summary.duplicates_count == 1
+
+
+@pytest.mark.anyio
+async def test_fetch_and_store_books_batch_joins_ingest_in_flight(mock_db):
+    release = asyncio.Event()
+
+    async def store_books(docs, **kwargs):
+        await release.wait()
+        return {"inserted_books": 1, "inserted_authors": 1, "duplicates_count": 0, "message": ""}
+
+    with patch("app.clients.open_library_api_client.OpenLibraryAPIClient.iter_books_by_author",
+               side_effect=lambda author, **kwargs: iter_pages([{"title": "1984", "author_name": [author]}])) as mock_iter, \
+            patch("app.services.book_data_manager.BookDataManager.store_books", side_effect=store_books):
+        service = BookService(db=mock_db, client=OpenLibraryAPIClient(Mock()))
+        single = asyncio.create_task(service.fetch_and_store_books("George Orwell"))
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(service.fetch_and_store_books_batch(["george orwell"]))
+        await asyncio.sleep(0.01)
+        release.set()
+        await single
+        response = await batch
+
+    assert mock_iter.call_count == 1
+    assert response.results["george orwell"].inserted_books == 1
+
+
+@pytest.mark.anyio
+async def test_get_books_returns_list(mock_db):
     mock_books = [
         Mock(
             title="1984",
@@ -67,19 +348,191 @@ def test_get_books_returns_list(mock_db):
 
     with patch("app.services.book_data_manager.BookDataManager.get_books", return_value=mock_books):
         service = BookService(db=mock_db)
-        result = service.get_books(author="George Orwell")
+        result = await service.get_books(author="George Orwell")
 
-    assert isinstance(result, list)
-    assert all(isinstance(b, BookResponse) for b in result)
-    assert result[0].title == "1984"
-    assert result[1].title == "Animal Farm"
+    assert isinstance(result, BookPage)
+    assert result.items == mock_books
+    assert result.next_cursor is None
+    # the rows serialize to the fields of BookResponse without building the models
+    books = [BookResponse.model_validate(book) for book in json.loads(dumps_books(result.items))]
+    assert [book.title for book in books] == ["1984", "Animal Farm"]
+    assert books[0].authors == ["George Orwell"]
 
 
-def test_get_books_passes_filters(mock_db):
+@pytest.mark.anyio
+async def test_get_books_passes_filters(mock_db):
     with patch("app.services.book_data_manager.BookDataManager.get_books") as mock_get_books:
         mock_get_books.return_value = []
 
         service = BookService(db=mock_db)
-        service.get_books(author="J.K. Rowling", title="Harry Potter and the Sorcerer's Stone")
+        await service.get_books(author="J.K. Rowling", title="Harry Potter and the Sorcerer's Stone")
+
+        mock_get_books.assert_awaited_once_with(
+            "J.K. Rowling", "Harry Potter and the Sorcerer's Stone", search=None, min_similarity=0.3,
+            sort="id", descending=False, after=None, limit=None, language=None
+        )
+
+
+def make_books(count):
+    return [
+        Mock(title=f"Book {i}", ebook_access=None, first_publish_year=None, authors_list=[], language=[],
+             sort_key=(f"Book {i}", i))
+        for i in range(count)
+    ]
+
+
+@pytest.mark.anyio
+async def test_get_books_returns_next_cursor_when_more_books_exist(mock_db):
+    with patch("app.services.book_data_manager.BookDataManager.get_books",
+               return_value=make_books(3)) as mock_get_books:
+        service = BookService(db=mock_db)
+        page = await service.get_books(limit=2, sort="title", order="desc")
+
+    assert [book.title for book in page.items] == ["Book 0", "Book 1"]
+    assert decode_cursor(page.next_cursor) == ["title", "desc", "Book 1", 1]
+    assert mock_get_books.call_args.kwargs["limit"] == 3
+    assert mock_get_books.call_args.kwargs["descending"] is True
+
+
+@pytest.mark.anyio
+async def test_get_books_resumes_after_cursor(mock_db):
+    cursor = encode_cursor(["title", "asc", "Book 1", 1])
+    with patch("app.services.book_data_manager.BookDataManager.get_books",
+               return_value=make_books(1)) as mock_get_books:
+        service = BookService(db=mock_db)
+        page = await service.get_books(limit=2, cursor=cursor, sort="title")
+
+    assert mock_get_books.call_args.kwargs["after"] == ("Book 1", 1)
+    assert page.next_cursor is None
+
+
+@pytest.mark.parametrize("kwargs, payload, valid", [
+    ({"sort": "first_publish_year"}, ["first_publish_year", "asc", 1949, 1], True),
+    ({"sort": "first_publish_year"}, ["first_publish_year", "asc", "1949", 1], False),
+    ({"search": "orwell"}, ["search", 0.75, 1], True),
+    ({"search": "orwell"}, ["search", "0.75", 1], False),
+])
+@pytest.mark.anyio
+async def test_get_books_checks_cursor_value_type_of_ordering(mock_db, kwargs, payload, valid):
+    with patch("app.services.book_data_manager.BookDataManager.get_books",
+               return_value=make_books(1)) as mock_get_books:
+        service = BookService(db=mock_db)
+        if valid:
+            await service.get_books(limit=2, cursor=encode_cursor(payload), **kwargs)
+            assert mock_get_books.call_args.kwargs["after"] == tuple(payload[-2:])
+        else:
+            with pytest.raises(HTTPException) as exc_info:
+                await service.get_books(limit=2, cursor=encode_cursor(payload), **kwargs)
+            assert exc_info.value.status_code == 400
+            mock_get_books.assert_not_called()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor(["id", "asc", "Book 1", 1]),
+    encode_cursor(["title", "asc", "Book 1", "1"]),
+    encode_cursor(["title", "asc", "Book 1", True]),
+    encode_cursor(["title", "asc", {"title": "Book 1"}, 1]),
+    encode_cursor(["title", "asc", ["Book 1"], 1]),
+    encode_cursor(["title", "asc", 1, 1]),
+    encode_cursor(["title", "asc", None, 1]),
+])
+@pytest.mark.anyio
+async def test_get_books_rejects_invalid_cursor(mock_db, cursor):
+    service = BookService(db=mock_db)
+    with pytest.raises(HTTPException) as exc_info:
+        await service.get_books(limit=2, cursor=cursor, sort="title")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_get_books_includes_total_estimate(mock_db):
+    with patch("app.services.book_data_manager.BookDataManager.get_books", return_value=[]), \
+            patch("app.services.book_data_manager.BookDataManager.estimate_books_count",
+                  return_value=42) as mock_estimate:
+        service = BookService(db=mock_db)
+        page = await service.get_books(title="1984", include_total=True)
+
+    assert page.total_estimate == 42
+    mock_estimate.assert_awaited_once_with(None, "1984", search=None, min_similarity=0.3, language=None)
+
+
+@pytest.mark.anyio
+async def test_get_facets_returns_decades_as_years(mock_db):
+    facets = {
+        "total": 3,
+        "language": [("eng", 3)],
+        "decade": [("1940", 2), (None, 1)],
+        "ebook_access": [("no_ebook", 3)],
+        "author": [("George Orwell", 3)],
+    }
+    with patch("app.services.book_data_manager.BookDataManager.get_facets", return_value=facets) as mock_facets:
+        service = BookService(db=mock_db)
+        result = await service.get_facets(author="George Orwell", limit=5)
+
+    mock_facets.assert_awaited_once_with("George Orwell", None, None, 5)
+    assert result.total == 3
+    assert [(count.value, count.count) for count in result.decade] == [(1940, 2), (None, 1)]
+    assert result.author[0].value == "George Orwell"
+
+
+@pytest.mark.anyio
+async def test_get_serialized_books_records_serialization_time(mock_db):
+    page = BookPage.model_construct(items=make_books(2), next_cursor="abc", total_estimate=None)
+    with patch.object(BookService, "get_books", return_value=page), track_queries() as stats:
+        listing = await BookService(db=mock_db).get_serialized_books(1, None, author="Orwell")
+
+    assert [book["title"] for book in json.loads(listing.body)] == ["Book 0", "Book 1"]
+    assert listing.next_cursor == "abc"
+    assert stats.serialization_seconds > 0
+
+
+@pytest.mark.anyio
+async def test_stream_books_ndjson(mock_db):
+    with patch("app.services.book_data_manager.BookDataManager.iter_books",
+               return_value=iter_pages(*make_books(3))) as mock_iter:
+        service = BookService(db=mock_db)
+        chunks = [chunk async for chunk in service.stream_books(sort="title", media_type="application/x-ndjson")]
+
+    # the first row is sent at once, later rows are buffered into chunks; every row is one line
+    assert len(chunks) == 2
+    assert json.loads(chunks[0])["title"] == "Book 0"
+    lines = b"".join(chunks).splitlines(keepends=True)
+    assert all(line.endswith(b"\n") for line in lines)
+    assert [json.loads(line)["title"] for line in lines] == ["Book 0", "Book 1", "Book 2"]
+    assert mock_iter.call_args.kwargs["sort"] == "title"
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+@pytest.mark.anyio
+async def test_stream_books_json_array(mock_db, count):
+    with patch("app.services.book_data_manager.BookDataManager.iter_books",
+               return_value=iter_pages(*make_books(count))):
+        service = BookService(db=mock_db)
+        body = b"".join([chunk async for chunk in service.stream_books(media_type="application/json")])
+
+    assert [book["title"] for book in json.loads(body)] == [f"Book {i}" for i in range(count)]
+
+
+@pytest.mark.anyio
+async def test_stream_books_json_array_opens_before_first_row(mock_db):
+    read = asyncio.Event()
+
+    async def books():
+        read.set()
+        for book in make_books(1):
+            yield book
+
+    with patch("app.services.book_data_manager.BookDataManager.iter_books", return_value=books()):
+        service = BookService(db=mock_db)
+        chunks = service.stream_books(media_type="application/json")
+        assert await chunks.__anext__() == b"["
+        assert not read.is_set()
+        assert json.loads(await chunks.__anext__())["title"] == "Book 0"
+
 
-        mock_get_books.assert_called_once_with("J.K. Rowling", "Harry Potter and the Sorcerer's Stone")
+def test_stream_books_rejects_invalid_cursor_before_streaming(mock_db):
+    service = BookService(db=mock_db)
+    with pytest.raises(HTTPException) as exc_info:
+        service.stream_books(cursor="not-a-cursor")
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,73 @@
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import respx
+
+from app.services.health_prober import HealthProber
+
+
+def make_prober(session_factory=None):
+    return HealthProber(
+        http_client=httpx.AsyncClient(base_url="https://openlibrary.org"),
+        session_factory=session_factory or MagicMock(),
+        timeout=1.0
+    )
+
+
+@pytest.mark.anyio
+async def test_probe_once_success():
+    prober = make_prober()
+    with respx.mock:
+        respx.get("https://openlibrary.org/books/OL1M.json").mock(
+            return_value=httpx.Response(200, json={"key": "value"})
+        )
+        await prober.probe_once()
+
+    assert prober.snapshot["external_api_status"] == "ok"
+    assert prober.snapshot["database_status"] == "ok"
+    assert prober.snapshot["external_api_latency_ms"] is not None
+    assert prober.snapshot["checked_at"] is not None
+    assert prober.is_ready()
+
+
+@pytest.mark.anyio
+async def test_probe_once_external_api_error_status():
+    prober = make_prober()
+    with respx.mock:
+        respx.get("https://openlibrary.org/books/OL1M.json").mock(return_value=httpx.Response(500))
+        await prober.probe_once()
+
+    assert prober.snapshot["external_api_status"] == "failed"
+    assert prober.is_ready()
+
+
+@pytest.mark.anyio
+async def test_probe_once_external_api_connection_error():
+    prober = make_prober()
+    with respx.mock:
+        respx.get("https://openlibrary.org/books/OL1M.json").mock(
+            side_effect=httpx.ConnectError("Timeout")
+        )
+        await prober.probe_once()
+
+    assert prober.snapshot["external_api_status"] == "failed"
+
+
+@pytest.mark.anyio
+async def test_probe_once_database_error():
+    session_factory = MagicMock()
+    session = session_factory.return_value.__aenter__.return_value
+    session.execute.side_effect = Exception("connection refused")
+    prober = make_prober(session_factory)
+    with respx.mock:
+        respx.get("https://openlibrary.org/books/OL1M.json").mock(return_value=httpx.Response(200))
+        await prober.probe_once()
+
+    assert prober.snapshot["database_status"] == "failed"
+    assert not prober.is_ready()
+    session_factory.return_value.__aexit__.assert_awaited_once()
+
+
+def test_not_ready_before_first_check():
+    assert not make_prober().is_ready()
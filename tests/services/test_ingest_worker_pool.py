@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.ingest_job_model import IngestJob, JOB_RUNNING
+from app.models.schemas import StoreBooksResponse
+from app.services.book_service import BookService
+from app.services.ingest_job_manager import IngestJobManager
+from app.services.ingest_worker_pool import IngestWorkerPool
+
+RESULT = StoreBooksResponse(inserted_books=2, inserted_authors=1, duplicates_count=0, message="")
+
+
+def make_pool():
+    return IngestWorkerPool(http_client=MagicMock(), session_factory=MagicMock(), workers=1, poll_interval=0.01)
+
+
+def running_job():
+    return IngestJob(id="job-1", author="J.R.R. Tolkien", state=JOB_RUNNING)
+
+
+@pytest.mark.anyio
+async def test_run_next_returns_false_without_jobs():
+    with patch.object(IngestJobManager, "claim_next_job", return_value=None), \
+            patch.object(BookService, "fetch_and_store_books") as mock_fetch:
+        assert await make_pool().run_next() is False
+    mock_fetch.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_run_next_records_progress_and_result():
+    async def fetch(author, on_page):
+        await on_page(1, {"inserted_books": 2, "inserted_authors": 1, "duplicates_count": 0})
+        return RESULT
+
+    with patch.object(IngestJobManager, "claim_next_job", return_value=running_job()), \
+            patch.object(BookService, "fetch_and_store_books", side_effect=fetch), \
+            patch.object(IngestJobManager, "update_progress") as mock_progress, \
+            patch.object(IngestJobManager, "finish_job") as mock_finish:
+        assert await make_pool().run_next() is True
+
+    mock_progress.assert_awaited_once_with(
+        "job-1", 1, {"inserted_books": 2, "inserted_authors": 1, "duplicates_count": 0}
+    )
+    mock_finish.assert_awaited_once_with("job-1", RESULT)
+
+
+@pytest.mark.anyio
+async def test_run_next_marks_failed_job():
+    with patch.object(IngestJobManager, "claim_next_job", return_value=running_job()), \
+            patch.object(BookService, "fetch_and_store_books",
+                         side_effect=HTTPException(status_code=404, detail="No books found for author")), \
+            patch.object(IngestJobManager, "fail_job") as mock_fail, \
+            patch.object(IngestJobManager, "finish_job") as mock_finish:
+        await make_pool().run_next()
+
+    mock_fail.assert_awaited_once_with("job-1", "No books found for author")
+    mock_finish.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_stop_requeues_running_job():
+    started = asyncio.Event()
+
+    async def fetch(author, on_page):
+        started.set()
+        await asyncio.sleep(60)
+
+    pool = make_pool()
+    with patch.object(IngestJobManager, "claim_next_job", side_effect=[running_job(), None, None]), \
+            patch.object(BookService, "fetch_and_store_books", side_effect=fetch), \
+            patch.object(IngestJobManager, "requeue_job") as mock_requeue:
+        pool.start()
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await pool.stop()
+
+    mock_requeue.assert_awaited_once_with("job-1")
+
+
+@pytest.mark.anyio
+async def test_stop_lets_running_job_finish_within_timeout():
+    started = asyncio.Event()
+
+    async def fetch(author, on_page):
+        started.set()
+        await asyncio.sleep(0.05)
+        return RESULT
+
+    pool = make_pool()
+    with patch.object(IngestJobManager, "claim_next_job", side_effect=[running_job(), None, None]) as mock_claim, \
+            patch.object(BookService, "fetch_and_store_books", side_effect=fetch), \
+            patch.object(IngestJobManager, "finish_job") as mock_finish, \
+            patch.object(IngestJobManager, "requeue_job") as mock_requeue:
+        pool.start()
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await pool.stop(timeout=1)
+
+    mock_finish.assert_awaited_once_with("job-1", RESULT)
+    mock_requeue.assert_not_called()
+    assert mock_claim.call_count == 1